@@ -1,16 +1,19 @@
 # app/api/detection.py
 import os
+import asyncio
+import datetime
 from typing import Any, List, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query, Response, File, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_admin_user
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.models.project import Project, ProjectMember
 from app.models.user import User
 from app.models.video import Video
@@ -19,13 +22,18 @@ from app.models.usage_log import UsageLog
 from app.schemas.detection import (
     DetectionJob as DetectionJobSchema,
     DetectionJobCreate,
+    DetectionJobProgress,
     DetectionJobWithDetails,
     Detection,
     FrameDetections,
     Timeline,
     TimelineEvent,
 )
-from app.services.detection import start_detection_job
+from app.services.detection.motion import MOTION_METHODS
+from app.services.detection.presets import DETECTION_PRESETS, apply_preset
+from app.services.detection.registry import model_registry, resolve_backend
+from app.services.detection.sparse_results import complete_frame, load_frame_results
+from app.tasks.composite import COMPOSITE_MODEL, validate_analyzers
 
 router = APIRouter(prefix="/detection", tags=["detection"])
 
@@ -48,51 +56,123 @@ def get_available_models(
     db.add(log)
     db.commit()
     
-    # In a real application, this would come from a database or model registry
-    available_models = [
-        {
-            "id": "yolov8n",
-            "name": "YOLO v8 Nano",
-            "type": "object_detection",
-            "description": "Lightweight object detection model",
-            "classes": ["person", "bicycle", "car", "motorcycle", "airplane", "bus", 
-                        "train", "truck", "boat", "traffic light", "fire hydrant", 
-                        "stop sign", "parking meter", "bench", "bird", "cat", "dog", 
-                        "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", 
-                        "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee"]
-        },
-        {
-            "id": "yolov8s",
-            "name": "YOLO v8 Small",
-            "type": "object_detection",
-            "description": "Balance of speed and accuracy for object detection",
-            "classes": ["person", "bicycle", "car", "motorcycle", "airplane", "bus", 
-                        "train", "truck", "boat", "traffic light", "fire hydrant", 
-                        "stop sign", "parking meter", "bench", "bird", "cat", "dog"]
-        },
+    # Models the registry can serve, plus the built-in motion detector
+    available_models = model_registry.list_models()
+    available_models.append(
         {
             "id": "motion_detection",
             "name": "Motion Detection",
             "type": "motion_detection",
             "description": "Detects movement in video using background subtraction",
             "classes": ["motion"]
-        },
-    ]
+        }
+    )
+    available_models.append(
+        {
+            "id": COMPOSITE_MODEL,
+            "name": "Composite",
+            "type": "composite",
+            "description": "Runs several analyzers (YOLO models and motion detection) on each frame, "
+                           "set with the `analyzers` parameter",
+            "classes": []
+        }
+    )
     
     return available_models
 
 
+@router.get("/presets", response_model=List[Dict[str, Any]])
+def get_detection_presets(
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Get the speed/accuracy presets that can be passed as the `preset` parameter.
+    """
+    return [
+        {"id": name, **preset}
+        for name, preset in DETECTION_PRESETS.items()
+    ]
+
+
+@router.post("/models/reload", response_model=Dict[str, Any])
+def reload_models(
+    *,
+    db: Session = Depends(get_db),
+    model: Optional[str] = Query(None, description="Model to reload (default: all changed models)"),
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Reload cached models from their weights files.
+    
+    This drops the models cached by the API process. The job processes of
+    the detection workers keep their own cache and reload a model on its next
+    use once its weights file changed.
+    """
+    reloaded = model_registry.reload(model)
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="models",
+        action="reload",
+        details={"model": model, "reloaded": reloaded}
+    )
+    db.add(log)
+    db.commit()
+    
+    return {
+        "status": "success",
+        "reloaded": reloaded,
+    }
+
+
+@router.post("/cache/invalidate", response_model=Dict[str, Any])
+def invalidate_result_cache(
+    *,
+    db: Session = Depends(get_db),
+    model: Optional[str] = Query(None, description="Only jobs of this model"),
+    video_id: Optional[int] = Query(None, description="Only jobs on this video"),
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Stop completed jobs from being reused as cached results for new jobs.
+    """
+    query = db.query(DetectionJob).filter(DetectionJob.fingerprint.isnot(None))
+    if model:
+        query = query.filter(DetectionJob.model_name == model)
+    if video_id:
+        query = query.filter(DetectionJob.video_id == video_id)
+    
+    invalidated = query.update({DetectionJob.fingerprint: None}, synchronize_session=False)
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="detection_cache",
+        action="invalidate",
+        details={"model": model, "video_id": video_id, "invalidated": invalidated}
+    )
+    db.add(log)
+    db.commit()
+    
+    return {
+        "status": "success",
+        "invalidated": invalidated,
+    }
+
+
 @router.post("/videos/{video_id}/jobs", response_model=DetectionJobSchema)
 def create_detection_job(
     *,
     db: Session = Depends(get_db),
     video_id: int,
     job_in: DetectionJobCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Create a new detection job for a video.
+    
+    The job is queued as pending and picked up by a detection worker.
     """
     # Get the video
     video = db.query(Video).filter(Video.id == video_id).first()
@@ -126,11 +206,28 @@ def create_detection_job(
                 detail="Not enough permissions to process this video",
             )
     
+    # Resolve a speed/accuracy preset into model and resolution
+    try:
+        model_name, parameters = apply_preset(job_in.model_name, job_in.parameters)
+        if model_name.startswith("yolo") or model_name == COMPOSITE_MODEL:
+            resolve_backend(parameters.get("backend"))
+        if model_name == COMPOSITE_MODEL:
+            validate_analyzers(parameters.get("analyzers"))
+        if parameters.get("cascade_model") and not str(parameters["cascade_model"]).startswith("yolo"):
+            raise ValueError("cascade_model must be a YOLO model")
+        if parameters.get("motion_method") and parameters["motion_method"] not in MOTION_METHODS:
+            raise ValueError(f"Unknown motion_method, expected one of {', '.join(MOTION_METHODS)}")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
     # Create the detection job
     job = DetectionJob(
         video_id=video_id,
-        model_name=job_in.model_name,
-        parameters=job_in.parameters,
+        model_name=model_name,
+        parameters=parameters,
         status="pending",
         created_by=current_user.id,
     )
@@ -146,15 +243,12 @@ def create_detection_job(
         action="create",
         details={
             "video_id": video_id,
-            "model_name": job_in.model_name
+            "model_name": model_name
         }
     )
     db.add(log)
     db.commit()
     
-    # Start the detection job in the background
-    background_tasks.add_task(start_detection_job, db, job.id)
-    
     return job
 
 
@@ -202,6 +296,7 @@ def get_detection_job(
     # Create response
     job_dict = {
         **DetectionJobSchema.from_orm(job).dict(),
+        "progress": get_job_progress(job)["progress"],
         "video": {
             "id": video.id,
             "filename": video.filename,
@@ -230,6 +325,335 @@ def get_detection_job(
     return job_dict
 
 
+@router.get("/jobs/{job_id}/progress/stream")
+def stream_detection_job_progress(
+    *,
+    db: Session = Depends(get_db),
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Stream the progress of a detection job as Server-Sent Events.
+    
+    A `progress` event is sent whenever the progress changes, and the stream
+    ends once the job has stopped (completed, failed, cancelled or paused)
+    or has been deleted.
+    """
+    # Get the job
+    job = db.query(DetectionJob).filter(DetectionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Detection job not found",
+        )
+    
+    # Get the video and project
+    video = db.query(Video).filter(Video.id == job.video_id).first()
+    project = db.query(Project).filter(Project.id == video.project_id).first()
+    
+    # Check if user has access to this job's video project
+    is_admin = current_user.role and current_user.role.name == "admin"
+    
+    if not is_admin and project.created_by != current_user.id:
+        # Check if user is a member of this project
+        is_member = db.query(ProjectMember).filter(
+            ProjectMember.project_id == video.project_id,
+            ProjectMember.user_id == current_user.id
+        ).first()
+        
+        if not is_member:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions to access this job",
+            )
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="detection_job",
+        resource_id=job.id,
+        action="stream_progress",
+        details={"job_id": job_id}
+    )
+    db.add(log)
+    db.commit()
+    
+    async def event_stream():
+        # Runs on the event loop so that open streams don't hold threadpool
+        # threads; only the short database poll goes to the threadpool
+        last_data = None
+        while True:
+            progress = await run_in_threadpool(read_job_progress, job_id)
+            if progress is None:
+                break  # The job was deleted
+            
+            data = DetectionJobProgress(**progress).json()
+            if data != last_data:
+                yield f"event: progress\ndata: {data}\n\n"
+                last_data = data
+            else:
+                # Keep idle connections from being closed by proxies
+                yield ": keep-alive\n\n"
+            
+            if progress["status"] in ("completed", "failed", "cancelled", "paused"):
+                break
+            
+            await asyncio.sleep(settings.DETECTION_PROGRESS_INTERVAL)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=DetectionJobSchema)
+def cancel_detection_job(
+    *,
+    db: Session = Depends(get_db),
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Cancel a detection job.
+    
+    A job that is not running is cancelled at once; a running job is asked
+    to stop and is marked cancelled by its worker after storing the results
+    processed so far.
+    """
+    job = get_job_for_control(db, job_id, current_user)
+    
+    if job.status in ("pending", "paused"):
+        job.status = "cancelled"
+        job.completed_at = datetime.datetime.now()
+        job.checkpoint_frame = None
+        job.checkpoint_state = None
+    elif job.status == "in_progress":
+        job.requested_action = "cancel"
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot cancel a job that is {job.status}",
+        )
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="detection_job",
+        resource_id=job.id,
+        action="cancel",
+        details={"job_id": job_id}
+    )
+    db.add(log)
+    db.commit()
+    db.refresh(job)
+    
+    return job
+
+
+@router.post("/jobs/{job_id}/pause", response_model=DetectionJobSchema)
+def pause_detection_job(
+    *,
+    db: Session = Depends(get_db),
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Pause a detection job.
+    
+    A running job stores its results and a checkpoint before it is marked
+    paused, so it continues where it stopped when it is resumed.
+    """
+    job = get_job_for_control(db, job_id, current_user)
+    
+    if job.status == "pending":
+        job.status = "paused"
+    elif job.status == "in_progress":
+        job.requested_action = "pause"
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot pause a job that is {job.status}",
+        )
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="detection_job",
+        resource_id=job.id,
+        action="pause",
+        details={"job_id": job_id}
+    )
+    db.add(log)
+    db.commit()
+    db.refresh(job)
+    
+    return job
+
+
+@router.post("/jobs/{job_id}/resume", response_model=DetectionJobSchema)
+def resume_detection_job(
+    *,
+    db: Session = Depends(get_db),
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Resume a paused detection job.
+    
+    The job is queued again and a worker continues it from its checkpoint.
+    """
+    job = get_job_for_control(db, job_id, current_user)
+    
+    if job.status == "in_progress" and job.requested_action == "pause":
+        # Not stopped yet; withdraw the request
+        job.requested_action = None
+    elif job.status == "paused":
+        job.status = "pending"
+        job.attempts = 0
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot resume a job that is {job.status}",
+        )
+    
+    # Log usage
+    log = UsageLog(
+        user_id=current_user.id,
+        resource_type="detection_job",
+        resource_id=job.id,
+        action="resume",
+        details={"job_id": job_id}
+    )
+    db.add(log)
+    db.commit()
+    db.refresh(job)
+    
+    return job
+
+
+def get_job_for_control(db: Session, job_id: int, current_user: User) -> DetectionJob:
+    """
+    Get a job for a cancel/pause/resume request, locked against a worker
+    claiming it at the same time, after checking the user may access it.
+    """
+    # Get the job
+    job = db.query(DetectionJob).filter(DetectionJob.id == job_id).with_for_update().first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Detection job not found",
+        )
+    
+    # Get the video and project
+    video = db.query(Video).filter(Video.id == job.video_id).first()
+    project = db.query(Project).filter(Project.id == video.project_id).first()
+    
+    # Check if user has access to this job's video project
+    is_admin = current_user.role and current_user.role.name == "admin"
+    
+    if not is_admin and project.created_by != current_user.id:
+        # Check if user is a member of this project
+        is_member = db.query(ProjectMember).filter(
+            ProjectMember.project_id == video.project_id,
+            ProjectMember.user_id == current_user.id
+        ).first()
+        
+        if not is_member:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions to control this job",
+            )
+    
+    return job
+
+
+def read_frame_results(
+    collection,
+    job: DetectionJob,
+    analyzer: Optional[str] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read a job's frame results in frame order.
+    
+    Jobs with a "sampling" entry in their stats store motion frames sparsely;
+    their frames without motion are rebuilt here, so every analyzed frame
+    has a result. The sampling is only stored once a job completes, so the
+    motion frames of unfinished jobs are completed on the dense path too.
+    """
+    sampling = (job.stats or {}).get("sampling")
+    if sampling is not None:
+        if job.model_name == COMPOSITE_MODEL:
+            analyzers = [a for a in (job.parameters or {}).get("analyzers", []) if not analyzer or a == analyzer]
+        else:
+            analyzers = [] if analyzer else [None]
+        
+        return load_frame_results(
+            collection, job.id, job.video_id, sampling, analyzers, job.model_name,
+            start_time=start_time, end_time=end_time, skip=skip, limit=limit
+        )
+    
+    # Build query
+    query = {"job_id": job.id}
+    if analyzer:
+        query["analyzer"] = analyzer
+    
+    # Add time range filter if provided
+    if start_time is not None or end_time is not None:
+        query["timestamp"] = {}
+        if start_time is not None:
+            query["timestamp"]["$gte"] = start_time
+        if end_time is not None:
+            query["timestamp"]["$lte"] = end_time
+    
+    cursor = collection.find(query).sort("frame_number", 1).skip(skip)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return [complete_frame(frame_data) for frame_data in cursor]
+
+
+def read_job_progress(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Read the progress of a job with a short-lived session, so a progress
+    stream doesn't hold a database connection between polls.
+    
+    Returns:
+        Progress fields, or None if the job no longer exists
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(DetectionJob).filter(DetectionJob.id == job_id).first()
+        return get_job_progress(job) if job is not None else None
+    finally:
+        db.close()
+
+
+def get_job_progress(job: DetectionJob) -> Dict[str, Any]:
+    """
+    Get the progress fields of a job, with the completed percentage.
+    """
+    progress = None
+    if job.status == "completed":
+        progress = 100.0
+    elif job.total_frames:
+        progress = round(100.0 * (job.frames_processed or 0) / job.total_frames, 1)
+    
+    return {
+        "id": job.id,
+        "status": job.status,
+        "frames_processed": job.frames_processed,
+        "total_frames": job.total_frames,
+        "progress": progress,
+        "processing_fps": job.processing_fps,
+        "estimated_completion_at": job.estimated_completion_at,
+        "error_message": job.error_message,
+    }
+
+
 @router.get("/videos/{video_id}/jobs", response_model=List[DetectionJobSchema])
 def get_detection_jobs_for_video(
     *,
@@ -296,6 +720,7 @@ def get_detection_frames(
     limit: int = 100,
     start_time: Optional[float] = None,
     end_time: Optional[float] = None,
+    analyzer: Optional[str] = Query(None, description="Only results of this analyzer of a composite job"),
 ) -> Any:
     """
     Get detection results for a job.
@@ -340,23 +765,20 @@ def get_detection_frames(
     db_mongo = mongo_client[settings.MONGODB_DB]
     collection = db_mongo["detection_results"]
     
-    # Build query
-    query = {"job_id": job_id}
-    
-    # Add time range filter if provided
-    if start_time is not None or end_time is not None:
-        query["timestamp"] = {}
-        if start_time is not None:
-            query["timestamp"]["$gte"] = start_time
-        if end_time is not None:
-            query["timestamp"]["$lte"] = end_time
-    
     # Get detection frames
-    frames = list(collection.find(query).skip(skip).limit(limit).sort("frame_number", 1))
+    frames = read_frame_results(
+        collection, job,
+        analyzer=analyzer,
+        start_time=start_time,
+        end_time=end_time,
+        skip=skip,
+        limit=limit
+    )
     
-    # Convert ObjectId to string
+    # Convert ObjectId to string (rebuilt frames have none)
     for frame in frames:
-        frame["_id"] = str(frame["_id"])
+        if "_id" in frame:
+            frame["_id"] = str(frame["_id"])
     
     # Log usage
     log = UsageLog(
@@ -368,7 +790,8 @@ def get_detection_frames(
             "skip": skip, 
             "limit": limit,
             "start_time": start_time,
-            "end_time": end_time
+            "end_time": end_time,
+            "analyzer": analyzer
         }
     )
     db.add(log)
@@ -383,9 +806,13 @@ def get_detection_timeline(
     db: Session = Depends(get_db),
     job_id: int,
     current_user: User = Depends(get_current_user),
+    analyzer: Optional[str] = Query(None, description="Only results of this analyzer of a composite job"),
 ) -> Any:
     """
     Get timeline of detection events for a job.
+    
+    Composite jobs store one timeline per analyzer; without `analyzer` their
+    events are merged into one timeline, each event naming its analyzer.
     """
     # Get the job
     job = db.query(DetectionJob).filter(DetectionJob.id == job_id).first()
@@ -428,23 +855,34 @@ def get_detection_timeline(
     collection = db_mongo["timelines"]
     
     # Get timeline
-    timeline = collection.find_one({"job_id": job_id})
+    query = {"job_id": job_id}
+    if analyzer:
+        query["analyzer"] = analyzer
+    timelines = list(collection.find(query))
     
-    if not timeline:
+    if not timelines:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Timeline not found",
         )
     
-    # Convert ObjectId to string
-    timeline["_id"] = str(timeline["_id"])
+    if len(timelines) == 1:
+        timeline = timelines[0]
+        
+        # Convert ObjectId to string
+        timeline["_id"] = str(timeline["_id"])
+    else:
+        # Merge the per-analyzer timelines of a composite job
+        events = [event for timeline in timelines for event in timeline["events"]]
+        events.sort(key=lambda e: (e["start_time"], e.get("analyzer") or ""))
+        timeline = {"job_id": job_id, "video_id": job.video_id, "events": events}
     
     # Log usage
     log = UsageLog(
         user_id=current_user.id,
         resource_type="timeline",
         action="read",
-        details={"job_id": job_id}
+        details={"job_id": job_id, "analyzer": analyzer}
     )
     db.add(log)
     db.commit()
@@ -461,6 +899,7 @@ def get_detected_objects(
     class_name: Optional[str] = None,
     min_confidence: float = 0.5,
     limit: int = 20,
+    analyzer: Optional[str] = Query(None, description="Only results of this analyzer of a composite job"),
 ) -> Any:
     """
     Get thumbnails of detected objects for a job.
@@ -513,6 +952,8 @@ def get_detected_objects(
     
     if class_name:
         query["class_name"] = class_name
+    if analyzer:
+        query["analyzer"] = analyzer
     
     # Get object thumbnails
     objects = list(collection.find(query).limit(limit).sort("confidence", -1))
@@ -529,7 +970,8 @@ def get_detected_objects(
         details={
             "job_id": job_id,
             "class_name": class_name,
-            "min_confidence": min_confidence
+            "min_confidence": min_confidence,
+            "analyzer": analyzer
         }
     )
     db.add(log)
@@ -692,6 +1134,7 @@ def download_export(
     job_id: int,
     current_user: User = Depends(get_current_user),
     format: str = Query(..., description="Export format (json, csv, video)"),
+    analyzer: Optional[str] = Query(None, description="Only results of this analyzer of a composite job"),
 ) -> Any:
     """
     Download exported detection results.
@@ -748,11 +1191,12 @@ def download_export(
     collection = db_mongo["detection_results"]
     
     # Get all detections for the job
-    detections = list(collection.find({"job_id": job_id}).sort("frame_number", 1))
+    detections = read_frame_results(collection, job, analyzer=analyzer)
     
-    # Convert ObjectId to string
+    # Convert ObjectId to string (rebuilt frames have none)
     for detection in detections:
-        detection["_id"] = str(detection["_id"])
+        if "_id" in detection:
+            detection["_id"] = str(detection["_id"])
     
     # Log usage
     log = UsageLog(
@@ -761,7 +1205,8 @@ def download_export(
         action="read",
         details={
             "job_id": job_id,
-            "format": format
+            "format": format,
+            "analyzer": analyzer
         }
     )
     db.add(log)
@@ -780,11 +1225,13 @@ def download_export(
         output = io.StringIO()
         writer = csv.writer(output)
         
-        # Write header
-        writer.writerow([
+        # Write header (composite jobs add the analyzer of each row)
+        is_composite = job.model_name == COMPOSITE_MODEL
+        header = [
             "frame_number", "timestamp", "class_name", 
             "confidence", "x", "y", "width", "height"
-        ])
+        ]
+        writer.writerow(["analyzer"] + header if is_composite else header)
         
         # Write data
         for detection in detections:
@@ -792,7 +1239,7 @@ def download_export(
             timestamp = detection["timestamp"]
             
             for obj in detection.get("detections", []):
-                writer.writerow([
+                writer.writerow(([detection.get("analyzer")] if is_composite else []) + [
                     frame_number,
                     timestamp,
                     obj["class_name"],
@@ -821,16 +1268,20 @@ def download_export(
 
 
 @router.post("/test-yolo", response_model=Dict[str, Any])
-async def test_yolo(
+def test_yolo(
     *,
     db: Session = Depends(get_db),
     file: UploadFile = File(...),
     model: str = Query("yolov8n", description="Model name"),
     conf: float = Query(0.25, description="Confidence threshold"),
+    backend: Optional[str] = Query(None, description="Inference backend: torch or onnx"),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Test YOLO detection on an image.
+    
+    A plain function, so FastAPI runs the blocking model load and inference
+    in its thread pool instead of on the event loop.
     """
     try:
         # Ensure user has permissions
@@ -844,10 +1295,9 @@ async def test_yolo(
             )
         
         # Read image content
-        content = await file.read()
+        content = file.file.read()
         import numpy as np
         import cv2
-        from app.services.detection.yolo import YOLODetector
         
         # Convert to numpy array
         nparr = np.frombuffer(content, np.uint8)
@@ -859,12 +1309,8 @@ async def test_yolo(
                 detail="Invalid image file",
             )
         
-        # Initialize YOLO detector
-        model_path = os.path.join(settings.LOCAL_STORAGE_PATH, "models", f"{model}.pt")
-        if not os.path.exists(model_path):
-            model_path = f"{model}.pt"  # Use default model from ultralytics
-            
-        detector = YOLODetector(model_path)
+        # Get the shared YOLO detector from the model registry
+        detector = model_registry.get(model, backend=backend)
         
         # Perform detection
         detections, _ = detector.detect(img, conf_threshold=conf)
@@ -877,6 +1323,7 @@ async def test_yolo(
             details={
                 "model": model,
                 "conf": conf,
+                "backend": backend,
                 "filename": file.filename
             }
         )
@@ -30,6 +30,47 @@ class Settings(BaseSettings):
     # AI model settings
     YOLO_MODEL_PATH: str = "./models/yolov8n.pt"
     MODEL_CONFIDENCE_THRESHOLD: float = 0.25
+    MODEL_REGISTRY_MEMORY_MB: int = 1024  # Memory budget for cached models
+    MODEL_WARMUP: List[str] = []  # Models to load at startup, e.g. ["yolov8n"]
+    DETECTION_BACKEND: str = "torch"  # Default YOLO inference backend: 'torch' or 'onnx'
+    ONNX_EXPORT_IMGSZ: int = 640  # Default input size of exported ONNX models
+    ONNX_INTRA_OP_THREADS: int = 0  # Threads per ONNX Runtime operator (0 = one per core)
+    ONNX_INTER_OP_THREADS: int = 1  # Operators ONNX Runtime runs in parallel
+    
+    # Detection pipeline settings
+    DETECTION_DECODE_QUEUE_SIZE: int = 32  # Decoded frames waiting for inference
+    DETECTION_WRITE_QUEUE_SIZE: int = 64  # Results waiting to be persisted
+    DETECTION_DECODER: str = "opencv"  # Frame decoder: 'opencv' or 'ffmpeg'
+    DETECTION_INFERENCE_WORKERS: int = 1  # Model processes per YOLO job fed from one decoder (1 = in the job process)
+    RESULT_WRITER_BATCH_SIZE: int = 500  # Buffered MongoDB documents per insert_many
+    RESULT_WRITER_FLUSH_INTERVAL: float = 2.0  # Seconds between forced flushes
+    DETECTION_MIN_SEGMENT_FRAMES: int = 500  # Shortest segment for segment-parallel jobs
+    DETECTION_SEGMENT_WARMUP_FRAMES: int = 50  # Frames decoded before a segment to warm up motion models
+    DETECTION_DUPLICATE_THRESHOLD: float = 2.0  # Mean gray-level difference below which a frame reuses the last detections
+    DETECTION_DUPLICATE_MAX_REUSE: int = 150  # Near-duplicate frames in a row before YOLO runs again (0 = no limit)
+    DETECTION_CASCADE_LOW_CONFIDENCE: float = 0.1  # Bottom of the confidence band that escalates a frame to the cascade model
+    DETECTION_CASCADE_HIGH_CONFIDENCE: float = 0.5  # Top of the band; detections at or above it are trusted
+    
+    # Motion detection settings
+    MOTION_METHOD: str = "running_average"  # Background subtraction: 'running_average', 'mog2' or 'knn'
+    MOTION_ANALYSIS_SIZE: int = 640  # Longest side frames are shrunk to for motion analysis (0 = full resolution)
+    MOTION_MIN_AREA: int = 500  # Smallest moving area in full-resolution pixels
+    
+    # Detection worker settings
+    DETECTION_WORKER_CONCURRENCY: int = 2  # Jobs a worker runs at the same time
+    DETECTION_WORKER_POLL_INTERVAL: float = 2.0  # Seconds between queue polls when idle
+    DETECTION_WORKER_HEARTBEAT_INTERVAL: float = 15.0  # Seconds between heartbeats of running jobs
+    DETECTION_WORKER_JOBS_PER_PROCESS: int = 20  # Jobs a job process runs before it is replaced (0 = never)
+    DETECTION_JOB_STALE_AFTER: float = 120.0  # Seconds without heartbeat before a job is reclaimed
+    DETECTION_JOB_MAX_ATTEMPTS: int = 3  # Claims before an interrupted job is marked failed
+    DETECTION_CHECKPOINT_INTERVAL: float = 30.0  # Seconds between job checkpoints
+    DETECTION_PROGRESS_INTERVAL: float = 2.0  # Seconds between job progress updates
+    DETECTION_CONTROL_POLL_INTERVAL: float = 2.0  # Seconds between checks for cancel/pause requests
+    
+    # CPU thread budget
+    DETECTION_CPU_CORES: int = 0  # Cores detection may use (0 = all cores available to the process)
+    DETECTION_THREADS_PER_JOB: int = 0  # Threads per job (0 = split the cores evenly over the worker concurrency)
+    DETECTION_INTEROP_THREADS: int = 1  # torch inter-op threads per job
     
     # Video processing settings
     MAX_UPLOAD_SIZE: int = 5_000_000_000  # 5GB
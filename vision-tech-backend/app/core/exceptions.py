@@ -0,0 +1,33 @@
+# app/core/exceptions.py
+
+
+class ResultWriteError(Exception):
+    """
+    Raised when detection results could not be written to MongoDB.
+    """
+    pass
+
+
+class JobInterrupted(Exception):
+    """
+    Raised inside a processing loop when a running job was asked to stop
+    (cancel or pause). Buffered results have been written when it is raised.
+    
+    `action` is the request the loop acted on, "cancel" or "pause".
+    """
+    
+    def __init__(self, action: str, message: str):
+        super().__init__(action, message)
+        self.action = action
+        self.message = message
+    
+    def __str__(self) -> str:
+        return self.message
+
+
+class StaleFrameError(Exception):
+    """
+    Raised when a shared frame handle points to a slot that has already
+    been recycled for a newer frame.
+    """
+    pass
@@ -7,6 +7,7 @@ from app.api import auth, users, projects, videos, detection
 from app.core.config import settings
 from app.db.session import engine
 from app.db.base_class import Base
+from app.services.detection.registry import model_registry
 
 # Create tables in the database
 Base.metadata.create_all(bind=engine)
@@ -40,6 +41,12 @@ app.include_router(projects.router, prefix=settings.API_V1_STR)
 app.include_router(videos.router, prefix=settings.API_V1_STR)
 app.include_router(detection.router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+def warmup_models():
+    # Load frequently used models before the first job needs them
+    if settings.MODEL_WARMUP:
+        model_registry.warmup(settings.MODEL_WARMUP)
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "Vision Tech API is running"}
@@ -1,5 +1,5 @@
 # app/models/detection.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -10,12 +10,23 @@ class DetectionJob(Base):
     video_id = Column(Integer, ForeignKey("video.id"), nullable=False)
     model_name = Column(String(100), nullable=False)
     parameters = Column(JSON, nullable=True)
-    status = Column(String(50), default="pending", nullable=False)
+    status = Column(String(50), default="pending", nullable=False, index=True)
+    requested_action = Column(String(20), nullable=True)  # "cancel" or "pause", set while the job is running
     created_by = Column(Integer, ForeignKey("user.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(Text, nullable=True)
+    fingerprint = Column(String(64), nullable=True, index=True)  # Video, weights and parameters hash for result reuse
+    stats = Column(JSON, nullable=True)  # Processing statistics (pipeline, skipped frames, ...)
+    frames_processed = Column(Integer, nullable=True)  # Analyzed frames so far
+    total_frames = Column(Integer, nullable=True)  # Frames the job will analyze
+    processing_fps = Column(Float, nullable=True)  # Recent analyzed frames per second
+    estimated_completion_at = Column(DateTime(timezone=True), nullable=True)
+    checkpoint_frame = Column(Integer, nullable=True)  # Next frame to process when the job is resumed
+    checkpoint_state = Column(JSON, nullable=True)  # Tracker state and finished events at the checkpoint
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last sign of life from the worker
+    attempts = Column(Integer, default=0, nullable=False)  # Times the job was claimed by a worker
     
     # Relationships
     video = relationship("Video", back_populates="detection_jobs")
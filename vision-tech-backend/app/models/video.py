@@ -20,6 +20,7 @@ class Video(Base):
     uploaded_by = Column(Integer, ForeignKey("user.id"), nullable=False)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     processing_status = Column(String(50), default="pending")
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the file, computed on first use
     
     # Relationships
     project = relationship("Project", back_populates="videos")
@@ -17,6 +17,8 @@ class FrameDetections(BaseModel):
     timestamp: float
     detections: List[Detection]
     motion_areas: Optional[List[List[float]]] = None
+    analyzer: Optional[str] = None
+    reused: bool = False
 
 class TimelineEvent(BaseModel):
     type: str
@@ -27,11 +29,13 @@ class TimelineEvent(BaseModel):
     first_frame: int
     last_frame: int
     confidence: float
+    analyzer: Optional[str] = None
 
 class Timeline(BaseModel):
     job_id: int
     video_id: int
     events: List[TimelineEvent]
+    analyzer: Optional[str] = None
 
 class DetectionJobBase(BaseModel):
     model_name: str
@@ -44,15 +48,34 @@ class DetectionJob(DetectionJobBase):
     id: int
     video_id: int
     status: str
+    requested_action: Optional[str] = None
     created_by: int
     created_at: datetime
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = None
+    frames_processed: Optional[int] = None
+    total_frames: Optional[int] = None
+    processing_fps: Optional[float] = None
+    estimated_completion_at: Optional[datetime] = None
+    checkpoint_frame: Optional[int] = None
+    attempts: int = 0
 
     class Config:
         orm_mode = True
 
+class DetectionJobProgress(BaseModel):
+    id: int
+    status: str
+    frames_processed: Optional[int] = None
+    total_frames: Optional[int] = None
+    progress: Optional[float] = None
+    processing_fps: Optional[float] = None
+    estimated_completion_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
 class DetectionJobWithDetails(DetectionJob):
+    progress: Optional[float] = None
     video: Dict[str, Any]
     creator: Dict[str, Any]
\ No newline at end of file
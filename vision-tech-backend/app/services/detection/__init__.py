@@ -3,7 +3,6 @@ import datetime
 from sqlalchemy.orm import Session
 
 from app.models.detection import DetectionJob
-from app.tasks.detection import start_detection_job as _start_detection_task
 
 def start_detection_job(db: Session, job_id: int) -> None:
     """
@@ -15,5 +14,9 @@ def start_detection_job(db: Session, job_id: int) -> None:
         db: Database session
         job_id: ID of the detection job to start
     """
+    # Imported here because the task module imports the detection services,
+    # which would make importing this package from a fresh worker process circular
+    from app.tasks.detection import start_detection_job as _start_detection_task
+    
     # Start the detection job in the background
-    _start_detection_task(db, job_id)
\ No newline at end of file
+    _start_detection_task(db, job_id)
@@ -0,0 +1,227 @@
+# app/services/detection/cache.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.detection import DetectionJob
+from app.models.video import Video
+from app.services.detection.registry import model_registry, resolve_backend
+from app.services.detection.result_writer import ResultWriter
+
+logger = logging.getLogger(__name__)
+
+# Bump when a change to the processing code changes the results of existing jobs
+CACHE_VERSION = 2
+
+# Parameters that only affect how fast a job runs, not its results
+EXECUTION_PARAMETERS = {
+    "use_cache",
+    "batch_size",
+    "decode_queue_size",
+    "write_queue_size",
+    "write_batch_size",
+    "write_flush_interval",
+    "checkpoint_interval",
+    "parallel_segments",
+    "inference_workers",
+}
+
+
+def normalize_parameters(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reduce job parameters to the ones that affect the results.
+
+    Execution-only and unset parameters are dropped and class filters are
+    sorted, so equivalent jobs get the same fingerprint.
+    """
+    normalized = {}
+    for key, value in (params or {}).items():
+        if key in EXECUTION_PARAMETERS or value is None:
+            continue
+        if key == "classes" and isinstance(value, list):
+            value = sorted(value)
+        normalized[key] = value
+
+    return normalized
+
+
+def compute_file_hash(path: str) -> str:
+    """
+    Compute the SHA-256 of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_video_hash(db: Session, video: Video) -> str:
+    """
+    Get the content hash of a video, computing and storing it on first use.
+    """
+    if not video.content_hash:
+        video_path = os.path.join(settings.LOCAL_STORAGE_PATH, video.file_path)
+        video.content_hash = compute_file_hash(video_path)
+        db.commit()
+
+    return video.content_hash
+
+
+def job_fingerprint(db: Session, job: DetectionJob, video: Video) -> str:
+    """
+    Fingerprint a job by video content, model weights, inference backend and
+    normalized parameters.
+
+    Args:
+        db: Database session
+        job: Detection job
+        video: Video the job processes
+
+    Returns:
+        Hex digest identifying the job's results
+    """
+    params = job.parameters or {}
+    if job.model_name.startswith("yolo"):
+        weights = model_registry.weights_hash(job.model_name)
+        if params.get("cascade_model"):
+            weights = [weights, model_registry.weights_hash(params["cascade_model"])]
+        backend = resolve_backend(params.get("backend"))
+    elif job.model_name == "composite":
+        weights = {
+            analyzer: model_registry.weights_hash(analyzer) if analyzer.startswith("yolo") else analyzer
+            for analyzer in params.get("analyzers") or []
+        }
+        backend = resolve_backend(params.get("backend"))
+    else:
+        weights = job.model_name
+        backend = None
+
+    key = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "video": get_video_hash(db, video),
+            "model": job.model_name,
+            "weights": weights,
+            "backend": backend,
+            "parameters": normalize_parameters(job.parameters),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def find_cached_job(db: Session, job: DetectionJob) -> Optional[DetectionJob]:
+    """
+    Find the most recent completed job with the same fingerprint.
+    """
+    return db.query(DetectionJob).filter(
+        DetectionJob.fingerprint == job.fingerprint,
+        DetectionJob.status == "completed",
+        DetectionJob.id != job.id,
+    ).order_by(DetectionJob.completed_at.desc()).first()
+
+
+def copy_job_results(db_mongo, source_job: DetectionJob, job: DetectionJob) -> Dict[str, int]:
+    """
+    Materialize a job's results from those of an identical earlier job.
+
+    Frame results, thumbnails and timelines are copied under the new
+    job id. Thumbnail images are hard-linked (copied where links are not
+    supported) so the new job's thumbnail URLs resolve like its own.
+
+    Args:
+        db_mongo: MongoDB database
+        source_job: Completed job to copy from
+        job: Job to materialize
+
+    Returns:
+        Number of copied documents per collection
+    """
+    counts = {"detection_results": 0, "object_thumbnails": 0, "timelines": 0}
+    result_writer = ResultWriter(db_mongo)
+
+    for frame_data in db_mongo.detection_results.find({"job_id": source_job.id}, {"_id": 0}):
+        frame_data["job_id"] = job.id
+        result_writer.add_frame(frame_data)
+        counts["detection_results"] += 1
+
+    thumbnails_dir = os.path.join(settings.LOCAL_STORAGE_PATH, "thumbnails")
+    source_prefix = f"{source_job.id}_"
+    for thumbnail_data in db_mongo.object_thumbnails.find({"job_id": source_job.id}, {"_id": 0}):
+        source_filename = thumbnail_data["thumbnail_url"].rsplit("/", 1)[-1]
+        filename = f"{job.id}_{source_filename[len(source_prefix):]}" if source_filename.startswith(source_prefix) else source_filename
+        link_file(os.path.join(thumbnails_dir, source_filename), os.path.join(thumbnails_dir, filename))
+
+        thumbnail_data["job_id"] = job.id
+        thumbnail_data["thumbnail_url"] = f"/api/v1/detection/thumbnails/{job.id}/{filename}"
+        result_writer.add_thumbnail(thumbnail_data)
+        counts["object_thumbnails"] += 1
+
+    # Composite jobs have one timeline per analyzer
+    for timeline in db_mongo.timelines.find({"job_id": source_job.id}, {"_id": 0}):
+        timeline["job_id"] = job.id
+        result_writer.write_timeline(timeline)
+        counts["timelines"] += 1
+
+    result_writer.close()
+    return counts
+
+
+def link_file(source: str, target: str) -> None:
+    """
+    Hard-link a file, falling back to a copy. Missing sources are skipped.
+    """
+    if not os.path.exists(source) or os.path.exists(target):
+        return
+
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def reuse_cached_results(db: Session, db_mongo, job: DetectionJob, video: Video) -> bool:
+    """
+    Fingerprint a job and, unless it opted out with `use_cache: false`,
+    materialize it from an identical completed job.
+
+    Args:
+        db: Database session
+        db_mongo: MongoDB database
+        job: Detection job about to be processed
+        video: Video the job processes
+
+    Returns:
+        True if the job's results were copied and no processing is needed
+    """
+    params = job.parameters or {}
+
+    job.fingerprint = job_fingerprint(db, job, video)
+    db.commit()
+
+    if not params.get("use_cache", True):
+        return False
+
+    source_job = find_cached_job(db, job)
+    if source_job is None:
+        return False
+
+    logger.info(f"Reusing results of job {source_job.id} for job {job.id}")
+    counts = copy_job_results(db_mongo, source_job, job)
+
+    job.stats = {
+        **(source_job.stats or {}),
+        "cache": {"source_job_id": source_job.id, "documents_copied": counts},
+    }
+    job.total_frames = source_job.total_frames
+    job.frames_processed = source_job.frames_processed
+    db.commit()
+
+    return True
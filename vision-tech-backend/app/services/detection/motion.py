@@ -1,59 +1,166 @@
 # app/services/detection/motion.py
+from typing import List, Optional, Tuple
+
 import cv2
 import numpy as np
-import time
 
-def detect_motion(frame):
+# Background subtraction methods a MotionDetector supports
+MOTION_METHODS = ("running_average", "mog2", "knn")
+
+# Frames each method needs to initialize its background model before it
+# reports motion (the KNN subtractor flags the whole second frame)
+WARMUP_FRAMES = {"running_average": 1, "mog2": 2, "knn": 2}
+
+
+class MotionDetector:
     """
-    Detect motion in a frame using background subtraction.
-    
-    Args:
-        frame: The input frame to analyze
-        
-    Returns:
-        Tuple of (motion_detected, motion_areas)
-        - motion_detected: Boolean indicating if motion was detected
-        - motion_areas: List of bounding boxes for motion areas [x, y, w, h]
+    Background-subtraction motion detector with its own background model.
+
+    Every instance keeps its own state, so several jobs (or a motion job and
+    the motion gate of a YOLO job) can run in the same process. Frames are
+    shrunk so their longest side is at most `analysis_size` before they are
+    analyzed, and the motion areas are mapped back to the size of the frames
+    passed in. The pixel-based settings (`min_area`, blur) are given for full
+    resolution and scaled with the frame; frames that were already shrunk
+    (e.g. by the ffmpeg decoder) pass their scale as `frame_scale`.
+
+    Methods:
+    - running_average: difference with an exponentially weighted average of
+      the previous frames
+    - mog2 / knn: OpenCV's Gaussian mixture and k-nearest-neighbours
+      background subtractors, which cope better with repetitive background
+      motion such as foliage or water
     """
-    # Convert frame to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (21, 21), 0)
-    
-    # Global variables for background model
-    if not hasattr(detect_motion, "bg_model"):
-        detect_motion.bg_model = None
-        detect_motion.frame_count = 0
-    
-    # Initialize background model
-    if detect_motion.bg_model is None:
-        detect_motion.bg_model = gray.copy().astype("float")
-        return False, []
-    
-    # Update frame count
-    detect_motion.frame_count += 1
-    
-    # Calculate difference between current frame and background
-    cv2.accumulateWeighted(gray, detect_motion.bg_model, 0.1)
-    frameDelta = cv2.absdiff(gray, cv2.convertScaleAbs(detect_motion.bg_model))
-    
-    # Threshold the delta image
-    thresh = cv2.threshold(frameDelta, 25, 255, cv2.THRESH_BINARY)[1]
-    thresh = cv2.dilate(thresh, None, iterations=2)
-    
-    # Find contours
-    contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    motion_detected = False
-    motion_areas = []
-    
-    # Check for motion
-    for contour in contours:
-        # Filter small contours
-        if cv2.contourArea(contour) < 500:
-            continue
-            
-        motion_detected = True
-        x, y, w, h = cv2.boundingRect(contour)
-        motion_areas.append([float(x), float(y), float(w), float(h)])
-    
-    return motion_detected, motion_areas
\ No newline at end of file
+
+    def __init__(
+        self,
+        method: str = "running_average",
+        analysis_size: Optional[int] = None,
+        min_area: float = 500,
+        threshold: int = 25,
+        learning_rate: float = 0.1,
+        blur_size: int = 21,
+        history: int = 500,
+        frame_scale: float = 1.0,
+    ):
+        """
+        Args:
+            method: Background subtraction method (see MOTION_METHODS)
+            analysis_size: Longest side frames are shrunk to before analysis (None for full resolution)
+            min_area: Smallest moving area in full-resolution pixels
+            threshold: Gray-level difference that counts as change (running_average)
+            learning_rate: Weight of each new frame in the background model (running_average)
+            blur_size: Gaussian blur kernel size at full resolution
+            history: Frames the background model remembers (mog2 and knn)
+            frame_scale: Size of the frames passed in relative to full resolution
+
+        Raises:
+            ValueError: If the method is unknown
+        """
+        if method not in MOTION_METHODS:
+            raise ValueError(f"Unknown motion method '{method}', expected one of {', '.join(MOTION_METHODS)}")
+
+        self.method = method
+        self.analysis_size = analysis_size
+        self.min_area = min_area
+        self.threshold = threshold
+        self.learning_rate = learning_rate
+        self.blur_size = blur_size
+        self.history = history
+        self.frame_scale = frame_scale
+
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget the background model, e.g. before the next video.
+        """
+        self.frame_count = 0
+        self._bg_model = None
+        self._subtractor = None
+        self._scale = None
+
+    def detect(self, frame: np.ndarray) -> Tuple[bool, List[List[float]]]:
+        """
+        Detect motion in the next frame of a video.
+
+        Args:
+            frame: The input frame to analyze (BGR or grayscale)
+
+        Returns:
+            Tuple of (motion_detected, motion_areas)
+            - motion_detected: Boolean indicating if motion was detected
+            - motion_areas: List of bounding boxes for motion areas [x, y, w, h]
+        """
+        if self._scale is None:
+            height, width = frame.shape[:2]
+            longest = max(width, height)
+            self._scale = min(1.0, self.analysis_size / longest) if self.analysis_size else 1.0
+
+        # Shrink first, so the color conversion and blur run on fewer pixels
+        small = frame
+        if self._scale < 1.0:
+            small = cv2.resize(frame, None, fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        # Scale from full resolution to the analyzed frame
+        scale = self.frame_scale * self._scale
+        blur_size = max(3, int(self.blur_size * scale) | 1)
+        gray = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
+
+        self.frame_count += 1
+
+        if self.method == "running_average":
+            mask = self._running_average_mask(gray)
+        else:
+            mask = self._subtractor_mask(gray)
+
+        # The first frames only initialize the background model
+        if self.frame_count <= WARMUP_FRAMES[self.method] or mask is None:
+            return False, []
+
+        mask = cv2.dilate(mask, None, iterations=2)
+
+        # Find contours
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        motion_areas = []
+        min_area = self.min_area * scale * scale
+        for contour in contours:
+            # Filter small contours
+            if cv2.contourArea(contour) < min_area:
+                continue
+
+            # Back to the coordinates of the input frame
+            x, y, w, h = cv2.boundingRect(contour)
+            motion_areas.append([
+                float(x / self._scale),
+                float(y / self._scale),
+                float(w / self._scale),
+                float(h / self._scale),
+            ])
+
+        return bool(motion_areas), motion_areas
+
+    def _running_average_mask(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        if self._bg_model is None:
+            self._bg_model = gray.astype("float")
+            return None
+
+        # Calculate difference between current frame and background
+        cv2.accumulateWeighted(gray, self._bg_model, self.learning_rate)
+        frame_delta = cv2.absdiff(gray, cv2.convertScaleAbs(self._bg_model))
+
+        return cv2.threshold(frame_delta, self.threshold, 255, cv2.THRESH_BINARY)[1]
+
+    def _subtractor_mask(self, gray: np.ndarray) -> np.ndarray:
+        if self._subtractor is None:
+            if self.method == "mog2":
+                self._subtractor = cv2.createBackgroundSubtractorMOG2(history=self.history, detectShadows=True)
+            else:
+                self._subtractor = cv2.createBackgroundSubtractorKNN(history=self.history, detectShadows=True)
+
+        mask = self._subtractor.apply(gray)
+
+        # Shadows are marked 127; keep only the foreground
+        return cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)[1]
@@ -0,0 +1,272 @@
+# app/services/detection/onnx_backend.py
+import ast
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.utils.threads import get_thread_budget
+
+logger = logging.getLogger(__name__)
+
+# Matches the ultralytics defaults, so both backends return the same boxes
+NMS_IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = (114, 114, 114)
+STRIDE = 32
+
+
+def export_onnx_model(model_path: str, weights_hash: str, export_dir: Optional[str] = None) -> str:
+    """
+    Export YOLO weights to ONNX, reusing an earlier export of the same weights.
+
+    The exported file is named after the weights hash, so changed weights are
+    exported again. The model is exported with dynamic input shapes so one
+    file serves every batch size and `imgsz`. Exports are written to a
+    temporary directory first so concurrent jobs never load a partial file.
+
+    Args:
+        model_path: Path to the weights (.pt), or a name ultralytics downloads
+        weights_hash: SHA-256 of the weights
+        export_dir: Directory for exported models
+
+    Returns:
+        Path to the ONNX model
+    """
+    export_dir = export_dir or os.path.join(settings.LOCAL_STORAGE_PATH, "models", "onnx")
+    model_name = os.path.splitext(os.path.basename(model_path))[0]
+    onnx_path = os.path.join(export_dir, f"{model_name}-{weights_hash[:16]}.onnx")
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    from ultralytics import YOLO
+
+    os.makedirs(export_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=export_dir)
+    try:
+        # ultralytics writes the export next to the weights, so export a private copy
+        source_path = model_path if os.path.exists(model_path) else YOLO(model_path).ckpt_path
+        work_path = os.path.join(work_dir, os.path.basename(source_path))
+        shutil.copyfile(source_path, work_path)
+
+        logger.info(f"Exporting {model_name} to ONNX")
+        exported_path = YOLO(work_path).export(format="onnx", dynamic=True, imgsz=settings.ONNX_EXPORT_IMGSZ)
+        os.replace(exported_path, onnx_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return onnx_path
+
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resize a frame to fit a square of `size` pixels, keeping its aspect ratio,
+    and pad the rest with the ultralytics letterbox color.
+
+    Returns:
+        Tuple of (image, scale, (pad_x, pad_y))
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    if (new_width, new_height) != (width, height):
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+
+    return image, scale, (left, top)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS on (x1, y1, x2, y2) boxes.
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[i] + areas[order[1:]] - intersection + 1e-9)
+
+        order = order[1:][iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+class ONNXDetector:
+    """
+    YOLO detector running an exported ONNX model with ONNX Runtime on the CPU.
+
+    Exposes the same `detect` / `detect_batch` interface and detection dicts
+    as `YOLODetector`. Letterboxing and class-aware NMS are done here, with
+    the same defaults ultralytics uses.
+    """
+
+    def __init__(self, onnx_path: str, class_names: Optional[Dict[int, str]] = None):
+        """
+        Args:
+            onnx_path: Path to the exported ONNX model
+            class_names: Class id to name mapping (read from the model metadata if omitted)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS or get_thread_budget() or 0
+        options.inter_op_num_threads = settings.ONNX_INTER_OP_THREADS
+
+        self.model_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        if class_names is None:
+            metadata = self.session.get_modelmeta().custom_metadata_map
+            class_names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        self.class_names = class_names
+
+    def detect(self, frame, conf_threshold=0.25, classes=None, imgsz=None):
+        """
+        Perform object detection on a frame.
+
+        Args:
+            frame: Input frame (numpy array)
+            conf_threshold: Confidence threshold for detection
+            classes: List of class indices to detect (None for all classes)
+            imgsz: Model input size (None for the export size)
+
+        Returns:
+            Tuple of (detections, annotated_frame)
+        """
+        detections = self.detect_batch([frame], batch_size=1, conf_threshold=conf_threshold, classes=classes, imgsz=imgsz)[0]
+
+        annotated_frame = frame.copy()
+        for detection in detections:
+            x, y, w, h = (int(v) for v in detection["bbox"])
+            cv2.rectangle(annotated_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(
+                annotated_frame,
+                f"{detection['class_name']} {detection['confidence']:.2f}",
+                (x, max(0, y - 5)),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (0, 255, 0),
+                1,
+            )
+
+        return detections, annotated_frame
+
+    def detect_batch(self, frames, batch_size=8, conf_threshold=0.25, classes=None, imgsz=None):
+        """
+        Perform object detection on several frames with batched model calls.
+
+        Args:
+            frames: List of input frames (numpy arrays)
+            batch_size: Maximum number of frames per model call
+            conf_threshold: Confidence threshold for detection
+            classes: List of class indices to detect (None for all classes)
+            imgsz: Model input size (None for the export size)
+
+        Returns:
+            List with one detection list per input frame, in input order
+        """
+        batch_size = max(1, int(batch_size))
+        size = self._input_size(imgsz)
+        all_detections = []
+
+        for start in range(0, len(frames), batch_size):
+            chunk = frames[start:start + batch_size]
+
+            images, transforms = [], []
+            for frame in chunk:
+                image, scale, pad = letterbox(frame, size)
+                images.append(image)
+                transforms.append((scale, pad, frame.shape[:2]))
+
+            # BGR HWC uint8 -> RGB NCHW float32 in [0, 1]
+            blob = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+            blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+            for prediction, transform in zip(outputs, transforms):
+                all_detections.append(self._postprocess(prediction, transform, conf_threshold, classes))
+
+        return all_detections
+
+    @staticmethod
+    def _input_size(imgsz) -> int:
+        size = int(imgsz) if imgsz else settings.ONNX_EXPORT_IMGSZ
+        return max(STRIDE, int(np.ceil(size / STRIDE)) * STRIDE)
+
+    def _postprocess(self, prediction: np.ndarray, transform, conf_threshold: float, classes) -> List[Dict]:
+        """
+        Convert the raw output for one image into detection dicts.
+
+        Args:
+            prediction: Model output of shape (4 + classes, anchors)
+            transform: (scale, (pad_x, pad_y), (height, width)) of the letterbox
+            conf_threshold: Confidence threshold for detection
+            classes: List of class indices to keep (None for all classes)
+
+        Returns:
+            List of detection objects with class_id, class_name, confidence, and bbox
+        """
+        prediction = prediction.T
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+
+        mask = confidences > conf_threshold
+        if classes is not None:
+            mask &= np.isin(class_ids, classes)
+
+        boxes, class_ids, confidences = prediction[mask, :4], class_ids[mask], confidences[mask]
+        if not len(boxes):
+            return []
+
+        # (cx, cy, w, h) -> (x1, y1, x2, y2)
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:4] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:4] / 2
+
+        # Offset boxes per class so NMS only suppresses boxes of the same class
+        offsets = class_ids[:, None].astype(np.float32) * 7680
+        keep = non_max_suppression(xyxy + offsets, confidences, NMS_IOU_THRESHOLD)[:MAX_DETECTIONS]
+
+        # Undo the letterbox
+        scale, (pad_x, pad_y), (height, width) = transform
+        xyxy = xyxy[keep]
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad_x) / scale).clip(0, width)
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad_y) / scale).clip(0, height)
+
+        detections = []
+        for (x1, y1, x2, y2), class_id, confidence in zip(xyxy, class_ids[keep], confidences[keep]):
+            class_id = int(class_id)
+            detections.append({
+                "class_id": class_id,
+                "class_name": self.class_names.get(class_id, str(class_id)),
+                "confidence": float(confidence),
+                "bbox": [float(x1), float(y1), float(x2 - x1), float(y2 - y1)]
+            })
+
+        return detections
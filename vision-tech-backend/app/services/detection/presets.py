@@ -0,0 +1,50 @@
+# app/services/detection/presets.py
+from typing import Any, Dict, Optional, Tuple
+
+# Speed/accuracy presets: model size and inference resolution chosen together
+DETECTION_PRESETS = {
+    "fast": {
+        "model": "yolov8n",
+        "imgsz": 416,
+        "description": "Smallest model at reduced resolution, for quick triage of long footage",
+    },
+    "balanced": {
+        "model": "yolov8s",
+        "imgsz": 640,
+        "description": "Small model at the standard resolution",
+    },
+    "accurate": {
+        "model": "yolov8m",
+        "imgsz": 960,
+        "description": "Medium model at high resolution, for small or distant objects",
+    },
+}
+
+
+def apply_preset(model_name: str, parameters: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Resolve the `preset` parameter of a YOLO job into a model and `imgsz`.
+
+    An explicit `imgsz` parameter takes precedence over the preset's.
+
+    Args:
+        model_name: Requested model
+        parameters: Job parameters
+
+    Returns:
+        Tuple of (model_name, parameters)
+
+    Raises:
+        ValueError: If the preset is unknown
+    """
+    parameters = dict(parameters or {})
+    preset_name = parameters.get("preset")
+    if not preset_name or not model_name.startswith("yolo"):
+        return model_name, parameters
+
+    preset = DETECTION_PRESETS.get(preset_name)
+    if preset is None:
+        raise ValueError(f"Unknown preset '{preset_name}', expected one of {', '.join(DETECTION_PRESETS)}")
+
+    parameters.setdefault("imgsz", preset["imgsz"])
+    return preset["model"], parameters
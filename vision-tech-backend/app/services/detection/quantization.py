@@ -0,0 +1,247 @@
+# app/services/detection/quantization.py
+import glob
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from onnxruntime.quantization import CalibrationDataReader
+
+from app.core.config import settings
+from app.services.detection.onnx_backend import letterbox
+from app.services.detection.tracking import calculate_iou
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+def sample_calibration_frames(videos_dir: Optional[str] = None, count: int = 100) -> List[np.ndarray]:
+    """
+    Take frames spread evenly over the uploaded videos.
+
+    Args:
+        videos_dir: Directory with the uploaded videos (searched recursively)
+        count: Number of frames to take in total
+
+    Returns:
+        List of BGR frames
+    """
+    videos_dir = videos_dir or os.path.join(settings.LOCAL_STORAGE_PATH, "videos")
+    video_paths = sorted(
+        path for path in glob.glob(os.path.join(videos_dir, "**", "*"), recursive=True)
+        if path.lower().endswith(VIDEO_EXTENSIONS)
+    )
+    if not video_paths:
+        return []
+
+    frames = []
+    per_video = max(1, count // len(video_paths))
+    for video_path in video_paths:
+        cap = cv2.VideoCapture(video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count <= 0:
+            cap.release()
+            continue
+
+        for frame_number in np.linspace(0, frame_count - 1, per_video, dtype=int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_number))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+
+        if len(frames) >= count:
+            break
+
+    return frames[:count]
+
+
+def split_evaluation_frames(
+    frames: List[np.ndarray],
+    evaluation_count: int,
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Hold out frames for evaluating a quantized model.
+
+    Frames calibrated on would flatter the quantized model, so the
+    comparison runs on frames the calibration never saw. Held-out frames
+    are taken at even intervals, so both sets span every video.
+
+    Args:
+        frames: Sampled frames, in video order
+        evaluation_count: Number of frames to hold out
+
+    Returns:
+        Tuple of (calibration_frames, evaluation_frames)
+    """
+    evaluation_count = min(max(0, evaluation_count), len(frames))
+    held_out = set(np.linspace(0, len(frames) - 1, evaluation_count, dtype=int).tolist()) if evaluation_count else set()
+
+    calibration = [frame for index, frame in enumerate(frames) if index not in held_out]
+    evaluation = [frame for index, frame in enumerate(frames) if index in held_out]
+    return calibration, evaluation
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """
+    Feeds calibration frames to ONNX Runtime static quantization, prepared
+    exactly like the ONNX backend prepares frames for inference.
+    """
+
+    def __init__(self, input_name: str, frames: List[np.ndarray], imgsz: int):
+        super().__init__()
+        self.input_name = input_name
+        self._frames = iter(frames)
+        self.imgsz = imgsz
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        frame = next(self._frames, None)
+        if frame is None:
+            return None
+
+        image, _, _ = letterbox(frame, self.imgsz)
+        blob = image[..., ::-1].transpose(2, 0, 1)[None]
+        return {self.input_name: np.ascontiguousarray(blob, dtype=np.float32) / 255.0}
+
+
+def quantize_model(
+    onnx_path: str,
+    output_path: str,
+    mode: str = "dynamic",
+    calibration_frames: Optional[List[np.ndarray]] = None,
+) -> str:
+    """
+    Quantize an exported ONNX model to INT8.
+
+    Dynamic quantization stores INT8 weights and quantizes activations on
+    the fly. Static quantization also fixes the activation ranges, measured
+    on the calibration frames, which is faster on CPUs with INT8 kernels.
+
+    Args:
+        onnx_path: Float ONNX model
+        output_path: Path of the quantized model
+        mode: "dynamic" or "static"
+        calibration_frames: Frames for static quantization
+
+    Returns:
+        Path to the quantized model
+    """
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    if mode == "dynamic":
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QInt8)
+    elif mode == "static":
+        if not calibration_frames:
+            raise ValueError("Static quantization needs calibration frames")
+
+        input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        reader = FrameCalibrationReader(input_name, calibration_frames, settings.ONNX_EXPORT_IMGSZ)
+
+        quantize_static(
+            onnx_path,
+            output_path,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected 'dynamic' or 'static'")
+
+    # Keep the class names and other export metadata the detector reads
+    source = onnx.load(onnx_path, load_external_data=False)
+    quantized = onnx.load(output_path)
+    existing = {prop.key for prop in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, output_path)
+
+    return output_path
+
+
+def detection_agreement(
+    reference: List[List[Dict[str, Any]]],
+    candidate: List[List[Dict[str, Any]]],
+    iou_threshold: float = 0.5,
+) -> Dict[str, float]:
+    """
+    Measure how well one model's detections agree with a reference model's.
+
+    Detections are matched greedily by confidence to a reference detection
+    of the same class with IoU of at least `iou_threshold`.
+
+    Args:
+        reference: Detections per frame of the reference (float) model
+        candidate: Detections per frame of the model being compared
+        iou_threshold: Minimum IoU for a match
+
+    Returns:
+        Dict with precision, recall and f1 against the reference
+    """
+    matched = 0
+    reference_count = sum(len(detections) for detections in reference)
+    candidate_count = sum(len(detections) for detections in candidate)
+
+    for reference_detections, candidate_detections in zip(reference, candidate):
+        unmatched = list(reference_detections)
+        for detection in sorted(candidate_detections, key=lambda d: d["confidence"], reverse=True):
+            best, best_iou = None, iou_threshold
+            for other in unmatched:
+                if other["class_id"] != detection["class_id"]:
+                    continue
+                iou = calculate_iou(detection["bbox"], other["bbox"])
+                if iou >= best_iou:
+                    best, best_iou = other, iou
+            if best is not None:
+                unmatched.remove(best)
+                matched += 1
+
+    precision = matched / candidate_count if candidate_count else 1.0
+    recall = matched / reference_count if reference_count else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+def compare_models(reference, candidate, frames: List[np.ndarray], batch_size: int = 1) -> Dict[str, Any]:
+    """
+    Compare the speed and detections of two detectors on the same frames.
+
+    Args:
+        reference: Float model detector
+        candidate: Quantized model detector
+        frames: Frames to run both models on, not used for calibration
+        batch_size: Frames per model call
+
+    Returns:
+        Report with milliseconds per frame, speedup and detection agreement
+    """
+    timings = {}
+    detections = {}
+    for name, detector in (("reference", reference), ("candidate", candidate)):
+        # One untimed call so session setup isn't counted
+        detector.detect_batch(frames[:1], batch_size=1)
+
+        start = time.perf_counter()
+        detections[name] = detector.detect_batch(frames, batch_size=batch_size)
+        timings[name] = (time.perf_counter() - start) * 1000 / max(1, len(frames))
+
+    return {
+        "frames": len(frames),
+        "reference_ms_per_frame": round(timings["reference"], 2),
+        "candidate_ms_per_frame": round(timings["candidate"], 2),
+        "speedup": round(timings["reference"] / timings["candidate"], 2) if timings["candidate"] else None,
+        "agreement": detection_agreement(detections["reference"], detections["candidate"]),
+    }
@@ -0,0 +1,288 @@
+# app/services/detection/registry.py
+import glob
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.detection.onnx_backend import ONNXDetector, export_onnx_model
+from app.services.detection.yolo import YOLODetector
+
+logger = logging.getLogger(__name__)
+
+# Display names for the models we ship
+MODEL_DESCRIPTIONS = {
+    "yolov8n": ("YOLO v8 Nano", "Lightweight object detection model"),
+    "yolov8s": ("YOLO v8 Small", "Balance of speed and accuracy for object detection"),
+    "yolov8m": ("YOLO v8 Medium", "Higher accuracy object detection model"),
+}
+
+# Suffix of the model ids of INT8 quantized variants, e.g. "yolov8s-int8"
+INT8_SUFFIX = "-int8"
+
+# Inference backends a YOLO model can run on
+BACKENDS = ("torch", "onnx")
+
+Detector = Union[YOLODetector, ONNXDetector]
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    Get the inference backend to use, defaulting to the configured one.
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend = backend or settings.DETECTION_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def describe_model(model_name: str) -> Tuple[str, str]:
+    """
+    Get the display name and description of a model id.
+    """
+    if model_name.endswith(INT8_SUFFIX):
+        base_name = model_name[:-len(INT8_SUFFIX)]
+        display_name, _ = MODEL_DESCRIPTIONS.get(base_name, (base_name, ""))
+        return f"{display_name} INT8", f"INT8 quantized {base_name} for CPU inference (ONNX Runtime)"
+
+    return MODEL_DESCRIPTIONS.get(model_name, (model_name, "Custom object detection model"))
+
+
+class _RegistryEntry:
+    def __init__(self, detector: Detector, path: str, mtime: Optional[float], size_bytes: int):
+        self.detector = detector
+        self.path = path
+        self.mtime = mtime
+        self.size_bytes = size_bytes
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded YOLO detectors.
+
+    Each model is loaded once per process and backend and shared by every job
+    and request that asks for it. The least recently used models are evicted when the
+    estimated memory of all loaded models exceeds the budget, and a model is
+    reloaded when its weights file under the models directory changes.
+
+    Shared detectors may be called from several threads: `YOLODetector`
+    serializes its model calls and ONNX Runtime sessions are thread-safe.
+    """
+
+    def __init__(self, models_dir: Optional[str] = None, memory_budget_mb: Optional[int] = None):
+        """
+        Args:
+            models_dir: Directory containing the model weights (.pt)
+            memory_budget_mb: Memory budget for all loaded models in MB
+        """
+        self._models_dir = models_dir
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else settings.MODEL_REGISTRY_MEMORY_MB
+        self.memory_budget = int(budget_mb) * 1024 * 1024
+
+        self._entries: "OrderedDict[Tuple[str, str], _RegistryEntry]" = OrderedDict()
+        self._hashes: Dict[str, tuple] = {}  # path -> (mtime, sha256)
+        self._lock = threading.RLock()
+
+    @property
+    def models_dir(self) -> str:
+        return self._models_dir or os.path.join(settings.LOCAL_STORAGE_PATH, "models")
+
+    def get(self, model_name: str, backend: Optional[str] = None) -> Detector:
+        """
+        Get a loaded detector, loading it on first use.
+
+        Args:
+            model_name: Model id, e.g. "yolov8n"
+            backend: Inference backend ("torch" or "onnx", None for the configured default)
+
+        Returns:
+            Shared YOLO detector
+        """
+        with self._lock:
+            path = self.resolve_path(model_name)
+
+            # Prebuilt ONNX models (e.g. quantized variants) only run on ONNX Runtime
+            key = (model_name, "onnx" if path.endswith(".onnx") else resolve_backend(backend))
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.mtime != self._mtime(path):
+                logger.info(f"Weights for {model_name} changed on disk, reloading")
+                entry = None
+                del self._entries[key]
+
+            if entry is None:
+                entry = self._load(key, path)
+            else:
+                self._entries.move_to_end(key)
+
+            return entry.detector
+
+    def reload(self, model_name: Optional[str] = None) -> List[str]:
+        """
+        Drop cached detectors so they are loaded again from disk on next use.
+
+        Args:
+            model_name: Model to reload, or None to reload every model whose
+                weights file changed
+
+        Returns:
+            List of models that were dropped
+        """
+        with self._lock:
+            if model_name is not None:
+                keys = [key for key in self._entries if key[0] == model_name]
+            else:
+                keys = [
+                    key for key, entry in self._entries.items()
+                    if entry.mtime != self._mtime(self.resolve_path(key[0]))
+                ]
+
+            for key in keys:
+                del self._entries[key]
+
+        return sorted({name for name, _ in keys})
+
+    def warmup(self, model_names: List[str]) -> None:
+        """
+        Load models and run one dummy inference so the first job doesn't pay for it.
+
+        Args:
+            model_names: Models to warm up
+        """
+        for model_name in model_names:
+            try:
+                detector = self.get(model_name)
+                detector.detect_batch([np.zeros((640, 640, 3), dtype=np.uint8)], batch_size=1)
+                logger.info(f"Warmed up model {model_name}")
+            except Exception as e:
+                logger.error(f"Failed to warm up model {model_name}: {e}")
+
+    def resolve_path(self, model_name: str) -> str:
+        """
+        Get the weights path for a model.
+
+        Prebuilt ONNX models in the models directory come first. Falls back to
+        the bare file name, which ultralytics downloads on demand.
+        """
+        onnx_path = os.path.join(self.models_dir, f"{model_name}.onnx")
+        if os.path.exists(onnx_path):
+            return onnx_path
+
+        model_path = os.path.join(self.models_dir, f"{model_name}.pt")
+        if not os.path.exists(model_path):
+            model_path = f"{model_name}.pt"  # Use default model from ultralytics
+        return model_path
+
+    def weights_hash(self, model_name: str) -> str:
+        """
+        Get the SHA-256 of a model's weights file.
+
+        The hash is cached until the file's modification time changes. Models
+        without a local weights file are identified by their name.
+        """
+        path = self.resolve_path(model_name)
+        mtime = self._mtime(path)
+        if mtime is None:
+            return hashlib.sha256(model_name.encode()).hexdigest()
+
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        with self._lock:
+            self._hashes[path] = (mtime, digest.hexdigest())
+
+        return digest.hexdigest()
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """
+        List the models the registry can serve: weights in the models
+        directory plus anything currently loaded.
+        """
+        with self._lock:
+            names = {
+                os.path.splitext(os.path.basename(path))[0]
+                for pattern in ("*.pt", "*.onnx")
+                for path in glob.glob(os.path.join(self.models_dir, pattern))
+            }
+            names.update(name for name, _ in self._entries)
+
+            models = []
+            for name in sorted(names):
+                loaded = {backend: entry for (model, backend), entry in self._entries.items() if model == name}
+                entry = next(iter(loaded.values()), None)
+                display_name, description = describe_model(name)
+                models.append({
+                    "id": name,
+                    "name": display_name,
+                    "type": "object_detection",
+                    "description": description,
+                    "classes": list(entry.detector.class_names.values()) if entry else [],
+                    "loaded": entry is not None,
+                    "backends": sorted(loaded),
+                    "memory_mb": round(sum(e.size_bytes for e in loaded.values()) / (1024 * 1024), 1) if entry else None,
+                })
+
+            return models
+
+    def memory_usage(self) -> int:
+        """
+        Get the estimated memory of all loaded models in bytes.
+        """
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._entries.values())
+
+    def _load(self, key: Tuple[str, str], path: str) -> _RegistryEntry:
+        model_name, backend = key
+        logger.info(f"Loading model {model_name} from {path} ({backend})")
+
+        if path.endswith(".onnx"):
+            detector = ONNXDetector(path)
+        elif backend == "onnx":
+            onnx_path = export_onnx_model(path, self.weights_hash(model_name))
+            detector = ONNXDetector(onnx_path)
+        else:
+            detector = YOLODetector(path)
+        entry = _RegistryEntry(detector, path, self._mtime(path), self._estimate_size(detector, path))
+
+        # Evict least recently used models until the new one fits
+        while self._entries and self.memory_usage() + entry.size_bytes > self.memory_budget:
+            (evicted, evicted_backend), _ = self._entries.popitem(last=False)
+            logger.info(f"Evicted model {evicted} ({evicted_backend}) from registry")
+
+        self._entries[key] = entry
+        return entry
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    @staticmethod
+    def _estimate_size(detector: Detector, path: str) -> int:
+        """
+        Estimate the memory used by a loaded model from its parameter tensors.
+        """
+        if isinstance(detector, ONNXDetector):
+            return os.path.getsize(detector.model_path)
+
+        try:
+            return sum(p.numel() * p.element_size() for p in detector.model.model.parameters())
+        except Exception:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,129 @@
+# app/services/detection/result_writer.py
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.exceptions import ResultWriteError
+
+# Fields that identify a document, so writing it again replaces it instead of
+# adding a duplicate when a job is resumed or rerun. Only composite jobs set
+# "analyzer"; for other jobs it matches the documents without the field.
+KEY_FIELDS = {
+    "detection_results": ("job_id", "analyzer", "frame_number"),
+    "object_thumbnails": ("job_id", "analyzer", "frame_number", "object_index"),
+    "timelines": ("job_id", "analyzer"),
+}
+
+
+class ResultWriter:
+    """
+    Buffered writer for detection results.
+
+    Documents are collected per collection and written with one unordered
+    `bulk_write` once a buffer reaches `batch_size` documents or
+    `flush_interval` seconds have passed since the last flush, instead of one
+    round trip per document. Call `close()` at the end of the job to write
+    whatever is still buffered.
+
+    Every document is upserted on its `KEY_FIELDS`, so frames that are
+    processed again after a job restart overwrite their earlier results.
+    """
+
+    def __init__(
+        self,
+        db_mongo,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            db_mongo: MongoDB database
+            batch_size: Number of buffered documents that triggers a flush
+            flush_interval: Seconds after which buffered documents are flushed
+        """
+        self.db_mongo = db_mongo
+        self.batch_size = max(1, int(batch_size or settings.RESULT_WRITER_BATCH_SIZE))
+        self.flush_interval = flush_interval if flush_interval is not None else settings.RESULT_WRITER_FLUSH_INTERVAL
+
+        self.documents_written = 0
+        self.flushes = 0
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._last_flush = time.monotonic()
+
+    def add_frame(self, frame_data: Dict[str, Any]) -> None:
+        """
+        Buffer the detection results of one frame.
+        """
+        self._add("detection_results", frame_data)
+
+    def add_thumbnail(self, thumbnail_data: Dict[str, Any]) -> None:
+        """
+        Buffer the reference to one object thumbnail.
+        """
+        self._add("object_thumbnails", thumbnail_data)
+
+    def write_timeline(self, timeline: Dict[str, Any]) -> None:
+        """
+        Flush pending results and store the job timeline.
+        """
+        self.flush()
+        self._upsert("timelines", [timeline])
+
+    def flush(self) -> None:
+        """
+        Write all buffered documents.
+
+        Raises:
+            ResultWriteError: If MongoDB rejects a write
+        """
+        for collection_name, documents in self._buffers.items():
+            if documents:
+                self._upsert(collection_name, documents)
+                self._buffers[collection_name] = []
+
+        self.flushes += 1
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Final flush at the end of the job.
+        """
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the number of documents written and flushes performed.
+        """
+        return {
+            "documents_written": self.documents_written,
+            "flushes": self.flushes,
+            "batch_size": self.batch_size,
+        }
+
+    def _add(self, collection_name: str, document: Dict[str, Any]) -> None:
+        buffer = self._buffers.setdefault(collection_name, [])
+        buffer.append(document)
+
+        if (
+            len(buffer) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def _upsert(self, collection_name: str, documents: List[Dict[str, Any]]) -> None:
+        key_fields = KEY_FIELDS[collection_name]
+        requests = [
+            ReplaceOne({field: document.get(field) for field in key_fields}, document, upsert=True)
+            for document in documents
+        ]
+        try:
+            self.db_mongo[collection_name].bulk_write(requests, ordered=False)
+        except PyMongoError as e:
+            raise ResultWriteError(
+                f"Failed to write {len(documents)} documents to {collection_name}: {e}"
+            ) from e
+
+        self.documents_written += len(documents)
@@ -0,0 +1,157 @@
+# app/services/detection/sparse_results.py
+import bisect
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.utils.video import FrameSampler
+
+# Analyzer whose frame results are stored sparsely: only frames with motion,
+# with the areas in `motion_areas` only
+SPARSE_ANALYZER = "motion_detection"
+
+
+def describe_sampling(sampler: FrameSampler, fps: float, frame_count: int) -> Dict[str, Any]:
+    """
+    Describe which frames a job analyzed, so its empty frames can be rebuilt.
+
+    Stored in the job stats as "sampling".
+
+    Args:
+        sampler: Frame sampler of the job
+        fps: Frames per second of the video
+        frame_count: Number of frames the job decoded
+
+    Returns:
+        Dict with "fps", "frame_count" and either "stride" or "keyframes"
+    """
+    sampling = {"fps": fps, "frame_count": frame_count}
+    if sampler.keyframes is not None:
+        sampling["keyframes"] = [frame for frame in sampler.keyframes if frame < frame_count]
+    else:
+        sampling["stride"] = sampler.stride
+    return sampling
+
+
+def sampled_frame_numbers(
+    sampling: Dict[str, Any],
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> Sequence[int]:
+    """
+    Get the analyzed frame numbers of a job, optionally within a time range.
+
+    Args:
+        sampling: The job's "sampling" stats
+        start_time: Only frames at or after this time in seconds
+        end_time: Only frames at or before this time in seconds
+
+    Returns:
+        Sorted frame numbers (a lazy range for strided sampling)
+    """
+    if "keyframes" in sampling:
+        frames = sampling["keyframes"]
+    else:
+        frames = range(0, sampling["frame_count"], sampling["stride"])
+
+    fps = sampling["fps"]
+    lo, hi = 0, len(frames)
+    if start_time is not None:
+        lo = bisect.bisect_left(frames, math.ceil(start_time * fps - 1e-6))
+    if end_time is not None:
+        hi = bisect.bisect_right(frames, math.floor(end_time * fps + 1e-6))
+
+    return frames[lo:max(lo, hi)]
+
+
+def motion_detections(motion_areas: List[List[float]]) -> List[Dict[str, Any]]:
+    """
+    Rebuild the detection list of a motion frame from its motion areas.
+    """
+    return [
+        {
+            "class_id": 0,
+            "class_name": "motion",
+            "confidence": 1.0,
+            "bbox": area
+        }
+        for area in motion_areas
+    ]
+
+
+def complete_frame(frame_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add the `detections` a sparse motion frame was stored without.
+    """
+    if "detections" not in frame_data:
+        frame_data["detections"] = motion_detections(frame_data.get("motion_areas", []))
+    return frame_data
+
+
+def load_frame_results(
+    collection,
+    job_id: int,
+    video_id: int,
+    sampling: Dict[str, Any],
+    analyzers: List[Optional[str]],
+    model_name: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read the frame results of a job with sparsely stored motion frames.
+
+    Every analyzed frame gets one result per analyzer, ordered by frame
+    number and then analyzer; frames without a stored document are rebuilt
+    as frames without detections. `skip` and `limit` page through these
+    rebuilt results, so pages match those of a densely stored job.
+
+    Args:
+        collection: detection_results collection
+        job_id: Detection job ID
+        video_id: Video ID
+        sampling: The job's "sampling" stats
+        analyzers: Analyzers to return ([None] for a job without analyzers)
+        model_name: Model of the job
+        start_time: Only frames at or after this time in seconds
+        end_time: Only frames at or before this time in seconds
+        skip: Number of results to skip
+        limit: Maximum number of results (None for all)
+
+    Returns:
+        Frame result documents
+    """
+    frames = sampled_frame_numbers(sampling, start_time, end_time)
+    per_frame = len(analyzers)
+    total = len(frames) * per_frame
+    stop = total if limit is None else min(total, skip + limit)
+    if skip >= stop:
+        return []
+
+    rows = [(frames[index // per_frame], analyzers[index % per_frame]) for index in range(skip, stop)]
+
+    query = {"job_id": job_id, "frame_number": {"$gte": rows[0][0], "$lte": rows[-1][0]}}
+    if analyzers != [None]:
+        query["analyzer"] = {"$in": analyzers}
+    stored = {(doc["frame_number"], doc.get("analyzer")): doc for doc in collection.find(query)}
+
+    fps = sampling["fps"]
+    results = []
+    for frame_number, analyzer in rows:
+        frame_data = stored.get((frame_number, analyzer))
+        if frame_data is None:
+            frame_data = {
+                "job_id": job_id,
+                "video_id": video_id,
+                "frame_number": frame_number,
+                "timestamp": frame_number / fps,
+                "detections": []
+            }
+            if (analyzer or model_name) == SPARSE_ANALYZER:
+                frame_data["motion_areas"] = []
+            if analyzer is not None:
+                frame_data["analyzer"] = analyzer
+        results.append(complete_frame(frame_data))
+
+    return results
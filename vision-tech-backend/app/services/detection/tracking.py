@@ -0,0 +1,484 @@
+# app/services/detection/tracking.py
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Up to this many detection/track pairs per class, candidate pairs are found
+# with a scalar IoU; the NumPy IoU matrix only pays off above it
+SCALAR_MAX_PAIRS = 64
+
+
+class ObjectTracker:
+    """
+    Incremental IoU tracker that turns per-frame detections into timeline events.
+
+    Frames are fed one at a time with `update()`. Only tracks that were seen
+    within the gap threshold are kept, indexed by class; older tracks are
+    retired and returned as finished timeline events, so memory depends on the
+    number of objects currently in view rather than on the length of the video.
+
+    For every class in a frame the IoU between all detections and all active
+    tracks is computed as one NumPy matrix, and detections are assigned to
+    tracks with a global (Hungarian) assignment that maximizes total IoU.
+    Classes with few detections and tracks (up to SCALAR_MAX_PAIRS pairs)
+    find their candidate pairs with a scalar IoU instead, which is cheaper at
+    that size. The solver only runs when a detection or track is part of
+    more than one candidate pair; otherwise the candidates are the optimal
+    assignment as they are.
+
+    When the tracker only sees one segment of a video, tracks that may continue
+    into a neighbouring segment are not turned into events but collected in
+    `boundary_tracks`, to be joined later with `stitch_tracks()`.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        frame_count: int = 0,
+        frame_step: int = 1,
+        iou_threshold: float = 0.5,
+        max_gap: int = 10,
+        min_detections: int = 3,
+        segment: Optional[Tuple[int, Optional[int]]] = None,
+    ):
+        """
+        Args:
+            fps: Frames per second
+            frame_count: Total number of frames (0 if unknown)
+            frame_step: Typical number of frames between two analyzed frames
+            iou_threshold: Minimum IoU for a detection to continue a track
+            max_gap: Analyzed frames a track may go unseen before it is retired
+            min_detections: Tracks with fewer detections are not reported
+            segment: Frame range (start, end) this tracker sees when the video is
+                processed in segments; end is None for the last segment
+        """
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frame_step = max(1, int(frame_step))
+        self.iou_threshold = iou_threshold
+        self.max_gap_frames = max_gap * self.frame_step
+        self.min_detections = min_detections
+        self.segment = segment
+
+        self.boundary_tracks: List[Dict[str, Any]] = []
+        self.next_track_id = 1
+        self.active_tracks: Dict[str, Dict[int, Dict[str, Any]]] = {}  # class_name -> track_id -> track data
+
+    def update(self, frame_number: int, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Feed the detections of the next analyzed frame.
+
+        Args:
+            frame_number: Index of the frame in the video (increasing)
+            detections: Detections for the frame
+
+        Returns:
+            Timeline events for tracks that finished before this frame
+        """
+        finished = self._retire(frame_number)
+
+        # Group detections by class, keeping their original order
+        detections_by_class: Dict[str, List[int]] = {}
+        for index, detection in enumerate(detections):
+            detections_by_class.setdefault(detection["class_name"], []).append(index)
+
+        assignments: Dict[int, int] = {}  # detection index -> track_id
+        for class_name, indices in detections_by_class.items():
+            tracks = self.active_tracks.get(class_name)
+            if not tracks:
+                continue
+
+            track_ids = list(tracks)
+            if len(indices) * len(track_ids) <= SCALAR_MAX_PAIRS:
+                assignments.update(self._match_pairs(detections, indices, tracks, track_ids))
+                continue
+
+            iou = iou_matrix(
+                np.array([detections[i]["bbox"] for i in indices], dtype=np.float64),
+                np.array([tracks[t]["last_bbox"] for t in track_ids], dtype=np.float64)
+            )
+
+            # Only pairs above the threshold can match
+            candidates = iou > self.iou_threshold
+            if not candidates.any():
+                continue
+            iou[~candidates] = 0.0
+
+            if len(indices) == 1 or len(track_ids) == 1:
+                # A single row or column: the best pair is the optimal assignment
+                row, col = np.unravel_index(np.argmax(iou), iou.shape)
+                rows, cols = [row], [col]
+            elif (candidates.sum(axis=0) <= 1).all() and (candidates.sum(axis=1) <= 1).all():
+                # No detection or track has competing candidates: take them all
+                rows, cols = np.nonzero(candidates)
+            else:
+                # Global assignment maximizing total IoU, then drop weak pairs
+                rows, cols = linear_sum_assignment(iou, maximize=True)
+            for row, col in zip(rows, cols):
+                if candidates[row, col]:
+                    assignments[indices[row]] = track_ids[col]
+
+        for index, detection in enumerate(detections):
+            class_name = detection["class_name"]
+            confidence = detection["confidence"]
+            bbox = detection["bbox"]
+
+            track_id = assignments.get(index)
+            if track_id is not None:
+                # Update existing track
+                track_data = self.active_tracks[class_name][track_id]
+                track_data["last_frame"] = frame_number
+                track_data["last_bbox"] = bbox
+                track_data["max_confidence"] = max(track_data["max_confidence"], confidence)
+                track_data["detection_count"] += 1
+            else:
+                # Create new track
+                self.active_tracks.setdefault(class_name, {})[self.next_track_id] = {
+                    "class_name": class_name,
+                    "first_frame": frame_number,
+                    "last_frame": frame_number,
+                    "first_bbox": bbox,
+                    "last_bbox": bbox,
+                    "max_confidence": confidence,
+                    "detection_count": 1
+                }
+                self.next_track_id += 1
+
+        return finished
+
+    def _match_pairs(
+        self,
+        detections: List[Dict[str, Any]],
+        indices: List[int],
+        tracks: Dict[int, Dict[str, Any]],
+        track_ids: List[int],
+    ) -> Dict[int, int]:
+        """
+        Match a few detections to tracks of one class with the global assignment.
+
+        Candidate pairs (IoU above the threshold) are found with a scalar IoU
+        that skips boxes which don't overlap. The assignment is only solved
+        for the detections and tracks that have competing candidates.
+
+        Returns:
+            Dict of detection index -> track_id
+        """
+        pairs = []
+        for index in indices:
+            x, y, w, h = detections[index]["bbox"]
+            for track_id in track_ids:
+                tx, ty, tw, th = tracks[track_id]["last_bbox"]
+
+                # Inline IoU; most pairs don't overlap at all
+                inter_w = min(x + w, tx + tw) - max(x, tx)
+                if inter_w <= 0:
+                    continue
+                inter_h = min(y + h, ty + th) - max(y, ty)
+                if inter_h <= 0:
+                    continue
+                intersection = inter_w * inter_h
+                iou = intersection / (w * h + tw * th - intersection)
+                if iou > self.iou_threshold:
+                    pairs.append((iou, index, track_id))
+
+        assignments = {index: track_id for _, index, track_id in pairs}
+        if len(assignments) == len(pairs) and len(set(assignments.values())) == len(pairs):
+            # Every detection and track is in at most one pair: that is the optimum
+            return assignments
+
+        rows = list(dict.fromkeys(index for _, index, _ in pairs))
+        cols = list(dict.fromkeys(track_id for _, _, track_id in pairs))
+        row_of = {index: row for row, index in enumerate(rows)}
+        col_of = {track_id: col for col, track_id in enumerate(cols)}
+        iou = np.zeros((len(rows), len(cols)))
+        for value, index, track_id in pairs:
+            iou[row_of[index], col_of[track_id]] = value
+
+        assignments = {}
+        for row, col in zip(*linear_sum_assignment(iou, maximize=True)):
+            if iou[row, col] > 0:
+                assignments[rows[row]] = cols[col]
+        return assignments
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Close all remaining tracks at the end of the video.
+
+        Returns:
+            Timeline events for the remaining tracks
+        """
+        events = []
+        for tracks in self.active_tracks.values():
+            for track_id, track_data in tracks.items():
+                event = self._close(track_id, track_data)
+                if event is not None:
+                    events.append(event)
+
+        self.active_tracks = {}
+        return events
+
+    def state_dict(self) -> Dict[str, Any]:
+        """
+        Get the active tracks as JSON-serializable state for a job checkpoint.
+        """
+        return {
+            "next_track_id": self.next_track_id,
+            "tracks": [
+                {**track_data, "track_id": track_id}
+                for tracks in self.active_tracks.values()
+                for track_id, track_data in tracks.items()
+            ],
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the active tracks saved with `state_dict()`.
+        """
+        self.next_track_id = state["next_track_id"]
+        self.active_tracks = {}
+        for track in state["tracks"]:
+            track_data = dict(track)
+            track_id = track_data.pop("track_id")
+            self.active_tracks.setdefault(track_data["class_name"], {})[track_id] = track_data
+
+    def _retire(self, frame_number: int) -> List[Dict[str, Any]]:
+        """
+        Remove tracks that have not been seen within the gap threshold.
+        """
+        events = []
+        for class_name in list(self.active_tracks):
+            tracks = self.active_tracks[class_name]
+            for track_id in list(tracks):
+                track_data = tracks[track_id]
+                if frame_number - track_data["last_frame"] > self.max_gap_frames:
+                    del tracks[track_id]
+                    event = self._close(track_id, track_data)
+                    if event is not None:
+                        events.append(event)
+
+            if not tracks:
+                del self.active_tracks[class_name]
+
+        return events
+
+    def _close(self, track_id: int, track_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Handle a finished track: hold it back if it touches a segment boundary,
+        otherwise convert it into a timeline event.
+        """
+        if self.segment is not None:
+            start, end = self.segment
+            touches_start = start > 0 and track_data["first_frame"] - start <= self.max_gap_frames
+            touches_end = end is not None and end - track_data["last_frame"] <= self.max_gap_frames
+            if touches_start or touches_end:
+                self.boundary_tracks.append({**track_data, "track_id": track_id})
+                return None
+
+        return self.to_event(track_id, track_data)
+
+    def to_event(self, track_id: int, track_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Convert a finished track into a timeline event (None for very short tracks).
+        """
+        if track_data["detection_count"] < self.min_detections:  # Ignore very short tracks
+            return None
+
+        # Bridge the frames skipped by sampling around the track
+        first_frame, last_frame = bridge_sampled_gap(
+            track_data["first_frame"], track_data["last_frame"], self.frame_step, self.frame_count
+        )
+
+        return {
+            "type": "object",
+            "class_name": track_data["class_name"],
+            "track_id": track_id,
+            "start_time": first_frame / self.fps,
+            "end_time": last_frame / self.fps,
+            "first_frame": first_frame,
+            "last_frame": last_frame,
+            "confidence": track_data["max_confidence"]
+        }
+
+
+def stitch_tracks(
+    segments: List[Tuple[int, List[Dict[str, Any]]]],
+    max_gap_frames: int,
+    iou_threshold: float = 0.5
+) -> List[Dict[str, Any]]:
+    """
+    Join tracks that were cut at the boundaries of independently processed segments.
+
+    A track that ends near the end of one segment is merged with a track of
+    the same class that starts near the beginning of the next segment when the
+    frame gap is within the tracking threshold and the boxes overlap. Pairs are
+    chosen with the same global assignment as frame-to-frame tracking.
+
+    Args:
+        segments: Per segment, in video order: (start_frame, boundary tracks)
+        max_gap_frames: Maximum frame gap between the two parts of a track
+        iou_threshold: Minimum IoU between the last and first box
+
+    Returns:
+        Stitched tracks
+    """
+    stitched = []
+    carried: List[Dict[str, Any]] = []  # Tracks that may continue into the current segment
+
+    for index, (start, tracks) in enumerate(segments):
+        next_start = segments[index + 1][0] if index + 1 < len(segments) else None
+        incoming = [t for t in tracks if t["first_frame"] - start <= max_gap_frames]
+        current = [t for t in tracks if t["first_frame"] - start > max_gap_frames]
+
+        # Pair carried tracks with incoming tracks of the same class
+        merged_incoming = set()
+        merged_carried = set()
+        for class_name in {t["class_name"] for t in carried}:
+            prev_ids = [i for i, t in enumerate(carried) if t["class_name"] == class_name]
+            next_ids = [i for i, t in enumerate(incoming) if t["class_name"] == class_name]
+            if not next_ids:
+                continue
+
+            iou = iou_matrix(
+                np.array([carried[i]["last_bbox"] for i in prev_ids], dtype=np.float64),
+                np.array([incoming[i]["first_bbox"] for i in next_ids], dtype=np.float64)
+            )
+            gaps = np.array([
+                [incoming[j]["first_frame"] - carried[i]["last_frame"] for j in next_ids]
+                for i in prev_ids
+            ])
+            candidates = (iou > iou_threshold) & (gaps > 0) & (gaps <= max_gap_frames)
+            if not candidates.any():
+                continue
+            iou[~candidates] = 0.0
+
+            rows, cols = linear_sum_assignment(iou, maximize=True)
+            for row, col in zip(rows, cols):
+                if not candidates[row, col]:
+                    continue
+                prev, nxt = carried[prev_ids[row]], incoming[next_ids[col]]
+                merged_carried.add(prev_ids[row])
+                merged_incoming.add(next_ids[col])
+                current.append({
+                    **prev,
+                    "last_frame": nxt["last_frame"],
+                    "last_bbox": nxt["last_bbox"],
+                    "max_confidence": max(prev["max_confidence"], nxt["max_confidence"]),
+                    "detection_count": prev["detection_count"] + nxt["detection_count"]
+                })
+
+        # Carried tracks without a continuation are finished
+        stitched.extend(t for i, t in enumerate(carried) if i not in merged_carried)
+        current.extend(t for i, t in enumerate(incoming) if i not in merged_incoming)
+
+        # Tracks ending near the next boundary may continue there
+        carried = []
+        for track in current:
+            if next_start is not None and next_start - track["last_frame"] <= max_gap_frames:
+                carried.append(track)
+            else:
+                stitched.append(track)
+
+    stitched.extend(carried)
+    return stitched
+
+
+def bridge_sampled_gap(
+    first_frame: int,
+    last_frame: int,
+    frame_step: int,
+    frame_count: int
+) -> Tuple[int, int]:
+    """
+    Widen an observed frame range by half a sampling step on each side.
+
+    With sampling, an object first seen at frame f appeared somewhere between
+    the previous analyzed frame and f; the midpoint is the best estimate. The
+    same holds for the end of the range.
+
+    Args:
+        first_frame: First analyzed frame the object was seen in
+        last_frame: Last analyzed frame the object was seen in
+        frame_step: Typical number of frames between two analyzed frames
+        frame_count: Total number of frames (0 if unknown)
+
+    Returns:
+        Tuple of (first_frame, last_frame)
+    """
+    half_step = max(1, int(frame_step)) // 2
+    first_frame = max(0, first_frame - half_step)
+    last_frame = last_frame + half_step
+    if frame_count > 0:
+        last_frame = min(last_frame, frame_count - 1)
+
+    return first_frame, last_frame
+
+
+def iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Calculate the IoU between every pair of boxes from two sets.
+
+    Args:
+        boxes1: Array of shape (N, 4) with boxes in format [x, y, width, height]
+        boxes2: Array of shape (M, 4) with boxes in format [x, y, width, height]
+
+    Returns:
+        Array of shape (N, M) with IoU values (0.0 to 1.0)
+    """
+    x1, y1 = boxes1[:, 0:1], boxes1[:, 1:2]
+    x2, y2 = x1 + boxes1[:, 2:3], y1 + boxes1[:, 3:4]
+    bx1, by1 = boxes2[:, 0], boxes2[:, 1]
+    bx2, by2 = bx1 + boxes2[:, 2], by1 + boxes2[:, 3]
+
+    # Intersection of every pair via broadcasting (N, 1) against (M,)
+    inter_w = np.maximum(np.minimum(x2, bx2) - np.maximum(x1, bx1), 0.0)
+    inter_h = np.maximum(np.minimum(y2, by2) - np.maximum(y1, by1), 0.0)
+    intersection = inter_w * inter_h
+
+    area1 = boxes1[:, 2:3] * boxes1[:, 3:4]
+    area2 = boxes2[:, 2] * boxes2[:, 3]
+    union = area1 + area2 - intersection
+
+    return np.divide(intersection, union, out=np.zeros(intersection.shape), where=union > 0)
+
+
+def calculate_iou(bbox1: List[float], bbox2: List[float]) -> float:
+    """
+    Calculate Intersection over Union (IoU) for two bounding boxes.
+
+    Args:
+        bbox1, bbox2: Bounding boxes in format [x, y, width, height]
+
+    Returns:
+        IoU value (0.0 to 1.0)
+    """
+    # Convert to xmin, ymin, xmax, ymax format
+    x1_1, y1_1, w1, h1 = bbox1
+    x2_1, y2_1, w2, h2 = bbox2
+
+    x1_2 = x1_1 + w1
+    y1_2 = y1_1 + h1
+    x2_2 = x2_1 + w2
+    y2_2 = y2_1 + h2
+
+    # Calculate intersection area
+    x_left = max(x1_1, x2_1)
+    y_top = max(y1_1, y2_1)
+    x_right = min(x1_2, x2_2)
+    y_bottom = min(y1_2, y2_2)
+
+    if x_right < x_left or y_bottom < y_top:
+        return 0.0
+
+    intersection_area = (x_right - x_left) * (y_bottom - y_top)
+
+    # Calculate union area
+    bbox1_area = w1 * h1
+    bbox2_area = w2 * h2
+    union_area = bbox1_area + bbox2_area - intersection_area
+
+    # Calculate IoU
+    if union_area == 0:
+        return 0.0
+
+    return intersection_area / union_area
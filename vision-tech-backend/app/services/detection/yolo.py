@@ -1,5 +1,6 @@
 # app/services/detection/yolo.py
 import os
+import threading
 import cv2
 import torch
 import numpy as np
@@ -21,8 +22,12 @@ class YOLODetector:
         
         # Get class names
         self.class_names = self.model.names
+        
+        # The registry shares one detector between jobs and API requests, and
+        # an ultralytics predictor must not run two calls at the same time
+        self._lock = threading.Lock()
     
-    def detect(self, frame, conf_threshold=0.25, classes=None):
+    def detect(self, frame, conf_threshold=0.25, classes=None, imgsz=None):
         """
         Perform object detection on a frame.
         
@@ -30,6 +35,7 @@ class YOLODetector:
             frame: Input frame (numpy array)
             conf_threshold: Confidence threshold for detection
             classes: List of class indices to detect (None for all classes)
+            imgsz: Model input size (None for the model default)
             
         Returns:
             Tuple of (detections, annotated_frame)
@@ -37,35 +43,91 @@ class YOLODetector:
             - annotated_frame: Frame with detection boxes drawn
         """
         # Run inference
-        results = self.model(frame, conf=conf_threshold, classes=classes)
+        with self._lock:
+            results = self.model(frame, conf=conf_threshold, classes=classes, **self._size_args(imgsz))
         
         # Process results
         detections = []
         
         for r in results:
-            boxes = r.boxes
-            
-            for box in boxes:
-                # Get box coordinates (x1, y1, x2, y2 format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                # Convert to x, y, width, height format
-                x, y, w, h = x1, y1, x2-x1, y2-y1
-                
-                # Get class and confidence
-                class_id = int(box.cls[0].item())
-                class_name = self.class_names[class_id]
-                confidence = float(box.conf[0].item())
-                
-                # Add detection
-                detections.append({
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "confidence": confidence,
-                    "bbox": [float(x), float(y), float(w), float(h)]
-                })
+            detections.extend(self._parse_result(r))
         
         # Get annotated frame
         annotated_frame = results[0].plot()
         
-        return detections, annotated_frame
\ No newline at end of file
+        return detections, annotated_frame
+    
+    def detect_batch(self, frames, batch_size=8, conf_threshold=0.25, classes=None, imgsz=None):
+        """
+        Perform object detection on several frames with batched model calls.
+        
+        Frames are grouped into chunks of `batch_size` and each chunk is passed
+        to the model in a single call, which keeps the CPU busy with one large
+        tensor instead of many small ones. No annotated frames are produced.
+        
+        Args:
+            frames: List of input frames (numpy arrays)
+            batch_size: Maximum number of frames per model call
+            conf_threshold: Confidence threshold for detection
+            classes: List of class indices to detect (None for all classes)
+            imgsz: Model input size (None for the model default)
+            
+        Returns:
+            List with one detection list per input frame, in input order
+        """
+        batch_size = max(1, int(batch_size))
+        all_detections = []
+        
+        for start in range(0, len(frames), batch_size):
+            chunk = list(frames[start:start + batch_size])
+            
+            # Run inference on the whole chunk at once
+            with self._lock:
+                results = self.model(chunk, conf=conf_threshold, classes=classes, verbose=False, **self._size_args(imgsz))
+            
+            # Ultralytics returns one result per input image
+            for r in results:
+                all_detections.append(self._parse_result(r))
+        
+        return all_detections
+    
+    @staticmethod
+    def _size_args(imgsz):
+        """
+        Model call arguments for the input size; images are letterboxed to it.
+        """
+        return {"imgsz": int(imgsz)} if imgsz else {}
+    
+    def _parse_result(self, result):
+        """
+        Convert a single ultralytics result into detection dicts.
+        
+        Args:
+            result: Ultralytics result for one image
+            
+        Returns:
+            List of detection objects with class_id, class_name, confidence, and bbox
+        """
+        detections = []
+        
+        for box in result.boxes:
+            # Get box coordinates (x1, y1, x2, y2 format)
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            
+            # Convert to x, y, width, height format
+            x, y, w, h = x1, y1, x2-x1, y2-y1
+            
+            # Get class and confidence
+            class_id = int(box.cls[0].item())
+            class_name = self.class_names[class_id]
+            confidence = float(box.conf[0].item())
+            
+            # Add detection
+            detections.append({
+                "class_id": class_id,
+                "class_name": class_name,
+                "confidence": confidence,
+                "bbox": [float(x), float(y), float(w), float(h)]
+            })
+        
+        return detections
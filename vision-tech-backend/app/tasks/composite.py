@@ -0,0 +1,385 @@
+# app/tasks/composite.py
+import os
+import time
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import JobInterrupted
+from app.models.detection import DetectionJob
+from app.models.video import Video
+from app.services.detection.registry import model_registry
+from app.services.detection.result_writer import ResultWriter
+from app.services.detection.sparse_results import describe_sampling
+from app.services.detection.tracking import ObjectTracker
+from app.tasks.detection import (
+    CheckpointTimer,
+    JobControl,
+    JobProgress,
+    build_detection_timeline,
+    create_checkpoint_saver,
+    create_frame_preprocessor,
+    create_frame_sampler,
+    create_motion_detector,
+    create_motion_timeline,
+    create_pipeline,
+    create_result_writer,
+    get_resume_state,
+    load_motion_frames,
+    map_detections_to_frame,
+    store_frame_detections,
+    store_frame_motion,
+    update_job_stats,
+)
+
+COMPOSITE_MODEL = "composite"
+MOTION_ANALYZER = "motion_detection"
+
+
+def validate_analyzers(analyzers: Any) -> List[str]:
+    """
+    Check the `analyzers` parameter of a composite job.
+
+    Args:
+        analyzers: List of YOLO model ids and/or "motion_detection"
+
+    Returns:
+        The analyzer ids
+
+    Raises:
+        ValueError: If the list is empty, has duplicates or unsupported analyzers
+    """
+    if not isinstance(analyzers, list) or not analyzers:
+        raise ValueError("Composite jobs need a non-empty 'analyzers' list")
+
+    for analyzer in analyzers:
+        if not isinstance(analyzer, str) or not (analyzer.startswith("yolo") or analyzer == MOTION_ANALYZER):
+            raise ValueError(f"Unsupported analyzer '{analyzer}', expected a YOLO model or '{MOTION_ANALYZER}'")
+
+    if len(set(analyzers)) != len(analyzers):
+        raise ValueError("Each analyzer can only be listed once")
+
+    return list(analyzers)
+
+
+def get_analyzer_parameters(params: Dict[str, Any], analyzer: str) -> Dict[str, Any]:
+    """
+    Get the parameters of one analyzer: the job parameters with the
+    analyzer's entry in `analyzer_parameters` applied on top.
+    """
+    overrides = (params.get("analyzer_parameters") or {}).get(analyzer) or {}
+    return {**params, **overrides}
+
+
+class YOLOAnalyzer:
+    """
+    One YOLO model of a composite job.
+
+    Crops and resizes the shared decoded frame to its own input, keeps its
+    own tracker and writes its results tagged with its model id.
+    """
+
+    # Tracker state is restored from the checkpoint, so no frames before it are needed
+    needs_warmup = False
+
+    def __init__(
+        self,
+        analyzer: str,
+        job_id: int,
+        video_id: int,
+        params: Dict[str, Any],
+        fps: float,
+        frame_count: int,
+        width: int,
+        height: int,
+        frame_step: int
+    ):
+        self.analyzer = analyzer
+        self.job_id = job_id
+        self.video_id = video_id
+        self.fps = fps
+        self.width = width
+        self.height = height
+
+        self.conf_threshold = params.get("conf_threshold", 0.25)
+        self.classes = params.get("classes")
+        self.batch_size = max(1, int(params.get("batch_size", 1)))
+        self.imgsz = params.get("imgsz")
+
+        self.detector = model_registry.get(analyzer, backend=params.get("backend"))
+        self.preprocess = create_frame_preprocessor(params, width, height, max_size=self.imgsz)
+        self.tracker = ObjectTracker(fps, frame_count=frame_count, frame_step=frame_step)
+        self.events: List[Dict[str, Any]] = []
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        return frame if self.preprocess.is_identity else self.preprocess(frame)
+
+    def infer(self, inputs: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        results = self.detector.detect_batch(
+            inputs,
+            batch_size=self.batch_size,
+            conf_threshold=self.conf_threshold,
+            classes=self.classes,
+            imgsz=self.imgsz
+        )
+
+        # Back from model input to original frame coordinates
+        return [
+            map_detections_to_frame(detections, offset=self.preprocess.offset, scale=self.preprocess.scale)
+            for detections in results
+        ]
+
+    def write(self, item: Dict[str, Any], detections: List[Dict[str, Any]], result_writer: ResultWriter) -> None:
+        frame_number = item["frame_number"]
+        store_frame_detections(
+            self.job_id, self.video_id, item["frame"], frame_number, frame_number / self.fps, detections,
+            result_writer, self.width, self.height,
+            analyzer=self.analyzer
+        )
+        self.events.extend(self.tracker.update(frame_number, detections))
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"tracker": self.tracker.state_dict(), "events": list(self.events)}
+
+    def load_state(self, state: Dict[str, Any], start_frame: int, result_writer: ResultWriter) -> None:
+        self.tracker.load_state(state["tracker"])
+        self.events.extend(state["events"])
+
+    def timeline(self) -> Dict[str, Any]:
+        self.events.extend(self.tracker.finish())
+        return build_detection_timeline(self.job_id, self.video_id, self.events)
+
+
+class MotionAnalyzer:
+    """
+    Motion detection as part of a composite job.
+
+    Runs on the region of interest of the shared decoded frame at full
+    resolution, like a motion job, and writes its results tagged with
+    "motion_detection".
+    """
+
+    # The background model is not checkpointed; it is rebuilt from the frames
+    # before the checkpoint when a job is resumed
+    needs_warmup = True
+
+    def __init__(
+        self,
+        job_id: int,
+        video_id: int,
+        params: Dict[str, Any],
+        fps: float,
+        frame_count: int,
+        width: int,
+        height: int,
+        frame_step: int
+    ):
+        self.analyzer = MOTION_ANALYZER
+        self.job_id = job_id
+        self.video_id = video_id
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frame_step = frame_step
+
+        self.preprocess = create_frame_preprocessor(params, width, height)
+        self.detector = create_motion_detector(params)
+        self.motion_frames: List[int] = []
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        return self.preprocess.region(frame)
+
+    def infer(self, inputs: List[np.ndarray]) -> List[Any]:
+        # Background model is stateful, so frames are handled strictly in order
+        results = []
+        for frame in inputs:
+            motion_detected, motion_areas = self.detector.detect(frame)
+            if self.preprocess.crop is not None:
+                dx, dy = self.preprocess.offset
+                motion_areas = [[x + dx, y + dy, w, h] for x, y, w, h in motion_areas]
+            results.append((motion_detected, motion_areas))
+        return results
+
+    def write(self, item: Dict[str, Any], result: Any, result_writer: ResultWriter) -> None:
+        motion_detected, motion_areas = result
+        frame_number = item["frame_number"]
+        store_frame_motion(
+            self.job_id, self.video_id, frame_number, frame_number / self.fps,
+            motion_detected, motion_areas, result_writer,
+            analyzer=self.analyzer
+        )
+        if motion_detected:
+            self.motion_frames.append(frame_number)
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {}
+
+    def load_state(self, state: Dict[str, Any], start_frame: int, result_writer: ResultWriter) -> None:
+        # Motion frames before the checkpoint are already stored
+        self.motion_frames.extend(
+            load_motion_frames(result_writer.db_mongo, self.job_id, start_frame, analyzer=self.analyzer)
+        )
+
+    def timeline(self) -> Dict[str, Any]:
+        motion_events = [(frame_number, frame_number / self.fps, None) for frame_number in self.motion_frames]
+        return create_motion_timeline(
+            self.job_id, self.video_id, motion_events, self.fps, self.frame_count,
+            frame_step=self.frame_step
+        )
+
+
+def process_composite_detection(db: Session, job: DetectionJob, video: Video) -> None:
+    """
+    Process a video with several analyzers at once.
+
+    Each frame is decoded once and handed to every analyzer in the job's
+    `analyzers` list; frame results, thumbnails and timelines are stored per
+    analyzer with an "analyzer" field. `analyzer_parameters` maps an analyzer
+    to parameters that override the job's for that analyzer only, such as
+    `conf_threshold`, `classes`, `imgsz` or `roi`.
+
+    Composite jobs run in the job's process with the OpenCV decoder; the
+    `parallel_segments`, `inference_workers`, `decoder` and `motion_gate`
+    parameters do not apply to them. Checkpoints work as for the other jobs;
+    a resumed job first runs `segment_warmup_frames` frames before the
+    checkpoint through its motion analyzer without storing them.
+
+    Args:
+        db: Database session
+        job: Detection job
+        video: Video to process
+    """
+    # Extract parameters
+    params = job.parameters or {}
+    analyzer_ids = validate_analyzers(params.get("analyzers"))
+
+    # Open video file
+    video_path = os.path.join(settings.LOCAL_STORAGE_PATH, video.file_path)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+
+    # Get video info
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    sampler = create_frame_sampler(params, fps, video_path)
+
+    analyzers = []
+    for analyzer_id in analyzer_ids:
+        analyzer_params = get_analyzer_parameters(params, analyzer_id)
+        if analyzer_id == MOTION_ANALYZER:
+            analyzers.append(MotionAnalyzer(
+                job.id, video.id, analyzer_params, fps, frame_count, width, height, sampler.frame_step
+            ))
+        else:
+            analyzers.append(YOLOAnalyzer(
+                analyzer_id, job.id, video.id, analyzer_params, fps, frame_count, width, height, sampler.frame_step
+            ))
+
+    # Connect to MongoDB
+    result_writer = create_result_writer(params)
+
+    start_frame = 0
+    resume = get_resume_state(job)
+    if resume is not None:
+        # Continue where the last checkpoint left off
+        start_frame = resume["frame"]
+        for analyzer in analyzers:
+            analyzer.load_state(resume["analyzers"][analyzer.analyzer], start_frame, result_writer)
+
+    # Let the motion background model converge before the checkpoint, as a motion job does
+    warmup_frames = 0
+    if start_frame > 0 and any(analyzer.needs_warmup for analyzer in analyzers):
+        warmup_frames = int(params.get("segment_warmup_frames", settings.DETECTION_SEGMENT_WARMUP_FRAMES))
+
+    progress = JobProgress(db, job, sampler, frame_count, start_frame=start_frame)
+    should_stop = JobControl(db, job).should_stop
+    checkpoint = create_checkpoint_saver(db, job)
+    checkpoint_timer = CheckpointTimer(params.get("checkpoint_interval"))
+    inference_time = {analyzer.analyzer: 0.0 for analyzer in analyzers}
+    last_frame = start_frame - 1
+
+    def prepare(frame: np.ndarray) -> Dict[str, np.ndarray]:
+        # Runs on the decoder thread: every analyzer's input from the same frame
+        return {analyzer.analyzer: analyzer.prepare(frame) for analyzer in analyzers}
+
+    def infer(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = [{} for _ in items]
+        for analyzer in analyzers:
+            # Warm-up frames only go to the analyzers that need them
+            indices = [
+                index for index, item in enumerate(items)
+                if analyzer.needs_warmup or item["frame_number"] >= start_frame
+            ]
+            if not indices:
+                continue
+
+            started = time.perf_counter()
+            outputs = analyzer.infer([items[index]["input"][analyzer.analyzer] for index in indices])
+            inference_time[analyzer.analyzer] += time.perf_counter() - started
+
+            for index, output in zip(indices, outputs):
+                results[index][analyzer.analyzer] = output
+        return results
+
+    def write(item: Dict[str, Any], results: Dict[str, Any]) -> None:
+        nonlocal last_frame
+        frame_number = item["frame_number"]
+        if frame_number < start_frame:
+            return  # Warm-up frame before the checkpoint
+
+        last_frame = frame_number
+        for analyzer in analyzers:
+            analyzer.write(item, results[analyzer.analyzer], result_writer)
+
+        progress.advance(1)
+
+        stopping = should_stop()
+        if stopping or checkpoint_timer.due():
+            # Results up to this frame must be stored before the checkpoint points past them
+            result_writer.flush()
+            checkpoint(frame_number + 1, {
+                "analyzers": {analyzer.analyzer: analyzer.state_dict() for analyzer in analyzers}
+            })
+
+        if stopping:
+            raise JobInterrupted(stopping, f"Job {job.id} stopped at frame {frame_number}")
+
+    pipeline = create_pipeline(
+        cap, params,
+        batch_size=max(1, int(params.get("batch_size", 1))),
+        sampler=sampler,
+        start_frame=max(0, start_frame - warmup_frames),
+        preprocess=prepare
+    )
+    try:
+        pipeline_stats = pipeline.run(infer, write)
+    finally:
+        cap.release()
+
+    progress.finish()
+
+    # Store one timeline per analyzer
+    for analyzer in analyzers:
+        timeline = analyzer.timeline()
+        timeline["analyzer"] = analyzer.analyzer
+        for event in timeline["events"]:
+            event["analyzer"] = analyzer.analyzer
+        result_writer.write_timeline(timeline)
+    result_writer.close()
+
+    update_job_stats(
+        db, job,
+        pipeline=pipeline_stats,
+        writer=result_writer.stats(),
+        analyzers={
+            analyzer_id: {"inference_time": round(seconds, 3)}
+            for analyzer_id, seconds in inference_time.items()
+        },
+        # Motion frames are stored sparsely; the sampling lets the API rebuild the others
+        sampling=describe_sampling(sampler, fps, last_frame + 1)
+    )
@@ -1,18 +1,41 @@
 # app/tasks/detection.py
 import os
+import copy
 import time
 import datetime
+import multiprocessing
+import queue
+from collections import Counter
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
 import cv2
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from pymongo import MongoClient
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.exceptions import JobInterrupted
 from app.models.detection import DetectionJob
 from app.models.video import Video
-from app.services.detection.yolo import YOLODetector
-from app.services.detection.motion_detect import detect_motion
+from app.services.detection.cache import reuse_cached_results
+from app.services.detection.result_writer import ResultWriter
+from app.services.detection.sparse_results import describe_sampling
+from app.services.detection.tracking import ObjectTracker, bridge_sampled_gap, stitch_tracks
+from app.services.detection.registry import model_registry
+from app.services.detection.motion import MotionDetector
+from app.tasks.frame_ring import SharedFrame, SharedFrameRing
+from app.tasks.inference_pool import InferenceWorkerPool
+from app.tasks.pipeline import FramePipeline
+from app.utils.video import FFmpegCapture, FramePreprocessor, FrameSampler, get_keyframe_numbers
+from app.utils.threads import apply_thread_budget, available_cores, get_thread_budget, split_threads
+
+# Seconds the decoder waits for a free shared frame slot before giving up
+FRAME_RING_TIMEOUT = 60.0
+
+# A segment process sends its frame count after this many frames or seconds,
+# and checks the stop flag at most this often
+SEGMENT_REPORT_FRAMES = 100
+SEGMENT_REPORT_INTERVAL = 0.5
 
 def start_detection_job(db: Session, job_id: int) -> None:
     """
@@ -36,23 +59,50 @@ def start_detection_job(db: Session, job_id: int) -> None:
         db.commit()
         return
     
-    # Update job status to in_progress
+    # Update job status to in_progress (a resumed job keeps its start time)
     job.status = "in_progress"
-    job.started_at = datetime.datetime.now()
+    job.started_at = job.started_at or datetime.datetime.now()
     db.commit()
     
     try:
-        # Process the video based on the model
-        if job.model_name.startswith("yolo"):
-            process_yolo_detection(db, job, video)
-        elif job.model_name == "motion_detection":
-            process_motion_detection(db, job, video)
-        else:
-            raise ValueError(f"Unsupported model: {job.model_name}")
+        # Reuse the results of an identical completed job when there is one
+        mongo_client = MongoClient(settings.MONGODB_URL)
+        reused = job.checkpoint_frame is None and reuse_cached_results(
+            db, mongo_client[settings.MONGODB_DB], job, video
+        )
+        
+        # Otherwise process the video based on the model
+        if not reused:
+            if job.model_name.startswith("yolo"):
+                process_yolo_detection(db, job, video)
+            elif job.model_name == "motion_detection":
+                process_motion_detection(db, job, video)
+            elif job.model_name == "composite":
+                # Imported here because the composite job builds on this module
+                from app.tasks.composite import process_composite_detection
+                process_composite_detection(db, job, video)
+            else:
+                raise ValueError(f"Unsupported model: {job.model_name}")
         
         # Update job status to completed
         job.status = "completed"
         job.completed_at = datetime.datetime.now()
+        job.requested_action = None
+        job.checkpoint_frame = None
+        job.checkpoint_state = None
+        db.commit()
+        
+    except JobInterrupted as e:
+        # Stopped on request; anything but a cancel keeps the checkpoint and progress
+        if e.action == "cancel":
+            job.status = "cancelled"
+            job.completed_at = datetime.datetime.now()
+            job.checkpoint_frame = None
+            job.checkpoint_state = None
+        else:
+            job.status = "paused"
+        job.requested_action = None
+        job.estimated_completion_at = None
         db.commit()
         
     except Exception as e:
@@ -65,25 +115,142 @@ def process_yolo_detection(db: Session, job: DetectionJob, video: Video) -> None
     """
     Process a video using YOLO object detection.
     
+    With the `parallel_segments` parameter the video is split into time
+    segments that are processed in a process pool, and the tracks cut at the
+    segment boundaries are stitched back together.
+    
+    A job processed in one piece saves checkpoints and continues from the
+    last one when it is restarted; a restarted segmented job runs again and
+    overwrites its earlier results.
+    
     Args:
         db: Database session
         job: Detection job
         video: Video to process
     """
-    # Initialize YOLO detector
-    model_path = os.path.join(settings.LOCAL_STORAGE_PATH, "models", f"{job.model_name}.pt")
-    if not os.path.exists(model_path):
-        model_path = f"{job.model_name}.pt"  # Use default model from ultralytics
+    # Extract parameters
+    params = job.parameters or {}
+    
+    # Get video info
+    video_path = os.path.join(settings.LOCAL_STORAGE_PATH, video.file_path)
+    fps, frame_count, _, _ = get_video_info(video_path)
+    sampler = create_frame_sampler(params, fps, video_path)
+    segments = plan_segments(frame_count, params)
+    resume = get_resume_state(job)
+    if resume is not None:
+        segments = [(0, None)]
+    progress = JobProgress(db, job, sampler, frame_count, start_frame=resume["frame"] if resume else 0)
+    
+    if len(segments) == 1:
+        result = process_yolo_segment(
+            job.id, video.id, job.model_name, params, video_path, sampler,
+            resume=resume,
+            checkpoint=create_checkpoint_saver(db, job),
+            progress=progress.advance,
+            should_stop=JobControl(db, job).should_stop
+        )
+        timeline_events = result["events"]
+        update_job_stats(db, job, **result["stats"])
+    else:
+        results = run_segments_in_parallel(process_yolo_segment, [
+            (job.id, video.id, job.model_name, params, video_path, sampler, start_frame, end_frame)
+            for start_frame, end_frame in segments
+        ], progress=progress.advance, should_stop=JobControl(db, job).should_stop)
+        
+        # Join the tracks that were cut at segment boundaries
+        tracker = ObjectTracker(fps, frame_count=frame_count, frame_step=sampler.frame_step)
+        stitched = stitch_tracks(
+            [(start_frame, result["boundary_tracks"]) for (start_frame, _), result in zip(segments, results)],
+            tracker.max_gap_frames,
+            tracker.iou_threshold
+        )
+        timeline_events = [event for result in results for event in result["events"]]
+        for track in stitched:
+            event = tracker.to_event(track["track_id"], track)
+            if event is not None:
+                timeline_events.append(event)
         
-    detector = YOLODetector(model_path)
+        # Track ids from different segments overlap, so number them again
+        timeline_events.sort(key=lambda e: (e["start_time"], e["first_frame"]))
+        for track_id, event in enumerate(timeline_events, start=1):
+            event["track_id"] = track_id
+        
+        update_job_stats(db, job, **merge_segment_stats(segments, results))
+    
+    progress.finish()
+    
+    # Create timeline
+    timeline = build_detection_timeline(job.id, video.id, timeline_events)
+    
+    # Store timeline in MongoDB
+    result_writer = create_result_writer(params)
+    result_writer.write_timeline(timeline)
+    result_writer.close()
+
+def process_yolo_segment(
+    job_id: int,
+    video_id: int,
+    model_name: str,
+    params: Dict[str, Any],
+    video_path: str,
+    sampler: FrameSampler,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    resume: Optional[Dict[str, Any]] = None,
+    checkpoint: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    should_stop: Optional[Callable[[], Optional[str]]] = None
+) -> Dict[str, Any]:
+    """
+    Run YOLO detection on a frame range of a video and store the frame results.
+    
+    Runs in the job's process for a whole video, or in a pool worker for one
+    segment; each call opens its own decoder and gets its own model.
     
+    Args:
+        job_id: Detection job ID
+        video_id: Video ID
+        model_name: YOLO model to use
+        params: Job parameters
+        video_path: Path to the video file
+        sampler: Selects the frames to analyze
+        start_frame: First frame of the range
+        end_frame: End of the range (exclusive), None for the end of the video
+        resume: Checkpoint to continue from ("frame", "tracker", "events")
+        checkpoint: Called periodically with the next frame to process and the
+            state needed to resume there
+        progress: Called with the number of frames analyzed since the last call
+        should_stop: Polled between frames; when it returns an action ("cancel"
+            or "pause") the results so far are stored (with a checkpoint) and
+            JobInterrupted is raised with that action
+        
+    Returns:
+        Dict with finished timeline "events", "boundary_tracks" to stitch and "stats"
+    """
     # Extract parameters
-    params = job.parameters or {}
     conf_threshold = params.get("conf_threshold", 0.25)
     classes = params.get("classes")
+    batch_size = max(1, int(params.get("batch_size", 1)))
+    imgsz = params.get("imgsz")
+    inference_workers = max(1, int(params.get("inference_workers", settings.DETECTION_INFERENCE_WORKERS)))
+    
+    # Each inference worker gets a batch_size batch from every pipeline batch,
+    # so all workers stay busy even with batch_size 1
+    pipeline_batch_size = batch_size * inference_workers
+    
+    cascade = None
+    if params.get("cascade_model"):
+        # The job's model screens every frame; uncertain frames go to the larger model
+        cascade = ModelCascade(
+            model_registry.get(params["cascade_model"], backend=params.get("backend")),
+            conf_threshold,
+            low=float(params.get("cascade_low", settings.DETECTION_CASCADE_LOW_CONFIDENCE)),
+            high=float(params.get("cascade_high", settings.DETECTION_CASCADE_HIGH_CONFIDENCE)),
+            class_change=bool(params.get("cascade_class_change", True))
+        )
+    screen_threshold = cascade.screen_threshold if cascade is not None else conf_threshold
     
     # Open video file
-    video_path = os.path.join(settings.LOCAL_STORAGE_PATH, video.file_path)
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Could not open video: {video_path}")
@@ -94,101 +261,1361 @@ def process_yolo_detection(db: Session, job: DetectionJob, video: Video) -> None
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
+    # Frames are cropped to the ROI and shrunk to the model input size on the decoder thread
+    preprocess = create_frame_preprocessor(params, width, height, max_size=imgsz)
+    
+    # ffmpeg crops and shrinks the frames itself, so they arrive prepared
+    cap, prepared = open_frame_decoder(cap, video_path, params, preprocess, fps, pipeline_batch_size)
+    
+    frame_ring = None
+    inference_pool = None
+    if inference_workers > 1:
+        # Model inputs go to the inference processes through a shared-memory
+        # ring; a slot is held from decoding until its batch is inferred
+        input_width, input_height = preprocess.size
+        frame_ring = SharedFrameRing(
+            params.get("decode_queue_size", settings.DETECTION_DECODE_QUEUE_SIZE) + pipeline_batch_size + 2,
+            (input_height, input_width, 3)
+        )
+        inference_pool = InferenceWorkerPool(
+            frame_ring,
+            model_name,
+            {**params, "conf_threshold": screen_threshold},
+            inference_workers,
+            threads=split_threads(get_thread_budget() or available_cores(), inference_workers),
+            batch_size=batch_size
+        )
+        detector = None
+    else:
+        # Get the shared YOLO detector from the model registry
+        detector = model_registry.get(model_name, backend=params.get("backend"))
+    
     # Connect to MongoDB
-    mongo_client = MongoClient(settings.MONGODB_URL)
-    db_mongo = mongo_client[settings.MONGODB_DB]
-    detection_collection = db_mongo["detection_results"]
-    thumbnail_collection = db_mongo["object_thumbnails"]
+    result_writer = create_result_writer(params)
     
-    # Process video frames
-    all_detections = []
-    frame_number = 0
+    # Tracks are built while frames are written; only active objects stay in memory
+    is_segment = start_frame > 0 or end_frame is not None
+    tracker = ObjectTracker(
+        fps,
+        frame_count=frame_count,
+        frame_step=sampler.frame_step,
+        segment=(start_frame, end_frame) if is_segment else None
+    )
+    timeline_events = []
+    
+    if resume is not None:
+        # Continue where the last checkpoint left off
+        tracker.load_state(resume["tracker"])
+        timeline_events.extend(resume["events"])
+        start_frame = resume["frame"]
+    
+    def run_model(frames: List[Any], regions: Optional[List[List[int]]] = None) -> List[List[Dict[str, Any]]]:
+        if inference_pool is not None:
+            # Frames are ring handles; the workers crop them in place
+            return inference_pool.infer(frames, regions)
+        
+        if regions is not None:
+            frames = [frame[y0:y1, x0:x1] for frame, (x0, y0, x1, y1) in zip(frames, regions)]
+        
+        # Perform detection on the whole batch in a single model call
+        if batch_size > 1:
+            return detector.detect_batch(
+                frames,
+                batch_size=batch_size,
+                conf_threshold=screen_threshold,
+                classes=classes,
+                imgsz=imgsz
+            )
+        
+        return [
+            detector.detect(frame, conf_threshold=screen_threshold, classes=classes, imgsz=imgsz)[0]
+            for frame in frames
+        ]
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    def run_detector(frames: List[Any], regions: Optional[List[List[int]]] = None) -> List[List[Dict[str, Any]]]:
+        if cascade is None:
+            return run_model(frames, regions)
         
-        timestamp = frame_number / fps
+        started = time.perf_counter()
+        results = run_model(frames, regions)
+        cascade.screen_time += time.perf_counter() - started
         
-        # Perform detection
-        detections, annotated_frame = detector.detect(
-            frame, 
-            conf_threshold=conf_threshold,
-            classes=classes
+        escalated = cascade.select(results)
+        if escalated:
+            started = time.perf_counter()
+            inputs = []
+            for index in escalated:
+                frame = frame_ring.view(frames[index]) if frame_ring is not None else frames[index]
+                if regions is not None:
+                    x0, y0, x1, y1 = regions[index]
+                    frame = frame[y0:y1, x0:x1]
+                inputs.append(frame)
+            
+            for index, detections in zip(escalated, cascade.detector.detect_batch(
+                inputs,
+                batch_size=batch_size,
+                conf_threshold=conf_threshold,
+                classes=classes,
+                imgsz=imgsz
+            )):
+                results[index] = detections
+            cascade.escalation_time += time.perf_counter() - started
+        
+        return results
+    
+    # The gates watch the region of interest at full resolution, or the prepared frame
+    gate_view = (lambda frame: frame) if prepared else preprocess.region
+    
+    motion_gate = None
+    warmup_frames = 0
+    if params.get("motion_gate"):
+        gate_scale = 1.0 if prepared else preprocess.scale
+        gate_width, gate_height = preprocess.size if prepared else preprocess.region_size
+        motion_gate = MotionGate(
+            gate_width,
+            gate_height,
+            # Prepared frames are already shrunk to the model input size
+            create_motion_detector(params, frame_scale=preprocess.scale if prepared else 1.0),
+            hold_frames=int(params.get("motion_hold_frames", max(int(fps), 10))),
+            crop=bool(params.get("motion_crop", False)),
+            crop_padding=int(params.get("motion_crop_padding", 32))
         )
         
-        # Store frame detections in MongoDB
-        frame_data = {
-            "job_id": job.id,
-            "video_id": video.id,
-            "frame_number": frame_number,
-            "timestamp": timestamp,
-            "detections": detections
+        # Let the background model converge before the segment starts
+        if start_frame > 0:
+            warmup_frames = int(params.get("segment_warmup_frames", settings.DETECTION_SEGMENT_WARMUP_FRAMES))
+    
+    duplicate_gate = None
+    if params.get("skip_duplicates"):
+        duplicate_gate = DuplicateFrameGate(
+            threshold=float(params.get("duplicate_threshold", settings.DETECTION_DUPLICATE_THRESHOLD)),
+            max_reuse=int(params.get("duplicate_max_reuse", settings.DETECTION_DUPLICATE_MAX_REUSE))
+        )
+    
+    def infer(items: List[Dict[str, Any]]) -> List[Tuple[List[Dict[str, Any]], bool]]:
+        results = [[] for _ in items]
+        reused = [False] * len(items)
+        
+        # Frames that go through YOLO, with the region (in model input coordinates) to run on
+        gated = []
+        for index, item in enumerate(items):
+            region = None
+            if motion_gate is not None:
+                # Only frames with (recent) motion go through YOLO
+                if item["frame_number"] < start_frame:
+                    motion_gate.warmup(gate_view(item["frame"]))
+                    continue
+                
+                region = motion_gate.update(item["frame_number"], gate_view(item["frame"]))
+                if region is None:
+                    continue
+                region = [int(round(v * gate_scale)) for v in region]
+            
+            if duplicate_gate is not None and duplicate_gate.check(gate_view(item["frame"])):
+                reused[index] = True
+                continue
+            
+            gated.append((index, region))
+        
+        if gated:
+            inputs = [items[index]["input"] for index, _ in gated]
+            regions = [region for _, region in gated] if motion_gate is not None else None
+            
+            for (index, region), detections in zip(gated, run_detector(inputs, regions)):
+                results[index] = detections if region is None else map_detections_to_frame(
+                    detections, offset=(region[0], region[1])
+                )
+        
+        if frame_ring is not None:
+            # The model inputs are no longer needed
+            for item in items:
+                frame_ring.release(item["input"])
+        
+        # Back from model input to original frame coordinates
+        results = [
+            map_detections_to_frame(detections, offset=preprocess.offset, scale=preprocess.scale)
+            for detections in results
+        ]
+        
+        if duplicate_gate is not None:
+            # Near-duplicates take the detections of the last analyzed frame before them
+            analyzed = {index for index, _ in gated}
+            for index in range(len(items)):
+                if reused[index]:
+                    results[index] = duplicate_gate.reuse()
+                elif index in analyzed:
+                    duplicate_gate.remember(results[index])
+        
+        return list(zip(results, reused))
+    
+    def write(item: Dict[str, Any], result: Tuple[List[Dict[str, Any]], bool]) -> None:
+        detections, reused = result
+        frame_number = item["frame_number"]
+        if frame_number < start_frame:
+            return  # Warm-up frame of the previous segment
+        
+        store_frame_detections(
+            job_id, video_id, item["frame"], frame_number, frame_number / fps, detections,
+            result_writer, width, height,
+            frame_transform=preprocess if prepared else None,
+            reused=reused
+        )
+        timeline_events.extend(tracker.update(frame_number, detections))
+        
+        if progress is not None:
+            progress(1)
+        
+        stopping = should_stop() if should_stop is not None else None
+        if stopping or (checkpoint is not None and checkpoint_timer.due()):
+            # Results up to this frame must be stored before the checkpoint points past them
+            result_writer.flush()
+            if checkpoint is not None:
+                checkpoint(frame_number + 1, {"tracker": tracker.state_dict(), "events": list(timeline_events)})
+        
+        if stopping:
+            raise JobInterrupted(stopping, f"Job {job_id} stopped at frame {frame_number}")
+    
+    def prepare_shared(frame: np.ndarray) -> SharedFrame:
+        # Runs on the decoder thread: prepare the model input straight into the ring
+        return frame_ring.write(frame if prepared else preprocess(frame), timeout=FRAME_RING_TIMEOUT)
+    
+    checkpoint_timer = CheckpointTimer(params.get("checkpoint_interval"))
+    pipeline = create_pipeline(
+        cap, params,
+        batch_size=pipeline_batch_size,
+        sampler=sampler,
+        start_frame=max(0, start_frame - warmup_frames),
+        end_frame=end_frame,
+        preprocess=prepare_shared if frame_ring is not None else (None if prepared else preprocess)
+    )
+    try:
+        pipeline_stats = pipeline.run(infer, write)
+    finally:
+        cap.release()
+        if inference_pool is not None:
+            inference_pool.close()
+            frame_ring.close()
+    
+    # Close the remaining tracks and write the remaining buffered results
+    timeline_events.extend(tracker.finish())
+    result_writer.close()
+    
+    stats = {"pipeline": pipeline_stats, "writer": result_writer.stats()}
+    if motion_gate is not None:
+        stats["motion_gate"] = motion_gate.stats()
+    if duplicate_gate is not None:
+        stats["duplicate_gate"] = duplicate_gate.stats()
+    if cascade is not None:
+        stats["cascade"] = {"model": params["cascade_model"], **cascade.stats()}
+    if inference_pool is not None:
+        stats["inference_workers"] = inference_pool.stats()
+    
+    return {
+        "events": timeline_events,
+        "boundary_tracks": tracker.boundary_tracks,
+        "stats": stats
+    }
+
+class MotionGate:
+    """
+    Decides which frames of a motion-gated YOLO job are worth running YOLO on.
+    
+    The cheap background-subtraction detector runs on every analyzed frame; a
+    frame passes the gate when it has motion or lies within `hold_frames`
+    frames after the last motion. When cropping is enabled the gate also
+    returns the padded region around the motion areas, so YOLO only sees the
+    part of the frame that changed.
+    """
+    
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        detector: MotionDetector,
+        hold_frames: int = 10,
+        crop: bool = False,
+        crop_padding: int = 32
+    ):
+        """
+        Args:
+            width: Frame width
+            height: Frame height
+            detector: Motion detector the gate owns
+            hold_frames: Frames to keep running YOLO after motion stops
+            crop: Whether to crop YOLO input to the motion region
+            crop_padding: Padding in pixels around the motion region
+        """
+        self.width = width
+        self.height = height
+        self.hold_frames = max(0, hold_frames)
+        self.crop = crop
+        self.crop_padding = max(0, crop_padding)
+        self.detector = detector
+        
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self._last_motion_frame = None
+        self._last_region = None
+    
+    def update(self, frame_number: int, frame: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Feed the next frame to the motion detector.
+        
+        Args:
+            frame_number: Index of the frame in the video
+            frame: Decoded frame
+            
+        Returns:
+            Region (x0, y0, x1, y1) to run YOLO on, or None to skip the frame
+        """
+        motion_detected, motion_areas = self.detector.detect(frame)
+        
+        if motion_detected:
+            self._last_motion_frame = frame_number
+            self._last_region = self._region(motion_areas) if self.crop else None
+        elif (
+            self._last_motion_frame is None
+            or frame_number - self._last_motion_frame > self.hold_frames
+        ):
+            self.frames_skipped += 1
+            return None
+        
+        self.frames_analyzed += 1
+        return self._last_region or (0, 0, self.width, self.height)
+    
+    def warmup(self, frame: np.ndarray) -> None:
+        """
+        Feed a frame to the background model only, without gating or counting it.
+        """
+        self.detector.detect(frame)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the number of frames that went through YOLO and that were skipped.
+        """
+        total = self.frames_analyzed + self.frames_skipped
+        return {
+            "frames_analyzed": self.frames_analyzed,
+            "frames_skipped": self.frames_skipped,
+            "skip_rate": round(self.frames_skipped / total, 4) if total else 0.0
+        }
+    
+    def _region(self, motion_areas: List[List[float]]) -> Tuple[int, int, int, int]:
+        """
+        Get the padded bounding region of all motion areas, clipped to the frame.
+        """
+        x0 = min(area[0] for area in motion_areas) - self.crop_padding
+        y0 = min(area[1] for area in motion_areas) - self.crop_padding
+        x1 = max(area[0] + area[2] for area in motion_areas) + self.crop_padding
+        y1 = max(area[1] + area[3] for area in motion_areas) + self.crop_padding
+        
+        return (
+            max(0, int(x0)),
+            max(0, int(y0)),
+            min(self.width, int(x1)),
+            min(self.height, int(y1))
+        )
+
+class DuplicateFrameGate:
+    """
+    Spots frames that are nearly identical to the last frame YOLO analyzed.
+    
+    Fixed cameras produce long runs of frames that differ only by sensor
+    noise. Each frame is reduced to a small grayscale signature and compared
+    with the signature of the last analyzed frame; when the mean absolute
+    difference is below `threshold` the frame reuses that frame's detections
+    instead of going through YOLO. Comparing against the last analyzed frame
+    rather than the previous one lets slow changes add up until they trigger
+    a new analysis, and `max_reuse` forces one after that many reused frames
+    in a row.
+    """
+    
+    SIGNATURE_SIZE = (32, 32)
+    
+    def __init__(self, threshold: float = 2.0, max_reuse: int = 0):
+        """
+        Args:
+            threshold: Mean gray-level difference (0-255) below which a frame is a near-duplicate
+            max_reuse: Near-duplicates in a row before a frame is analyzed anyway (0 = no limit)
+        """
+        self.threshold = threshold
+        self.max_reuse = max(0, max_reuse)
+        
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self._reference = None
+        self._reused_in_row = 0
+        self._detections: List[Dict[str, Any]] = []
+    
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Compare the next frame with the last analyzed one.
+        
+        Args:
+            frame: Decoded frame
+            
+        Returns:
+            True if the frame should reuse the last detections, False if it
+            must be analyzed (it then becomes the new reference)
+        """
+        signature = self._signature(frame)
+        if (
+            self._reference is not None
+            and (self.max_reuse == 0 or self._reused_in_row < self.max_reuse)
+            and float(cv2.absdiff(signature, self._reference).mean()) < self.threshold
+        ):
+            self._reused_in_row += 1
+            self.frames_skipped += 1
+            return True
+        
+        self._reference = signature
+        self._reused_in_row = 0
+        self.frames_analyzed += 1
+        return False
+    
+    def remember(self, detections: List[Dict[str, Any]]) -> None:
+        """
+        Keep the detections of an analyzed frame for the near-duplicates after it.
+        """
+        self._detections = detections
+    
+    def reuse(self) -> List[Dict[str, Any]]:
+        """
+        Get a copy of the last analyzed frame's detections.
+        """
+        return copy.deepcopy(self._detections)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the number of frames that went through YOLO and that reused detections.
+        """
+        total = self.frames_analyzed + self.frames_skipped
+        return {
+            "frames_analyzed": self.frames_analyzed,
+            "frames_skipped": self.frames_skipped,
+            "skip_rate": round(self.frames_skipped / total, 4) if total else 0.0
         }
-        detection_collection.insert_one(frame_data)
+    
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+class ModelCascade:
+    """
+    Decides which frames of a cascaded YOLO job go to the larger model.
+    
+    The job's own (small) model screens every frame with its confidence
+    threshold lowered to the bottom of the uncertainty band. A frame is
+    escalated to the larger model when one of its detections falls inside
+    the band [low, high), or, with `class_change`, when the classes it
+    contains (with their counts) differ from those of the previous screened
+    frame. Frames that are not escalated keep the small model's detections
+    at or above the job's confidence threshold.
+    """
+    
+    def __init__(
+        self,
+        detector,
+        conf_threshold: float,
+        low: float = 0.1,
+        high: float = 0.5,
+        class_change: bool = True
+    ):
+        """
+        Args:
+            detector: Larger model the uncertain frames are escalated to
+            conf_threshold: Confidence threshold of the job
+            low: Bottom of the uncertainty band
+            high: Top of the uncertainty band (exclusive)
+            class_change: Whether a change of the class mix escalates a frame
+        """
+        self.detector = detector
+        self.conf_threshold = conf_threshold
+        self.low = low
+        self.high = high
+        self.class_change = class_change
         
-        # Process thumbnail for each detected object
-        for detection in detections:
-            # Get bounding box
-            x, y, w, h = detection["bbox"]
+        self.frames_screened = 0
+        self.frames_escalated = 0
+        self.uncertain_frames = 0
+        self.class_change_frames = 0
+        self.screen_time = 0.0
+        self.escalation_time = 0.0
+        self._class_mix = None
+    
+    @property
+    def screen_threshold(self) -> float:
+        """
+        Confidence threshold the small model runs with.
+        """
+        return min(self.conf_threshold, self.low)
+    
+    def select(self, detections: List[List[Dict[str, Any]]]) -> List[int]:
+        """
+        Pick the frames to escalate from the small model's detections.
+        
+        Frames must be passed in video order. The detection lists are reduced
+        to the detections at or above the job's threshold in place.
+        
+        Args:
+            detections: Small model detections per frame
             
-            # Ensure valid bounding box
-            x = max(0, int(x))
-            y = max(0, int(y))
-            w = min(int(w), width - x)
-            h = min(int(h), height - y)
+        Returns:
+            Indices of the frames to run the larger model on
+        """
+        escalated = []
+        for index, frame_detections in enumerate(detections):
+            confident = [d for d in frame_detections if d["confidence"] >= self.conf_threshold]
+            uncertain = any(self.low <= d["confidence"] < self.high for d in frame_detections)
             
-            if w <= 0 or h <= 0:
-                continue
+            class_mix = Counter(d["class_id"] for d in confident)
+            changed = self.class_change and self._class_mix is not None and class_mix != self._class_mix
+            self._class_mix = class_mix
             
-            # Extract thumbnail
-            thumbnail = frame[y:y+h, x:x+w]
+            self.frames_screened += 1
+            self.uncertain_frames += uncertain
+            self.class_change_frames += changed
+            if uncertain or changed:
+                self.frames_escalated += 1
+                escalated.append(index)
             
-            # Save thumbnail image
-            thumbnail_filename = f"{job.id}_{frame_number}_{detection['class_name']}_{int(time.time()*1000)}.jpg"
-            thumbnail_path = os.path.join(
-                settings.LOCAL_STORAGE_PATH,
-                "thumbnails",
-                thumbnail_filename
-            )
+            detections[index] = confident
+        
+        return escalated
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the number of screened and escalated frames and the time spent in each stage.
+        """
+        return {
+            "frames_screened": self.frames_screened,
+            "frames_escalated": self.frames_escalated,
+            "uncertain_frames": self.uncertain_frames,
+            "class_change_frames": self.class_change_frames,
+            "escalation_rate": round(self.frames_escalated / self.frames_screened, 4) if self.frames_screened else 0.0,
+            "screen_time": round(self.screen_time, 3),
+            "escalation_time": round(self.escalation_time, 3)
+        }
+
+def map_detections_to_frame(
+    detections: List[Dict[str, Any]],
+    offset: Tuple[float, float] = (0, 0),
+    scale: float = 1.0
+) -> List[Dict[str, Any]]:
+    """
+    Map detections found on a cropped and/or resized image back to frame coordinates.
+    
+    Args:
+        detections: Detections in the coordinates of the model input
+        offset: Position (x, y) of the model input inside the original frame
+        scale: Factor the model input was resized by
+        
+    Returns:
+        Detections in original frame coordinates
+    """
+    if offset == (0, 0) and scale == 1.0:
+        return detections
+    
+    dx, dy = offset
+    for detection in detections:
+        x, y, w, h = detection["bbox"]
+        detection["bbox"] = [
+            float(x / scale + dx),
+            float(y / scale + dy),
+            float(w / scale),
+            float(h / scale)
+        ]
+    
+    return detections
+
+def create_frame_sampler(params: Dict[str, Any], fps: float, video_path: str) -> FrameSampler:
+    """
+    Build the frame sampler for a job from its parameters.
+    
+    Supported parameters:
+    - keyframes_only: analyze only the key frames (I-frames) of the video
+    - target_fps: analyze roughly this many frames per second
+    - frame_stride: analyze every n-th frame
+    
+    Args:
+        params: Job parameters
+        fps: Frames per second of the video
+        video_path: Path to the video file
+        
+    Returns:
+        Frame sampler
+    """
+    if params.get("keyframes_only"):
+        keyframes = get_keyframe_numbers(video_path, fps)
+        if not keyframes:
+            raise ValueError(f"Could not find key frames in video: {video_path}")
+        return FrameSampler(keyframes=keyframes)
+    
+    stride = int(params.get("frame_stride", 1))
+    target_fps = params.get("target_fps")
+    if target_fps and fps:
+        stride = max(stride, int(round(fps / float(target_fps))))
+    
+    return FrameSampler(stride=stride)
+
+def create_frame_preprocessor(
+    params: Dict[str, Any],
+    width: int,
+    height: int,
+    max_size: Optional[int] = None
+) -> FramePreprocessor:
+    """
+    Create the frame preprocessor for a job from its `roi` parameter.
+    
+    Args:
+        params: Job parameters
+        width: Frame width
+        height: Frame height
+        max_size: Maximum longest side of the model input (the model's imgsz)
+        
+    Returns:
+        Frame preprocessor
+    """
+    return FramePreprocessor(width, height, roi=params.get("roi"), max_size=max_size)
+
+def create_motion_detector(params: Dict[str, Any], frame_scale: float = 1.0) -> MotionDetector:
+    """
+    Create a motion detector for a job from its parameters.
+    
+    Supported parameters:
+    - motion_method: running_average, mog2 or knn
+    - motion_analysis_size: longest side of the frames the detector analyzes
+      (0 for full resolution)
+    - motion_min_area: smallest moving area in full-resolution pixels
+    
+    Args:
+        params: Job parameters
+        frame_scale: Size of the frames the detector gets relative to full
+            resolution, e.g. when the decoder already shrinks them
+        
+    Returns:
+        Motion detector with a fresh background model
+    """
+    return MotionDetector(
+        method=params.get("motion_method") or settings.MOTION_METHOD,
+        analysis_size=params.get("motion_analysis_size", settings.MOTION_ANALYSIS_SIZE) or None,
+        min_area=params.get("motion_min_area", settings.MOTION_MIN_AREA),
+        frame_scale=frame_scale
+    )
+
+def open_frame_decoder(
+    cap,
+    video_path: str,
+    params: Dict[str, Any],
+    preprocess: FramePreprocessor,
+    fps: float,
+    batch_size: int = 1,
+    gray: bool = False
+) -> Tuple[Any, bool]:
+    """
+    Pick the frame decoder for a job from its `decoder` parameter.
+    
+    With "ffmpeg" the OpenCV capture is replaced by an ffmpeg pipe that crops,
+    scales and (for `gray`) converts the frames itself, so the pipeline must
+    not preprocess them again. Its ring of frame buffers is sized to outlast
+    every frame the pipeline can hold in its queues at once.
+    
+    Args:
+        cap: Opened OpenCV capture, used with the "opencv" decoder
+        video_path: Path to the video file
+        params: Job parameters
+        preprocess: Crop and resize to apply to the frames
+        fps: Frames per second of the video
+        batch_size: Number of frames handed to the inference stage at once
+        gray: Whether the frames are only needed in grayscale
+        
+    Returns:
+        Tuple of (capture, prepared), where prepared is True when the decoder
+        already applied `preprocess`
+    """
+    decoder = params.get("decoder") or settings.DETECTION_DECODER
+    if decoder == "opencv":
+        return cap, False
+    if decoder != "ffmpeg":
+        raise ValueError(f"Unknown decoder '{decoder}', expected 'opencv' or 'ffmpeg'")
+    
+    cap.release()
+    ring_size = (
+        params.get("decode_queue_size", settings.DETECTION_DECODE_QUEUE_SIZE)
+        + params.get("write_queue_size", settings.DETECTION_WRITE_QUEUE_SIZE)
+        + 2 * batch_size + 4
+    )
+    ffmpeg_cap = FFmpegCapture(
+        video_path,
+        fps,
+        preprocess.size,
+        crop=preprocess.crop,
+        gray=gray,
+        ring_size=ring_size,
+        threads=get_thread_budget()
+    )
+    return ffmpeg_cap, True
+
+def create_pipeline(
+    cap,
+    params: Dict[str, Any],
+    batch_size: int = 1,
+    sampler: Optional[FrameSampler] = None,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    preprocess: Optional[Callable[[np.ndarray], Any]] = None
+) -> FramePipeline:
+    """
+    Build the decode / inference / write pipeline for a job.
+    
+    Queue sizes can be overridden per job with the `decode_queue_size` and
+    `write_queue_size` parameters.
+    
+    Args:
+        cap: Opened video capture
+        params: Job parameters
+        batch_size: Number of frames handed to the inference stage at once
+        sampler: Selects the frames to analyze
+        start_frame: First frame to decode
+        end_frame: Stop decoding at this frame (exclusive), None for the end of the video
+        preprocess: Prepares the model input from each decoded frame
+            (a FramePreprocessor, or a callable returning a shared frame handle)
+        
+    Returns:
+        Frame pipeline
+    """
+    return FramePipeline(
+        cap,
+        batch_size=batch_size,
+        sampler=sampler,
+        start_frame=start_frame,
+        end_frame=end_frame,
+        preprocess=preprocess,
+        decode_queue_size=params.get("decode_queue_size", settings.DETECTION_DECODE_QUEUE_SIZE),
+        write_queue_size=params.get("write_queue_size", settings.DETECTION_WRITE_QUEUE_SIZE),
+    )
+
+def get_video_info(video_path: str) -> Tuple[float, int, int, int]:
+    """
+    Read basic stream properties of a video.
+    
+    Args:
+        video_path: Path to the video file
+        
+    Returns:
+        Tuple of (fps, frame_count, width, height)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    
+    try:
+        return (
+            cap.get(cv2.CAP_PROP_FPS),
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        )
+    finally:
+        cap.release()
+
+def create_result_writer(params: Dict[str, Any]) -> ResultWriter:
+    """
+    Connect to MongoDB and create the buffered result writer for a job.
+    
+    Args:
+        params: Job parameters (`write_batch_size`, `write_flush_interval`)
+        
+    Returns:
+        Result writer
+    """
+    mongo_client = MongoClient(settings.MONGODB_URL)
+    db_mongo = mongo_client[settings.MONGODB_DB]
+    return ResultWriter(
+        db_mongo,
+        batch_size=params.get("write_batch_size"),
+        flush_interval=params.get("write_flush_interval")
+    )
+
+def plan_segments(frame_count: int, params: Dict[str, Any]) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a video into frame ranges for segment-parallel processing.
+    
+    The number of segments comes from the `parallel_segments` parameter and is
+    capped by the CPU count and a minimum segment length.
+    
+    Args:
+        frame_count: Total number of frames
+        params: Job parameters
+        
+    Returns:
+        List of (start_frame, end_frame) with end_frame None for the last segment
+    """
+    requested = int(params.get("parallel_segments", 1))
+    max_by_length = frame_count // max(1, settings.DETECTION_MIN_SEGMENT_FRAMES)
+    count = min(requested, os.cpu_count() or 1, max_by_length)
+    
+    if count <= 1:
+        return [(0, None)]
+    
+    bounds = [i * frame_count // count for i in range(count)]
+    return [
+        (start_frame, bounds[i + 1] if i + 1 < count else None)
+        for i, start_frame in enumerate(bounds)
+    ]
+
+class SegmentChannel:
+    """
+    Progress and stop signals between a segment process and the job process.
+    
+    Both go through a multiprocessing Manager, where every call is a round
+    trip to the manager process, so frame counts are sent in batches and the
+    stop request is read at most every `interval` seconds.
+    """
+    
+    def __init__(
+        self,
+        progress_queue,
+        stop_action,
+        max_frames: int = SEGMENT_REPORT_FRAMES,
+        interval: float = SEGMENT_REPORT_INTERVAL
+    ):
+        """
+        Args:
+            progress_queue: Manager queue the frame counts are put on
+            stop_action: Manager value holding the action the segments must stop
+                for ("cancel" or "pause"), None while they keep going
+            max_frames: Frames counted before they are sent
+            interval: Seconds between sends and between stop request reads
+        """
+        self.progress_queue = progress_queue
+        self.stop_action = stop_action
+        self.max_frames = max_frames
+        self.interval = interval
+        
+        self._frames = 0
+        self._last_sent = time.monotonic()
+        self._last_checked = 0.0
+        self._stopping: Optional[str] = None
+    
+    def progress(self, frames: int = 1) -> None:
+        self._frames += frames
+        if self._frames >= self.max_frames or time.monotonic() - self._last_sent >= self.interval:
+            self.flush()
+    
+    def should_stop(self) -> Optional[str]:
+        if not self._stopping and time.monotonic() - self._last_checked >= self.interval:
+            self._stopping = self.stop_action.value
+            self._last_checked = time.monotonic()
+        return self._stopping
+    
+    def flush(self) -> None:
+        """
+        Send the frames counted since the last send.
+        """
+        if self._frames:
+            self.progress_queue.put(self._frames)
+            self._frames = 0
+        self._last_sent = time.monotonic()
+
+def run_segment(task: Callable[..., Dict[str, Any]], args: tuple, channel: SegmentChannel) -> Dict[str, Any]:
+    """
+    Run a segment task in a pool worker, sending its last frame count at the end.
+    """
+    try:
+        return task(*args, progress=channel.progress, should_stop=channel.should_stop)
+    finally:
+        channel.flush()
+
+def run_segments_in_parallel(
+    task: Callable[..., Dict[str, Any]],
+    segment_args: List[tuple],
+    progress: Optional[Callable[[int], None]] = None,
+    should_stop: Optional[Callable[[], Optional[str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run one task per segment in a process pool.
+    
+    Workers are spawned rather than forked so that no decoder, model or
+    database connection state is inherited from the job process, and each
+    gets an equal share of the job's CPU threads. Workers
+    report analyzed frames in batches through a queue that is forwarded to
+    `progress` in this process, and are told to stop through a shared value
+    once `should_stop` returns an action.
+    
+    Args:
+        task: Module-level segment function
+        segment_args: Positional arguments for each segment, in video order
+        progress: Called with the number of frames analyzed by any segment
+        should_stop: Polled while the segments run
+        
+    Returns:
+        Task results in segment order
+    """
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    progress_queue = manager.Queue()
+    stop_action = manager.Value(str, None)
+    
+    # Share the job's thread budget between the segment workers
+    threads = split_threads(get_thread_budget() or available_cores(), len(segment_args))
+    executor = ProcessPoolExecutor(
+        max_workers=len(segment_args),
+        mp_context=context,
+        initializer=apply_thread_budget,
+        initargs=(threads,)
+    )
+    try:
+        futures = [
+            executor.submit(run_segment, task, args, SegmentChannel(progress_queue, stop_action))
+            for args in segment_args
+        ]
+        
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=1.0, return_when=FIRST_EXCEPTION)
             
-            # Make sure thumbnails directory exists
-            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            # Forward frame counts reported by the segments
+            frames = 0
+            while True:
+                try:
+                    frames += progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if frames and progress is not None:
+                progress(frames)
             
-            # Write thumbnail to file
-            cv2.imwrite(thumbnail_path, thumbnail)
+            requested = should_stop() if should_stop is not None else None
+            if requested:
+                stop_action.value = requested
             
-            # Store thumbnail reference in MongoDB
-            thumbnail_data = {
-                "job_id": job.id,
-                "video_id": video.id,
-                "frame_number": frame_number,
-                "timestamp": timestamp,
-                "class_id": detection["class_id"],
-                "class_name": detection["class_name"],
-                "confidence": detection["confidence"],
-                "bbox": detection["bbox"],
-                "thumbnail_url": f"/api/v1/detection/thumbnails/{job.id}/{thumbnail_filename}"
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()
+        
+        return [future.result() for future in futures]
+    except BaseException:
+        # Stop the other segments, or the shutdown below waits for them to finish
+        stop_action.value = "cancel"
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        manager.shutdown()
+
+def merge_segment_stats(
+    segments: List[Tuple[int, Optional[int]]],
+    results: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Combine the statistics of all segments of a job.
+    
+    Args:
+        segments: Frame ranges of the segments
+        results: Segment results, in the same order
+        
+    Returns:
+        Job statistics with per-segment details and summed gate counts
+    """
+    stats = {
+        "segments": [
+            {"start_frame": start_frame, "end_frame": end_frame, **result["stats"]}
+            for (start_frame, end_frame), result in zip(segments, results)
+        ]
+    }
+    
+    for gate in ("motion_gate", "duplicate_gate"):
+        gate_stats = [result["stats"][gate] for result in results if gate in result["stats"]]
+        if gate_stats:
+            analyzed = sum(g["frames_analyzed"] for g in gate_stats)
+            skipped = sum(g["frames_skipped"] for g in gate_stats)
+            stats[gate] = {
+                "frames_analyzed": analyzed,
+                "frames_skipped": skipped,
+                "skip_rate": round(skipped / (analyzed + skipped), 4) if analyzed + skipped else 0.0
             }
-            thumbnail_collection.insert_one(thumbnail_data)
+    
+    cascade_stats = [result["stats"]["cascade"] for result in results if "cascade" in result["stats"]]
+    if cascade_stats:
+        counts = {
+            key: sum(c[key] for c in cascade_stats)
+            for key in ("frames_screened", "frames_escalated", "uncertain_frames", "class_change_frames")
+        }
+        stats["cascade"] = {
+            "model": cascade_stats[0]["model"],
+            **counts,
+            "escalation_rate": round(counts["frames_escalated"] / counts["frames_screened"], 4) if counts["frames_screened"] else 0.0,
+            "screen_time": round(sum(c["screen_time"] for c in cascade_stats), 3),
+            "escalation_time": round(sum(c["escalation_time"] for c in cascade_stats), 3)
+        }
+    
+    return stats
+
+class CheckpointTimer:
+    """
+    Tells a processing loop when the next job checkpoint is due.
+    """
+    
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Args:
+            interval: Seconds between checkpoints (defaults to the setting)
+        """
+        self.interval = float(interval if interval is not None else settings.DETECTION_CHECKPOINT_INTERVAL)
+        self._last = time.monotonic()
+    
+    def due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
         
-        all_detections.append(detections)
-        frame_number += 1
+        self._last = now
+        return True
+
+class JobProgress:
+    """
+    Keeps the progress fields of a detection job up to date.
     
-    cap.release()
+    Frames are counted on every call to `advance()`, but the job row is only
+    written every `interval` seconds. The processing rate is measured over
+    the frames since the previous write, and the completion estimate assumes
+    the remaining frames are processed at that rate.
+    """
     
-    # Create timeline
-    timeline = create_detection_timeline(job.id, video.id, all_detections, fps, frame_count)
+    def __init__(
+        self,
+        db: Session,
+        job: DetectionJob,
+        sampler: FrameSampler,
+        frame_count: int,
+        start_frame: int = 0,
+        interval: Optional[float] = None
+    ):
+        """
+        Args:
+            db: Database session
+            job: Detection job
+            sampler: Selects the frames to analyze
+            frame_count: Total number of frames in the video
+            start_frame: Frame the job starts (or resumes) at
+            interval: Seconds between database updates (defaults to the setting)
+        """
+        self.db = db
+        self.job = job
+        self.interval = interval if interval is not None else settings.DETECTION_PROGRESS_INTERVAL
+        
+        self.total_frames = sampler.count_frames(frame_count)
+        self.frames_processed = sampler.count_frames(start_frame) if start_frame else 0
+        self._last_frames = self.frames_processed
+        self._last_time = time.monotonic()
+        
+        job.total_frames = self.total_frames
+        job.frames_processed = self.frames_processed
+        job.processing_fps = None
+        job.estimated_completion_at = None
+        db.commit()
     
-    # Store timeline in MongoDB
-    timeline_collection = db_mongo["timelines"]
-    timeline_collection.insert_one(timeline)
+    def advance(self, frames: int = 1) -> None:
+        """
+        Count analyzed frames and write the progress when it is due.
+        """
+        self.frames_processed += frames
+        if time.monotonic() - self._last_time >= self.interval:
+            self.report()
+    
+    def report(self) -> None:
+        """
+        Write the current progress, rate and completion estimate to the job.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        fps = (self.frames_processed - self._last_frames) / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total_frames - self.frames_processed)
+        
+        self.job.frames_processed = min(self.frames_processed, self.total_frames)
+        self.job.processing_fps = round(fps, 2)
+        self.job.estimated_completion_at = (
+            datetime.datetime.now() + datetime.timedelta(seconds=remaining / fps) if fps > 0 else None
+        )
+        self.db.commit()
+        
+        self._last_frames = self.frames_processed
+        self._last_time = now
+    
+    def finish(self) -> None:
+        """
+        Mark all frames as processed.
+        """
+        self.frames_processed = self.total_frames
+        self.report()
+        self.job.estimated_completion_at = None
+        self.db.commit()
+
+class JobControl:
+    """
+    Polls a running job for a cancel or pause request.
+    
+    The database is read at most every `interval` seconds, so the check is
+    cheap enough to call for every processed frame.
+    """
+    
+    def __init__(self, db: Session, job: DetectionJob, interval: Optional[float] = None):
+        """
+        Args:
+            db: Database session
+            job: Detection job
+            interval: Seconds between database reads (defaults to the setting)
+        """
+        self.db = db
+        self.job = job
+        self.interval = interval if interval is not None else settings.DETECTION_CONTROL_POLL_INTERVAL
+        self._last_check = time.monotonic()
+    
+    def should_stop(self) -> Optional[str]:
+        """
+        Returns:
+            The requested action ("cancel" or "pause"), or None to keep going
+        """
+        # Re-read even after a request was seen, since a pause can be withdrawn
+        if time.monotonic() - self._last_check >= self.interval:
+            self.db.refresh(self.job, attribute_names=["requested_action"])
+            self._last_check = time.monotonic()
+        
+        if self.job.requested_action in ("cancel", "pause"):
+            return self.job.requested_action
+        return None
+
+def create_checkpoint_saver(db: Session, job: DetectionJob) -> Callable[[int, Dict[str, Any]], None]:
+    """
+    Create the callback that stores a job checkpoint in the database.
+    
+    Args:
+        db: Database session
+        job: Detection job
+        
+    Returns:
+        Function taking the next frame to process and the state to resume with
+    """
+    def save_checkpoint(frame_number: int, state: Dict[str, Any]) -> None:
+        job.checkpoint_frame = frame_number
+        job.checkpoint_state = state
+        job.heartbeat_at = datetime.datetime.now()
+        db.commit()
+    
+    return save_checkpoint
+
+def get_resume_state(job: DetectionJob) -> Optional[Dict[str, Any]]:
+    """
+    Get the checkpoint a restarted job continues from.
+    
+    Args:
+        job: Detection job
+        
+    Returns:
+        Checkpoint state with the next "frame" to process, or None to start from the beginning
+    """
+    if not job.checkpoint_frame:
+        return None
+    
+    return {**(job.checkpoint_state or {}), "frame": job.checkpoint_frame}
+
+def update_job_stats(db: Session, job: DetectionJob, **values: Any) -> None:
+    """
+    Merge processing statistics into the job's stats.
+    
+    Args:
+        db: Database session
+        job: Detection job
+        **values: Statistics to store, keyed by section name
+    """
+    # Assign a new dict so SQLAlchemy notices the JSON change
+    job.stats = {**(job.stats or {}), **values}
+    db.commit()
+
+def store_frame_detections(
+    job_id: int,
+    video_id: int,
+    frame: np.ndarray,
+    frame_number: int,
+    timestamp: float,
+    detections: List[Dict[str, Any]],
+    result_writer: ResultWriter,
+    width: int,
+    height: int,
+    frame_transform: Optional[FramePreprocessor] = None,
+    analyzer: Optional[str] = None,
+    reused: bool = False
+) -> None:
+    """
+    Store the detections of one frame and a thumbnail for each detected object.
+    
+    Frames that reused the detections of a near-duplicate frame are marked
+    as such and get no thumbnails of their own.
+    
+    Args:
+        job_id: Detection job ID
+        video_id: Video ID
+        frame: Decoded frame the detections belong to
+        frame_number: Index of the frame in the video
+        timestamp: Frame time in seconds
+        detections: Detections for the frame
+        result_writer: Buffered writer for frame results and thumbnails
+        width: Frame width
+        height: Frame height
+        frame_transform: Crop and scale already applied to `frame` while decoding
+        analyzer: Analyzer of a composite job the detections come from
+        reused: Whether the detections were copied from an earlier, near-identical frame
+    """
+    if frame_transform is not None:
+        height, width = frame.shape[:2]
+    
+    # Store frame detections in MongoDB
+    frame_data = {
+        "job_id": job_id,
+        "video_id": video_id,
+        "frame_number": frame_number,
+        "timestamp": timestamp,
+        "detections": detections
+    }
+    if analyzer is not None:
+        frame_data["analyzer"] = analyzer
+    if reused:
+        frame_data["reused"] = True
+    result_writer.add_frame(frame_data)
+    
+    if reused:
+        return
+    
+    # Process thumbnail for each detected object
+    for object_index, detection in enumerate(detections):
+        # Get bounding box
+        x, y, w, h = detection["bbox"]
+        if frame_transform is not None:
+            # Into the coordinates of the cropped and scaled frame
+            dx, dy = frame_transform.offset
+            scale = frame_transform.scale
+            x, y, w, h = (x - dx) * scale, (y - dy) * scale, w * scale, h * scale
+        
+        # Ensure valid bounding box
+        x = max(0, int(x))
+        y = max(0, int(y))
+        w = min(int(w), width - x)
+        h = min(int(h), height - y)
+        
+        if w <= 0 or h <= 0:
+            continue
+        
+        # Extract thumbnail
+        thumbnail = frame[y:y+h, x:x+w]
+        
+        # Save thumbnail image
+        # Named by position so a resumed job overwrites instead of duplicating
+        thumbnail_filename = f"{job_id}_{frame_number}_{object_index}_{detection['class_name']}.jpg"
+        if analyzer is not None:
+            thumbnail_filename = f"{job_id}_{analyzer}_{frame_number}_{object_index}_{detection['class_name']}.jpg"
+        thumbnail_path = os.path.join(
+            settings.LOCAL_STORAGE_PATH,
+            "thumbnails",
+            thumbnail_filename
+        )
+        
+        # Make sure thumbnails directory exists
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        
+        # Write thumbnail to file
+        cv2.imwrite(thumbnail_path, thumbnail)
+        
+        # Store thumbnail reference in MongoDB
+        thumbnail_data = {
+            "job_id": job_id,
+            "video_id": video_id,
+            "frame_number": frame_number,
+            "object_index": object_index,
+            "timestamp": timestamp,
+            "class_id": detection["class_id"],
+            "class_name": detection["class_name"],
+            "confidence": detection["confidence"],
+            "bbox": detection["bbox"],
+            "thumbnail_url": f"/api/v1/detection/thumbnails/{job_id}/{thumbnail_filename}"
+        }
+        if analyzer is not None:
+            thumbnail_data["analyzer"] = analyzer
+        result_writer.add_thumbnail(thumbnail_data)
+
+def store_frame_motion(
+    job_id: int,
+    video_id: int,
+    frame_number: int,
+    timestamp: float,
+    motion_detected: bool,
+    motion_areas: List[List[float]],
+    result_writer: ResultWriter,
+    analyzer: Optional[str] = None
+) -> None:
+    """
+    Store the motion detections of one frame.
+    
+    Only frames with motion are stored, with their areas in `motion_areas`
+    only; the API rebuilds the frames without motion and the `detections`
+    of each frame from the job's "sampling" stats when they are read.
+    
+    Args:
+        job_id: Detection job ID
+        video_id: Video ID
+        frame_number: Index of the frame in the video
+        timestamp: Frame time in seconds
+        motion_detected: Whether the frame had motion
+        motion_areas: Bounding boxes of the moving areas
+        result_writer: Buffered writer for frame results
+        analyzer: Analyzer of a composite job the detections come from
+    """
+    if not motion_detected:
+        return
+    
+    # Store frame motion detections in MongoDB
+    frame_data = {
+        "job_id": job_id,
+        "video_id": video_id,
+        "frame_number": frame_number,
+        "timestamp": timestamp,
+        "motion_areas": motion_areas
+    }
+    if analyzer is not None:
+        frame_data["analyzer"] = analyzer
+    result_writer.add_frame(frame_data)
+
+def load_motion_frames(db_mongo, job_id: int, before_frame: int, analyzer: Optional[str] = None) -> List[int]:
+    """
+    Get the stored frames with motion before a checkpoint.
+    
+    Args:
+        db_mongo: MongoDB database
+        job_id: Detection job ID
+        before_frame: Checkpoint frame (exclusive)
+        analyzer: Analyzer of a composite job the frames come from
+        
+    Returns:
+        Sorted frame numbers
+    """
+    query = {"job_id": job_id, "frame_number": {"$lt": before_frame}, "motion_areas.0": {"$exists": True}}
+    if analyzer is not None:
+        query["analyzer"] = analyzer
+    
+    return [
+        doc["frame_number"]
+        for doc in db_mongo.detection_results.find(query, {"frame_number": 1}).sort("frame_number", 1)
+    ]
 
 def process_motion_detection(db: Session, job: DetectionJob, video: Video) -> None:
     """
     Process a video using motion detection.
     
+    With the `parallel_segments` parameter the video is split into time
+    segments that are processed in a process pool. Each segment starts with
+    warm-up frames from before its range so the background model has
+    converged when the segment begins. Checkpoints work as for YOLO jobs.
+    
     Args:
         db: Database session
         job: Detection job
@@ -197,173 +1624,247 @@ def process_motion_detection(db: Session, job: DetectionJob, video: Video) -> No
     # Extract parameters
     params = job.parameters or {}
     
-    # Open video file
+    # Get video info
     video_path = os.path.join(settings.LOCAL_STORAGE_PATH, video.file_path)
+    fps, frame_count, _, _ = get_video_info(video_path)
+    sampler = create_frame_sampler(params, fps, video_path)
+    segments = plan_segments(frame_count, params)
+    resume = get_resume_state(job)
+    if resume is not None:
+        segments = [(0, None)]
+    progress = JobProgress(db, job, sampler, frame_count, start_frame=resume["frame"] if resume else 0)
+    
+    if len(segments) == 1:
+        result = process_motion_segment(
+            job.id, video.id, params, video_path, sampler,
+            resume=resume,
+            checkpoint=create_checkpoint_saver(db, job),
+            progress=progress.advance,
+            should_stop=JobControl(db, job).should_stop
+        )
+        motion_frames = result["motion_frames"]
+        last_frame = result["last_frame"]
+        update_job_stats(db, job, **result["stats"])
+    else:
+        results = run_segments_in_parallel(process_motion_segment, [
+            (job.id, video.id, params, video_path, sampler, start_frame, end_frame)
+            for start_frame, end_frame in segments
+        ], progress=progress.advance, should_stop=JobControl(db, job).should_stop)
+        motion_frames = [frame_number for result in results for frame_number in result["motion_frames"]]
+        last_frame = max(result["last_frame"] for result in results)
+        update_job_stats(db, job, **merge_segment_stats(segments, results))
+    
+    progress.finish()
+    
+    # Only frames with motion are stored; the sampling lets the API rebuild the others
+    decoded_frames = max(last_frame + 1, resume["frame"] if resume else 0)
+    update_job_stats(db, job, sampling=describe_sampling(sampler, fps, decoded_frames))
+    
+    # Create timeline for motion events; events spanning segment boundaries
+    # are joined by the usual gap rule
+    all_motion_events = [(frame_number, frame_number / fps, None) for frame_number in motion_frames]
+    timeline = create_motion_timeline(
+        job.id, video.id, all_motion_events, fps, frame_count,
+        frame_step=sampler.frame_step
+    )
+    
+    # Store timeline in MongoDB
+    result_writer = create_result_writer(params)
+    result_writer.write_timeline(timeline)
+    result_writer.close()
+
+def process_motion_segment(
+    job_id: int,
+    video_id: int,
+    params: Dict[str, Any],
+    video_path: str,
+    sampler: FrameSampler,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    resume: Optional[Dict[str, Any]] = None,
+    checkpoint: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    should_stop: Optional[Callable[[], Optional[str]]] = None
+) -> Dict[str, Any]:
+    """
+    Run motion detection on a frame range of a video and store the frame results.
+    
+    Args:
+        job_id: Detection job ID
+        video_id: Video ID
+        params: Job parameters
+        video_path: Path to the video file
+        sampler: Selects the frames to analyze
+        start_frame: First frame of the range
+        end_frame: End of the range (exclusive), None for the end of the video
+        resume: Checkpoint to continue from ("frame")
+        checkpoint: Called periodically with the next frame to process
+        progress: Called with the number of frames analyzed since the last call
+        should_stop: Polled between frames; when it returns an action ("cancel"
+            or "pause") the results so far are stored (with a checkpoint) and
+            JobInterrupted is raised with that action
+        
+    Returns:
+        Dict with the "motion_frames" that had motion, the "last_frame"
+        analyzed (-1 if none) and "stats"
+    """
+    # Open video file
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Could not open video: {video_path}")
     
     # Get video info
     fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    
+    # Only the region of interest is analyzed; motion areas keep their pixel size
+    preprocess = create_frame_preprocessor(params, width, height)
+    
+    # ffmpeg crops the frames and converts them to grayscale itself
+    cap, prepared = open_frame_decoder(cap, video_path, params, preprocess, fps, gray=True)
     
     # Connect to MongoDB
-    mongo_client = MongoClient(settings.MONGODB_URL)
-    db_mongo = mongo_client[settings.MONGODB_DB]
-    detection_collection = db_mongo["detection_results"]
+    result_writer = create_result_writer(params)
     
     # Process video frames
-    all_motion_events = []
-    frame_number = 0
+    motion_frames = []
+    last_frame = -1
+    
+    if resume is not None:
+        # Motion frames before the checkpoint are already stored
+        start_frame = resume["frame"]
+        motion_frames.extend(load_motion_frames(result_writer.db_mongo, job_id, start_frame))
+    
+    # Every segment gets its own background model
+    motion_detector = create_motion_detector(params)
     
-    # Reset state between videos
-    if hasattr(detect_motion, "bg_model"):
-        delattr(detect_motion, "bg_model")
+    # Let the background model converge before the segment starts
+    warmup_frames = 0
+    if start_frame > 0:
+        warmup_frames = int(params.get("segment_warmup_frames", settings.DETECTION_SEGMENT_WARMUP_FRAMES))
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    def infer(items: List[Dict[str, Any]]) -> List[Tuple[bool, List[List[float]]]]:
+        # Background model is stateful, so frames are handled strictly in order
+        results = []
+        for item in items:
+            motion_detected, motion_areas = motion_detector.detect(item["input"])
+            if preprocess.crop is not None:
+                dx, dy = preprocess.offset
+                motion_areas = [[x + dx, y + dy, w, h] for x, y, w, h in motion_areas]
+            results.append((motion_detected, motion_areas))
+        return results
+    
+    def write(item: Dict[str, Any], result: Tuple[bool, List[List[float]]]) -> None:
+        nonlocal last_frame
+        motion_detected, motion_areas = result
+        frame_number = item["frame_number"]
+        if frame_number < start_frame:
+            return  # Warm-up frame of the previous segment
         
-        timestamp = frame_number / fps
+        last_frame = frame_number
+        store_frame_motion(
+            job_id, video_id, frame_number, frame_number / fps,
+            motion_detected, motion_areas, result_writer
+        )
         
-        # Perform motion detection
-        motion_detected, motion_areas = detect_motion(frame)
+        if motion_detected:
+            motion_frames.append(frame_number)
         
-        # Store frame motion detections in MongoDB
-        frame_data = {
-            "job_id": job.id,
-            "video_id": video.id,
-            "frame_number": frame_number,
-            "timestamp": timestamp,
-            "detections": [] if not motion_detected else [
-                {
-                    "class_id": 0,
-                    "class_name": "motion",
-                    "confidence": 1.0,
-                    "bbox": area
-                } 
-                for area in motion_areas
-            ],
-            "motion_areas": motion_areas if motion_detected else []
-        }
-        detection_collection.insert_one(frame_data)
+        if progress is not None:
+            progress(1)
         
-        if motion_detected:
-            all_motion_events.append((frame_number, timestamp, motion_areas))
+        stopping = should_stop() if should_stop is not None else None
+        if stopping or (checkpoint is not None and checkpoint_timer.due()):
+            result_writer.flush()
+            if checkpoint is not None:
+                checkpoint(frame_number + 1, {})
         
-        frame_number += 1
+        if stopping:
+            raise JobInterrupted(stopping, f"Job {job_id} stopped at frame {frame_number}")
     
-    cap.release()
+    checkpoint_timer = CheckpointTimer(params.get("checkpoint_interval"))
+    pipeline = create_pipeline(
+        cap, params,
+        sampler=sampler,
+        start_frame=max(0, start_frame - warmup_frames),
+        end_frame=end_frame,
+        preprocess=None if prepared else preprocess
+    )
+    try:
+        pipeline_stats = pipeline.run(infer, write)
+    finally:
+        cap.release()
     
-    # Create timeline for motion events
-    timeline = create_motion_timeline(job.id, video.id, all_motion_events, fps, frame_count)
+    # Write the remaining buffered results
+    result_writer.close()
     
-    # Store timeline in MongoDB
-    timeline_collection = db_mongo["timelines"]
-    timeline_collection.insert_one(timeline)
+    return {
+        "motion_frames": motion_frames,
+        "last_frame": last_frame,
+        "stats": {"pipeline": pipeline_stats, "writer": result_writer.stats()}
+    }
 
 def create_detection_timeline(
     job_id: int, 
     video_id: int, 
     all_detections: List[List[Dict[str, Any]]], 
     fps: float, 
-    frame_count: int
+    frame_count: int,
+    frame_numbers: Optional[List[int]] = None,
+    frame_step: int = 1
 ) -> Dict[str, Any]:
     """
     Create a timeline of detection events.
     
+    Runs the incremental object tracker over already collected detections.
+    When only every n-th frame was analyzed, the gap threshold for tracking is
+    scaled by the sampling step and each track is widened by half a step on
+    both sides, so start and end times cover the frames that were skipped.
+    
     Args:
         job_id: Detection job ID
         video_id: Video ID
-        all_detections: List of all detections per frame
+        all_detections: List of all detections per analyzed frame
         fps: Frames per second
         frame_count: Total number of frames
+        frame_numbers: Frame number of each entry in all_detections (defaults to 0, 1, 2, ...)
+        frame_step: Typical number of frames between two analyzed frames
         
     Returns:
         Timeline data
     """
-    # Initialize tracking
-    object_tracks = {}  # track_id -> list of detections
-    next_track_id = 1
+    if frame_numbers is None:
+        frame_numbers = list(range(len(all_detections)))
     
-    # Process each frame
-    for frame_number, detections in enumerate(all_detections):
-        timestamp = frame_number / fps
-        
-        for detection in detections:
-            class_name = detection["class_name"]
-            confidence = detection["confidence"]
-            bbox = detection["bbox"]
-            
-            # Simple tracking: assign new objects to existing tracks based on IoU
-            matched = False
-            
-            for track_id, track_data in object_tracks.items():
-                # Only match with same class
-                if track_data["class_name"] != class_name:
-                    continue
-                
-                # Only consider active tracks (seen in recent frames)
-                if frame_number - track_data["last_frame"] > 10:  # 10 frame gap threshold
-                    continue
-                
-                # Check if bounding boxes overlap (simple IoU check)
-                last_bbox = track_data["last_bbox"]
-                if calculate_iou(bbox, last_bbox) > 0.5:  # 50% IoU threshold
-                    # Update existing track
-                    track_data["detections"].append({
-                        "frame": frame_number,
-                        "time": timestamp,
-                        "bbox": bbox,
-                        "confidence": confidence
-                    })
-                    track_data["last_frame"] = frame_number
-                    track_data["last_bbox"] = bbox
-                    track_data["max_confidence"] = max(track_data["max_confidence"], confidence)
-                    matched = True
-                    break
-            
-            if not matched:
-                # Create new track
-                object_tracks[next_track_id] = {
-                    "class_name": class_name,
-                    "first_frame": frame_number,
-                    "last_frame": frame_number,
-                    "detections": [{
-                        "frame": frame_number,
-                        "time": timestamp,
-                        "bbox": bbox,
-                        "confidence": confidence
-                    }],
-                    "last_bbox": bbox,
-                    "max_confidence": confidence
-                }
-                next_track_id += 1
-    
-    # Convert tracks to timeline events
+    tracker = ObjectTracker(fps, frame_count=frame_count, frame_step=frame_step)
+    
+    # Feed each frame to the tracker and collect finished tracks
     events = []
+    for frame_number, detections in zip(frame_numbers, all_detections):
+        events.extend(tracker.update(frame_number, detections))
+    events.extend(tracker.finish())
     
-    for track_id, track_data in object_tracks.items():
-        if len(track_data["detections"]) < 3:  # Ignore very short tracks
-            continue
-        
-        first_detection = track_data["detections"][0]
-        last_detection = track_data["detections"][-1]
-        
-        events.append({
-            "type": "object",
-            "class_name": track_data["class_name"],
-            "track_id": track_id,
-            "start_time": first_detection["time"],
-            "end_time": last_detection["time"],
-            "first_frame": track_data["first_frame"],
-            "last_frame": track_data["last_frame"],
-            "confidence": track_data["max_confidence"]
-        })
+    return build_detection_timeline(job_id, video_id, events)
+
+def build_detection_timeline(
+    job_id: int,
+    video_id: int,
+    events: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Assemble a timeline document from finished tracking events.
     
-    # Sort events by start time
-    events.sort(key=lambda e: e["start_time"])
+    Args:
+        job_id: Detection job ID
+        video_id: Video ID
+        events: Timeline events emitted by the object tracker
+        
+    Returns:
+        Timeline data
+    """
+    # Sort events by start time (tracks may finish out of order)
+    events.sort(key=lambda e: (e["start_time"], e["track_id"]))
     
     return {
         "job_id": job_id,
@@ -376,7 +1877,8 @@ def create_motion_timeline(
     video_id: int, 
     motion_events: List[Tuple[int, float, List[List[float]]]], 
     fps: float, 
-    frame_count: int
+    frame_count: int,
+    frame_step: int = 1
 ) -> Dict[str, Any]:
     """
     Create a timeline of motion events.
@@ -387,6 +1889,7 @@ def create_motion_timeline(
         motion_events: List of motion events (frame_number, timestamp, areas)
         fps: Frames per second
         frame_count: Total number of frames
+        frame_step: Typical number of frames between two analyzed frames
         
     Returns:
         Timeline data
@@ -419,7 +1922,7 @@ def create_motion_timeline(
         prev_frame = motion_events[i-1][0]
         
         # If this frame is consecutive with previous or within 1 second
-        if frame_number <= prev_frame + max(fps, 10):  # Allow 1 second or 10 frames gap
+        if frame_number <= prev_frame + max(fps, 10, 2 * frame_step):  # Allow 1 second, 10 frames or 2 samples gap
             # Extend current event
             current_event["end_time"] = timestamp
             current_event["last_frame"] = frame_number
@@ -440,49 +1943,16 @@ def create_motion_timeline(
     # Add final event
     events.append(current_event)
     
+    # Bridge the frames skipped by sampling around each event
+    for event in events:
+        event["first_frame"], event["last_frame"] = bridge_sampled_gap(
+            event["first_frame"], event["last_frame"], frame_step, frame_count
+        )
+        event["start_time"] = event["first_frame"] / fps
+        event["end_time"] = event["last_frame"] / fps
+    
     return {
         "job_id": job_id,
         "video_id": video_id,
         "events": events
     }
-
-def calculate_iou(bbox1: List[float], bbox2: List[float]) -> float:
-    """
-    Calculate Intersection over Union (IoU) for two bounding boxes.
-    
-    Args:
-        bbox1, bbox2: Bounding boxes in format [x, y, width, height]
-        
-    Returns:
-        IoU value (0.0 to 1.0)
-    """
-    # Convert to xmin, ymin, xmax, ymax format
-    x1_1, y1_1, w1, h1 = bbox1
-    x2_1, y2_1, w2, h2 = bbox2
-    
-    x1_2 = x1_1 + w1
-    y1_2 = y1_1 + h1
-    x2_2 = x2_1 + w2
-    y2_2 = y2_1 + h2
-    
-    # Calculate intersection area
-    x_left = max(x1_1, x2_1)
-    y_top = max(y1_1, y2_1)
-    x_right = min(x1_2, x2_2)
-    y_bottom = min(y1_2, y2_2)
-    
-    if x_right < x_left or y_bottom < y_top:
-        return 0.0
-    
-    intersection_area = (x_right - x_left) * (y_bottom - y_top)
-    
-    # Calculate union area
-    bbox1_area = w1 * h1
-    bbox2_area = w2 * h2
-    union_area = bbox1_area + bbox2_area - intersection_area
-    
-    # Calculate IoU
-    if union_area == 0:
-        return 0.0
-    
-    return intersection_area / union_area
\ No newline at end of file
@@ -0,0 +1,147 @@
+# app/tasks/frame_ring.py
+import queue
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.exceptions import StaleFrameError
+
+
+class SharedFrame(NamedTuple):
+    """
+    Handle to a frame stored in a SharedFrameRing slot.
+
+    Handles are what travels between processes instead of the frame itself.
+    `seq` identifies the write, so a handle to a slot that has since been
+    recycled for another frame is detected instead of read.
+    """
+    slot: int
+    seq: int
+
+
+class SharedFrameRing:
+    """
+    Ring of fixed-size frame slots in shared memory.
+
+    The owning process writes frames into free slots and passes the
+    returned handles (slot index and sequence number) to other processes,
+    which attach to the ring by name and read the frames as NumPy views
+    without copying or pickling them. Slots are recycled once the owner
+    releases them; writers block while every slot is in use, which bounds
+    the memory a job uses for frames in flight.
+
+    The shared block starts with one int64 sequence number per slot,
+    followed by the slots themselves.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        shape: Tuple[int, ...],
+        dtype: str = "uint8",
+        name: Optional[str] = None,
+    ):
+        """
+        Args:
+            slots: Number of frame slots
+            shape: Shape of every frame, e.g. (height, width, 3)
+            dtype: NumPy dtype of the frames
+            name: Name of an existing ring to attach to (None to create a new one)
+        """
+        self.slots = max(1, int(slots))
+        self.shape = tuple(int(v) for v in shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+
+        header_bytes = 8 * self.slots
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = header_bytes + self.frame_bytes * self.slots
+
+        self._shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=self._shm.buf[:header_bytes])
+        self._frames = np.ndarray(
+            (self.slots,) + self.shape,
+            dtype=self.dtype,
+            buffer=self._shm.buf[header_bytes:size],
+        )
+
+        if self.owner:
+            self._seqs[:] = -1
+            self._next_seq = 0
+            self._free: "queue.Queue[int]" = queue.Queue()
+            for slot in range(self.slots):
+                self._free.put(slot)
+
+    @property
+    def spec(self) -> Tuple[str, int, Tuple[int, ...], str]:
+        """
+        Arguments other processes pass to `attach` to open this ring.
+        """
+        return self._shm.name, self.slots, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, name: str, slots: int, shape: Tuple[int, ...], dtype: str) -> "SharedFrameRing":
+        """
+        Open a ring created by another process.
+        """
+        return cls(slots, shape, dtype=dtype, name=name)
+
+    def write(self, frame: np.ndarray, timeout: Optional[float] = None) -> SharedFrame:
+        """
+        Copy a frame into a free slot (owner only).
+
+        Args:
+            frame: Frame with the ring's shape
+            timeout: Seconds to wait for a free slot (None to wait forever)
+
+        Returns:
+            Handle to the stored frame
+
+        Raises:
+            TimeoutError: If no slot was released within `timeout`
+        """
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free slot in the shared frame ring after {timeout}s")
+
+        self._frames[slot] = frame
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs[slot] = seq
+
+        return SharedFrame(slot, seq)
+
+    def view(self, handle: SharedFrame) -> np.ndarray:
+        """
+        Get a frame as a read-only view into shared memory.
+
+        Raises:
+            StaleFrameError: If the slot was recycled after the handle was issued
+        """
+        if self._seqs[handle.slot] != handle.seq:
+            raise StaleFrameError(f"Frame {handle.seq} in slot {handle.slot} was overwritten")
+
+        frame = self._frames[handle.slot]
+        frame.flags.writeable = False
+        return frame
+
+    def release(self, handle: SharedFrame) -> None:
+        """
+        Return a frame's slot to the ring once no process needs it (owner only).
+        """
+        if self._seqs[handle.slot] == handle.seq:
+            self._seqs[handle.slot] = -1
+            self._free.put(handle.slot)
+
+    def close(self) -> None:
+        """
+        Detach from the ring; the owner also frees the shared memory.
+        """
+        # Views must be dropped before the block can be closed
+        self._seqs = None
+        self._frames = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
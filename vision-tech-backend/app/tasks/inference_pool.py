@@ -0,0 +1,196 @@
+# app/tasks/inference_pool.py
+import logging
+import multiprocessing
+import queue
+import traceback
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.tasks.frame_ring import SharedFrame, SharedFrameRing
+from app.utils.threads import apply_thread_budget
+
+logger = logging.getLogger(__name__)
+
+# Seconds between liveness checks while waiting for results
+_POLL_INTERVAL = 1.0
+
+Region = Optional[Tuple[int, int, int, int]]
+
+
+def run_inference_worker(
+    index: int,
+    ring_spec: tuple,
+    model_name: str,
+    params: Dict[str, Any],
+    threads: Optional[int],
+    tasks,
+    results,
+) -> None:
+    """
+    Entry point of an inference worker process.
+
+    Takes frame batches from the shared `tasks` queue, runs the model on the
+    frames straight from the shared ring and puts the detections on `results`
+    until it receives None.
+
+    Args:
+        index: Number of this worker, reported with its results
+        ring_spec: `SharedFrameRing.spec` of the job's frame ring
+        model_name: YOLO model to load
+        params: Job parameters (conf_threshold, classes, imgsz, backend)
+        threads: CPU threads the worker may use
+        tasks: Queue of (request_id, [(handle, region), ...]) shared by all workers
+        results: Queue of (request_id, index, detections, error)
+    """
+    if threads:
+        apply_thread_budget(threads)
+
+    # Imported here so the thread budget applies before the model libraries load
+    from app.services.detection.registry import model_registry
+
+    detector = model_registry.get(model_name, backend=params.get("backend"))
+    ring = SharedFrameRing.attach(*ring_spec)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            request_id, frames = task
+            try:
+                inputs = []
+                for handle, region in frames:
+                    image = ring.view(handle)
+                    if region is not None:
+                        x0, y0, x1, y1 = region
+                        image = image[y0:y1, x0:x1]
+                    inputs.append(image)
+
+                detections = detector.detect_batch(
+                    inputs,
+                    batch_size=len(inputs),
+                    conf_threshold=params.get("conf_threshold", 0.25),
+                    classes=params.get("classes"),
+                    imgsz=params.get("imgsz")
+                )
+                del inputs
+                results.put((request_id, index, detections, None))
+            except Exception:
+                results.put((request_id, index, None, traceback.format_exc()))
+    finally:
+        ring.close()
+
+
+class InferenceWorkerPool:
+    """
+    Runs a YOLO model in several worker processes fed from one decoder.
+
+    Frames travel to the workers as SharedFrameRing handles, so only a slot
+    index and a sequence number are pickled per frame. Each call to `infer`
+    splits the frames into batches of at most `batch_size` frames and puts
+    them on one queue shared by all workers; an idle worker takes the next
+    batch, so up to `workers` batches are in flight and a slow batch does not
+    hold back the others. Callers should pass `workers * batch_size` frames
+    per call to keep every worker busy. Every worker loads its own copy of
+    the model and gets an equal share of `threads`.
+    """
+
+    def __init__(
+        self,
+        ring: SharedFrameRing,
+        model_name: str,
+        params: Dict[str, Any],
+        workers: int,
+        threads: Optional[int] = None,
+        batch_size: int = 1,
+    ):
+        """
+        Args:
+            ring: Frame ring the frames are written to
+            model_name: YOLO model to run
+            params: Job parameters
+            workers: Number of worker processes
+            threads: CPU threads per worker (None for no limit)
+            batch_size: Maximum number of frames per worker batch
+        """
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.frames = [0] * self.workers
+
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(
+                target=run_inference_worker,
+                args=(index, ring.spec, model_name, params, threads, self._tasks, self._results),
+                name=f"inference-worker-{index}",
+                daemon=True
+            )
+            for index in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self._next_request = 0
+
+    def infer(self, frames: Sequence[SharedFrame], regions: Optional[Sequence[Region]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run the model on frames in the ring.
+
+        Args:
+            frames: Handles of the frames
+            regions: Optional (x0, y0, x1, y1) crop of each frame to run on
+
+        Returns:
+            List with one detection list per frame, in input order
+        """
+        if not frames:
+            return []
+
+        regions = regions or [None] * len(frames)
+
+        # Spread short calls over the workers too, but never exceed batch_size
+        chunk_size = min(self.batch_size, -(-len(frames) // self.workers))
+
+        pending = {}
+        for start in range(0, len(frames), chunk_size):
+            request_id = self._next_request
+            self._next_request += 1
+
+            chunk = list(zip(frames[start:start + chunk_size], regions[start:start + chunk_size]))
+            self._tasks.put((request_id, chunk))
+            pending[request_id] = (start, len(chunk))
+
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(frames)
+        while pending:
+            try:
+                request_id, worker, detections, error = self._results.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                dead = [process.name for process in self._processes if not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Inference worker(s) exited unexpectedly: {', '.join(dead)}")
+                continue
+
+            if error is not None:
+                raise RuntimeError(f"Inference worker failed:\n{error}")
+
+            start, count = pending.pop(request_id)
+            results[start:start + count] = detections
+            self.frames[worker] += count
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "frames_per_worker": list(self.frames)}
+
+    def close(self) -> None:
+        """
+        Stop the workers once they finished their current batch.
+        """
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join()
@@ -0,0 +1,287 @@
+# app/tasks/pipeline.py
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import cv2
+
+from app.utils.video import FramePreprocessor, FrameSampler
+
+# Marker placed on a queue once a stage has no more items
+_END_OF_STREAM = object()
+
+# How long a blocked stage waits before re-checking the stop flag
+_POLL_INTERVAL = 0.1
+
+
+class StageStats:
+    """
+    Counters for a single pipeline stage.
+
+    `busy_time` is time spent doing the stage's own work, `blocked_time` is time
+    spent waiting for room in the downstream queue (backpressure).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.skipped = 0
+        self.busy_time = 0.0
+        self.blocked_time = 0.0
+        self.max_queue_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def record_depth(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg_depth = self._depth_total / self._depth_samples if self._depth_samples else 0.0
+        return {
+            "items": self.items,
+            "skipped": self.skipped,
+            "busy_time": round(self.busy_time, 3),
+            "blocked_time": round(self.blocked_time, 3),
+            "max_queue_depth": self.max_queue_depth,
+            "avg_queue_depth": round(avg_depth, 2),
+        }
+
+
+class FramePipeline:
+    """
+    Three-stage frame pipeline: decode -> inference -> write.
+
+    The decoder and the writer run on their own threads and are joined to the
+    inference stage (the calling thread) by bounded queues, so video decoding
+    and result I/O overlap with model inference. A full queue blocks the
+    producing stage, which is reported as backpressure in the stage stats.
+    """
+
+    def __init__(
+        self,
+        cap,
+        batch_size: int = 1,
+        decode_queue_size: int = 32,
+        write_queue_size: int = 64,
+        sampler: Optional[FrameSampler] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        preprocess: Optional[Union[FramePreprocessor, Callable[[Any], Any]]] = None,
+    ):
+        """
+        Args:
+            cap: Opened video capture to read frames from
+            batch_size: Maximum number of frames handed to the inference stage at once
+            decode_queue_size: Capacity of the decode -> inference queue
+            write_queue_size: Capacity of the inference -> write queue
+            sampler: Selects the frames to analyze (defaults to every frame)
+            start_frame: First frame to decode
+            end_frame: Stop decoding at this frame (exclusive), None for the end of the video
+            preprocess: Turns each frame into the model input on the decoder thread
+                (a FramePreprocessor or any callable)
+        """
+        self.cap = cap
+        self.sampler = sampler or FrameSampler()
+        self.start_frame = max(0, int(start_frame))
+        self.end_frame = end_frame
+        self.preprocess = preprocess if preprocess is not None and not getattr(preprocess, "is_identity", False) else None
+        self.batch_size = max(1, int(batch_size))
+        self.decode_queue = queue.Queue(maxsize=max(1, int(decode_queue_size)))
+        self.write_queue = queue.Queue(maxsize=max(1, int(write_queue_size)))
+
+        self.decode_stats = StageStats("decode")
+        self.inference_stats = StageStats("inference")
+        self.write_stats = StageStats("write")
+
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._started_at: Optional[float] = None
+
+    def run(
+        self,
+        infer: Callable[[List[Dict[str, Any]]], List[Any]],
+        write: Callable[[Dict[str, Any], Any], None],
+    ) -> Dict[str, Any]:
+        """
+        Run the pipeline until the video is exhausted.
+
+        Args:
+            infer: Called with a list of frame items ({"frame_number", "frame",
+                "input"}, where "input" is the preprocessed frame), must return
+                one result per item in the same order
+            write: Called with each frame item and its result, in frame order
+
+        Returns:
+            Final pipeline statistics
+        """
+        self._started_at = time.perf_counter()
+
+        decoder = threading.Thread(target=self._decode_loop, name="pipeline-decoder", daemon=True)
+        writer = threading.Thread(target=self._write_loop, args=(write,), name="pipeline-writer", daemon=True)
+        decoder.start()
+        writer.start()
+
+        try:
+            self._inference_loop(infer)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # Always let the writer drain and stop, even after an error
+            self._put(self.write_queue, _END_OF_STREAM, self.inference_stats, force=True)
+            decoder.join()
+            writer.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the per-stage statistics and current queue depths.
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "elapsed": round(elapsed, 3),
+            "batch_size": self.batch_size,
+            "frame_step": self.sampler.frame_step,
+            "decode_queue": {"depth": self.decode_queue.qsize(), "capacity": self.decode_queue.maxsize},
+            "write_queue": {"depth": self.write_queue.qsize(), "capacity": self.write_queue.maxsize},
+            "stages": {
+                "decode": self.decode_stats.as_dict(),
+                "inference": self.inference_stats.as_dict(),
+                "write": self.write_stats.as_dict(),
+            },
+        }
+
+    def _decode_loop(self) -> None:
+        try:
+            frame_number = self.start_frame
+            if frame_number > 0:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+
+            while not self._stop.is_set():
+                target = self.sampler.next_frame(frame_number)
+                if target is None or (self.end_frame is not None and target >= self.end_frame):
+                    break
+
+                started = time.perf_counter()
+                if self.sampler.seek and target - frame_number > 1:
+                    # Jump straight to the next analyzed frame
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    self.decode_stats.skipped += target - frame_number
+                    frame_number = target
+
+                # Skip frames we don't analyze without converting them to images
+                ret = True
+                while frame_number < target and ret:
+                    ret = self.cap.grab()
+                    frame_number += 1
+                    self.decode_stats.skipped += 1
+
+                if ret:
+                    ret, frame = self.cap.read()
+                if ret:
+                    model_input = self.preprocess(frame) if self.preprocess is not None else frame
+                self.decode_stats.busy_time += time.perf_counter() - started
+                if not ret:
+                    break
+
+                item = {"frame_number": frame_number, "frame": frame, "input": model_input}
+                self._put(self.decode_queue, item, self.decode_stats)
+                self.decode_stats.items += 1
+                frame_number += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(self.decode_queue, _END_OF_STREAM, self.decode_stats, force=True)
+
+    def _inference_loop(self, infer: Callable[[List[Dict[str, Any]]], List[Any]]) -> None:
+        finished = False
+        while not finished and not self._stop.is_set():
+            # Collect up to batch_size decoded frames
+            batch = []
+            while len(batch) < self.batch_size:
+                item = self._get(self.decode_queue)
+                if item is None:
+                    return
+                if item is _END_OF_STREAM:
+                    finished = True
+                    break
+                batch.append(item)
+
+            if not batch:
+                break
+
+            started = time.perf_counter()
+            results = infer(batch)
+            self.inference_stats.busy_time += time.perf_counter() - started
+
+            for item, result in zip(batch, results):
+                self._put(self.write_queue, (item, result), self.inference_stats)
+                self.inference_stats.items += 1
+
+    def _write_loop(self, write: Callable[[Dict[str, Any], Any], None]) -> None:
+        try:
+            while True:
+                # Keep draining after a failure so no stage stays blocked
+                entry = self.write_queue.get()
+                if entry is _END_OF_STREAM:
+                    break
+                if self._stop.is_set():
+                    continue
+
+                item, result = entry
+                started = time.perf_counter()
+                write(item, result)
+                self.write_stats.busy_time += time.perf_counter() - started
+                self.write_stats.items += 1
+        except BaseException as e:
+            self._fail(e)
+            # Drain the queue so the inference stage can finish
+            while self.write_queue.get() is not _END_OF_STREAM:
+                pass
+
+    def _put(self, target: queue.Queue, item: Any, stats: StageStats, force: bool = False) -> None:
+        """
+        Put an item on a bounded queue, recording backpressure.
+
+        Gives up when the pipeline is stopping unless `force` is set, which is
+        used for end-of-stream markers that the next stage must always see.
+        """
+        stats.record_depth(target.qsize())
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    target.put(item, timeout=_POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    if self._stop.is_set() and not force:
+                        return
+                    if force and self._stop.is_set():
+                        # Make room for the marker; the consumer is shutting down anyway
+                        try:
+                            target.get_nowait()
+                        except queue.Empty:
+                            pass
+        finally:
+            stats.blocked_time += time.perf_counter() - started
+
+    def _get(self, source: queue.Queue) -> Any:
+        """
+        Get an item from a queue, returning None if the pipeline is stopping.
+        """
+        while True:
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+
+    def _fail(self, error: BaseException) -> None:
+        self._errors.append(error)
+        self._stop.set()
@@ -0,0 +1,359 @@
+# app/tasks/worker.py
+import datetime
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.detection import DetectionJob
+from app.utils.threads import apply_thread_budget, threads_per_job
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job(db: Session) -> Optional[int]:
+    """
+    Claim the oldest pending detection job.
+
+    Jobs left `in_progress` by a worker that stopped sending heartbeats are
+    claimed again and resume from their last checkpoint. The row is locked
+    with `SELECT ... FOR UPDATE SKIP LOCKED`, so several workers can poll the
+    same table without claiming the same job twice.
+
+    Args:
+        db: Database session
+
+    Returns:
+        ID of the claimed job, or None if no job is pending
+    """
+    now = datetime.datetime.now()
+    stale_before = now - datetime.timedelta(seconds=settings.DETECTION_JOB_STALE_AFTER)
+
+    while True:
+        job = (
+            db.query(DetectionJob)
+            .filter(or_(
+                DetectionJob.status == "pending",
+                and_(
+                    DetectionJob.status == "in_progress",
+                    or_(
+                        DetectionJob.heartbeat_at < stale_before,
+                        and_(DetectionJob.heartbeat_at.is_(None), DetectionJob.started_at < stale_before)
+                    )
+                )
+            ))
+            .order_by(DetectionJob.created_at, DetectionJob.id)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+        if not job:
+            db.rollback()
+            return None
+
+        if job.status == "in_progress":
+            logger.warning(f"Reclaiming detection job {job.id} from checkpoint frame {job.checkpoint_frame or 0}")
+
+        if (job.attempts or 0) >= settings.DETECTION_JOB_MAX_ATTEMPTS:
+            job.status = "failed"
+            job.error_message = f"Job was interrupted {job.attempts} times"
+            db.commit()
+            continue
+
+        job.status = "in_progress"
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.attempts = (job.attempts or 0) + 1
+        db.commit()
+
+        return job.id
+
+
+def run_job(job_id: int) -> None:
+    """
+    Run a claimed detection job with its own database session.
+
+    Args:
+        job_id: ID of the detection job
+    """
+    # Imported here so the worker loop itself never loads models or OpenCV
+    from app.tasks.detection import start_detection_job
+
+    db = SessionLocal()
+    try:
+        start_detection_job(db, job_id)
+    finally:
+        db.close()
+
+
+def run_job_process(threads: Optional[int], max_jobs: int, jobs, finished) -> None:
+    """
+    Entry point of the long-lived job processes started by the worker.
+
+    Warms up the model registry once, then runs the job IDs received on
+    `jobs` one at a time until it receives None or has run `max_jobs` jobs.
+    Models stay cached in the registry between jobs.
+
+    Args:
+        threads: CPU threads each job may use (None for no limit)
+        max_jobs: Jobs to run before exiting (0 for no limit)
+        jobs: Queue of job IDs for this process
+        finished: Queue of (pid, job_id) for every job that returned
+    """
+    # The worker decides when to stop; a running job finishes first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Limit thread pools before the models and OpenCV are loaded
+    if threads:
+        apply_thread_budget(threads)
+
+    from app.services.detection.registry import model_registry
+
+    if settings.MODEL_WARMUP:
+        model_registry.warmup(settings.MODEL_WARMUP)
+
+    pid = multiprocessing.current_process().pid
+    jobs_run = 0
+    while not max_jobs or jobs_run < max_jobs:
+        job_id = jobs.get()
+        if job_id is None:
+            break
+
+        run_job(job_id)
+        jobs_run += 1
+        finished.put((pid, job_id))
+
+
+def release_job(job_id: int, error_message: str) -> None:
+    """
+    Handle a job whose process died before it could finish the job itself.
+
+    The job goes back to the queue to resume from its checkpoint, or is
+    marked failed once it has used up its attempts.
+
+    Args:
+        job_id: ID of the detection job
+        error_message: Reason stored on the job
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(DetectionJob).filter(DetectionJob.id == job_id).first()
+        if job and job.status == "in_progress":
+            job.status = "pending" if job.attempts < settings.DETECTION_JOB_MAX_ATTEMPTS else "failed"
+            job.error_message = error_message
+            db.commit()
+    finally:
+        db.close()
+
+
+def record_heartbeat(job_ids: List[int]) -> None:
+    """
+    Mark running jobs as alive so other workers don't reclaim them.
+
+    Args:
+        job_ids: IDs of the jobs this worker is running
+    """
+    db = SessionLocal()
+    try:
+        db.query(DetectionJob).filter(
+            DetectionJob.id.in_(job_ids),
+            DetectionJob.status == "in_progress"
+        ).update({DetectionJob.heartbeat_at: datetime.datetime.now()}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class JobProcess:
+    """
+    A long-lived process of a detection worker that runs one job at a time.
+
+    The process keeps its model registry between jobs, so models are loaded
+    and warmed up once per process instead of once per job. Changed weights
+    files are still picked up, as the registry reloads a model whose file
+    changed on its next use.
+    """
+
+    def __init__(self, context, threads: Optional[int], max_jobs: int, finished):
+        """
+        Args:
+            context: Multiprocessing context to start the process with
+            threads: CPU threads each job may use
+            max_jobs: Jobs to run before the process exits (0 for no limit)
+            finished: Queue the process reports finished jobs on
+        """
+        self.job_id: Optional[int] = None
+        self.max_jobs = max_jobs
+        self.jobs_started = 0
+        self._jobs = context.Queue()
+        self.process = context.Process(
+            target=run_job_process,
+            args=(threads, max_jobs, self._jobs, finished),
+            name="detection-job-process"
+        )
+        self.process.start()
+
+    @property
+    def idle(self) -> bool:
+        # A process that ran its last job is about to exit
+        exhausted = self.max_jobs and self.jobs_started >= self.max_jobs
+        return self.job_id is None and not exhausted and self.process.is_alive()
+
+    def start_job(self, job_id: int) -> None:
+        self.job_id = job_id
+        self.jobs_started += 1
+        self._jobs.put(job_id)
+
+    def stop(self) -> None:
+        """
+        Ask the process to exit once its current job finished.
+        """
+        self._jobs.put(None)
+
+
+class DetectionWorker:
+    """
+    Runs pending detection jobs from the database queue.
+
+    Jobs run in `concurrency` long-lived spawned processes, one job per
+    process at a time, so a crash in one job cannot take down the worker
+    while loaded models are reused across jobs. Each process is replaced
+    after `DETECTION_WORKER_JOBS_PER_PROCESS` jobs to bound leaks, and a
+    process that dies mid-job has its job requeued. The worker sends
+    heartbeats for its running jobs; a job whose heartbeat stops is
+    reclaimed by another worker.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None):
+        """
+        Args:
+            concurrency: Maximum number of jobs running at once
+            poll_interval: Seconds between polls when no job is pending
+        """
+        self.concurrency = max(1, int(concurrency or settings.DETECTION_WORKER_CONCURRENCY))
+        self.poll_interval = poll_interval if poll_interval is not None else settings.DETECTION_WORKER_POLL_INTERVAL
+
+        self.threads_per_job = threads_per_job(self.concurrency)
+
+        self._context = multiprocessing.get_context("spawn")
+        self._finished = self._context.Queue()
+        self._processes: List[JobProcess] = []
+        self._stopping = False
+        self._last_heartbeat = 0.0
+
+    @property
+    def running_jobs(self) -> List[int]:
+        return [process.job_id for process in self._processes if process.job_id is not None]
+
+    def run(self) -> None:
+        """
+        Claim and run jobs until the worker is asked to stop.
+
+        Running jobs are allowed to finish before the worker exits.
+        """
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        logger.info(f"Detection worker started with concurrency {self.concurrency}, {self.threads_per_job} thread(s) per job")
+
+        while not self._stopping:
+            self._reap()
+            self._heartbeat()
+
+            if not self._start_next():
+                time.sleep(self.poll_interval)
+
+        logger.info(f"Waiting for {len(self.running_jobs)} running job(s) to finish")
+        for job_process in self._processes:
+            job_process.stop()
+        for job_process in self._processes:
+            job_process.process.join()
+        self._reap()
+
+    def _start_next(self) -> bool:
+        """
+        Claim one job and hand it to an idle job process.
+
+        Returns:
+            True if a job was started
+        """
+        job_process = next((p for p in self._processes if p.idle), None)
+        if job_process is None:
+            return False
+
+        db = SessionLocal()
+        try:
+            job_id = claim_next_job(db)
+        finally:
+            db.close()
+
+        if job_id is None:
+            return False
+
+        job_process.start_job(job_id)
+        logger.info(f"Started detection job {job_id} (pid {job_process.process.pid})")
+
+        return True
+
+    def _heartbeat(self) -> None:
+        running = self.running_jobs
+        if not running or time.monotonic() - self._last_heartbeat < settings.DETECTION_WORKER_HEARTBEAT_INTERVAL:
+            return
+
+        try:
+            record_heartbeat(running)
+            self._last_heartbeat = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to record heartbeat: {e}")
+
+    def _reap(self) -> None:
+        """
+        Collect finished jobs, requeue jobs whose process died and keep
+        `concurrency` job processes running.
+        """
+        # A process reports its last job before exiting, so check liveness first
+        exited = [p for p in self._processes if not p.process.is_alive()]
+
+        while True:
+            try:
+                pid, job_id = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            for job_process in self._processes:
+                if job_process.process.pid == pid and job_process.job_id == job_id:
+                    job_process.job_id = None
+                    logger.info(f"Detection job {job_id} finished")
+
+        for job_process in exited:
+            job_process.process.join()
+            self._processes.remove(job_process)
+
+            exitcode = job_process.process.exitcode
+            if job_process.job_id is not None:
+                logger.error(f"Detection job {job_process.job_id} exited with code {exitcode}")
+                release_job(job_process.job_id, f"Worker process exited with code {exitcode}")
+            elif exitcode != 0:
+                logger.error(f"Detection job process exited with code {exitcode}")
+
+        while not self._stopping and len(self._processes) < self.concurrency:
+            self._processes.append(JobProcess(
+                self._context,
+                self.threads_per_job,
+                settings.DETECTION_WORKER_JOBS_PER_PROCESS,
+                self._finished
+            ))
+
+    def _request_stop(self, signum, frame) -> None:
+        logger.info("Stopping detection worker")
+        self._stopping = True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    DetectionWorker().run()
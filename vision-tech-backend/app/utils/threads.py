@@ -0,0 +1,91 @@
+# app/utils/threads.py
+import logging
+import os
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by OpenMP, MKL and the BLAS libraries when they load
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# Threads granted to this process by apply_thread_budget
+_thread_budget: Optional[int] = None
+
+
+def available_cores() -> int:
+    """
+    Get the number of cores detection may use on this machine.
+    """
+    if settings.DETECTION_CPU_CORES > 0:
+        return settings.DETECTION_CPU_CORES
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def threads_per_job(concurrency: int) -> int:
+    """
+    Get the threads each job may use when `concurrency` jobs run at once.
+
+    The cores are split evenly over the worker's job slots, so the machine is
+    never oversubscribed however many of the slots are busy.
+    """
+    if settings.DETECTION_THREADS_PER_JOB > 0:
+        return settings.DETECTION_THREADS_PER_JOB
+    return split_threads(available_cores(), concurrency)
+
+
+def split_threads(threads: int, parts: int) -> int:
+    """
+    Split a thread budget into `parts` equal shares of at least one thread.
+    """
+    return max(1, threads // max(1, parts))
+
+
+def apply_thread_budget(threads: int) -> None:
+    """
+    Limit the threads of every library that runs a thread pool in this process.
+
+    The environment limits only take effect for libraries loaded afterwards
+    (and for child processes), so this should run at the start of a job
+    process, before the models are imported.
+
+    Args:
+        threads: Threads this process may use
+    """
+    global _thread_budget
+
+    threads = max(1, int(threads))
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    import cv2
+    import torch
+
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(settings.DETECTION_INTEROP_THREADS)
+    except RuntimeError:
+        # Can only be set once, before torch runs any parallel work
+        pass
+
+    _thread_budget = threads
+    logger.info(f"Limited process {os.getpid()} to {threads} thread(s)")
+
+
+def get_thread_budget() -> Optional[int]:
+    """
+    Get the threads granted to this process, or None if no budget was applied.
+    """
+    return _thread_budget
@@ -0,0 +1,354 @@
+# app/utils/video.py
+import bisect
+import os
+import subprocess
+import tempfile
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Bytes of ffmpeg's error output included when it fails
+_FFMPEG_STDERR_TAIL = 2000
+
+
+def get_keyframe_numbers(video_path: str, fps: float) -> List[int]:
+    """
+    List the frame numbers of the key frames (I-frames) in a video using ffprobe.
+
+    Only packet headers are read, so no frames are decoded.
+
+    Args:
+        video_path: Path to the video file
+        fps: Frames per second of the video
+
+    Returns:
+        Sorted list of key frame numbers
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=print_section=0",
+        video_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+    pts_times = []
+    keyframe_times = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or parts[0] in ("", "N/A"):
+            continue
+        pts_time = float(parts[0])
+        pts_times.append(pts_time)
+        if "K" in parts[1]:
+            keyframe_times.append(pts_time)
+
+    if not keyframe_times:
+        return []
+
+    # Frame numbers are counted from the first presented frame
+    start_time = min(pts_times)
+    return sorted({int(round((t - start_time) * fps)) for t in keyframe_times})
+
+
+class FrameSampler:
+    """
+    Decides which frames of a video are analyzed.
+
+    Frames are either taken every `stride` frames or, when `keyframes` is given,
+    only at those frame numbers.
+    """
+
+    def __init__(self, stride: int = 1, keyframes: Optional[List[int]] = None):
+        """
+        Args:
+            stride: Analyze every n-th frame
+            keyframes: Explicit sorted list of frame numbers to analyze
+        """
+        self.stride = max(1, int(stride))
+        self.keyframes = keyframes
+
+        # Seeking is only worth it when the analyzed frames are far apart
+        self.seek = keyframes is not None
+
+    @property
+    def frame_step(self) -> int:
+        """
+        Typical number of frames between two analyzed frames.
+        """
+        if self.keyframes is None:
+            return self.stride
+        if len(self.keyframes) < 2:
+            return 1
+
+        gaps = sorted(b - a for a, b in zip(self.keyframes, self.keyframes[1:]))
+        return max(1, gaps[len(gaps) // 2])
+
+    def count_frames(self, frame_count: int, start_frame: int = 0) -> int:
+        """
+        Count the frames that will be analyzed in [start_frame, frame_count).
+
+        Args:
+            frame_count: Total number of frames in the video
+            start_frame: First frame of the range
+
+        Returns:
+            Number of analyzed frames
+        """
+        if self.keyframes is not None:
+            return bisect.bisect_left(self.keyframes, frame_count) - bisect.bisect_left(self.keyframes, start_frame)
+
+        first = self.next_frame(start_frame)
+        return max(0, (frame_count - first + self.stride - 1) // self.stride)
+
+    def next_frame(self, frame_number: int) -> Optional[int]:
+        """
+        Get the first frame to analyze at or after `frame_number`.
+
+        Args:
+            frame_number: Current decoder position
+
+        Returns:
+            Frame number to analyze next, or None if no frames are left
+        """
+        if self.keyframes is not None:
+            index = bisect.bisect_left(self.keyframes, frame_number)
+            return self.keyframes[index] if index < len(self.keyframes) else None
+
+        remainder = frame_number % self.stride
+        return frame_number if remainder == 0 else frame_number + self.stride - remainder
+
+
+class FramePreprocessor:
+    """
+    Prepares decoded frames for the model: crops them to a region of
+    interest and shrinks them so the longest side is at most `max_size`.
+
+    Shrinking before inference means the model's letterboxing only has to
+    pad the image, and large (e.g. 4K) frames never travel through the
+    pipeline at full size to the model. `offset` and `scale` map results on
+    the prepared image back to frame coordinates.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        roi: Optional[Sequence[float]] = None,
+        max_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            width: Frame width
+            height: Frame height
+            roi: Region of interest [x, y, width, height] in frame pixels
+            max_size: Maximum length of the longest side of the prepared image
+        """
+        x, y, w, h = 0, 0, width, height
+        if roi is not None:
+            if len(roi) != 4:
+                raise ValueError("roi must be [x, y, width, height]")
+            x = min(max(0, int(roi[0])), width)
+            y = min(max(0, int(roi[1])), height)
+            w = min(int(roi[2]), width - x)
+            h = min(int(roi[3]), height - y)
+            if w <= 0 or h <= 0:
+                raise ValueError(f"roi {list(roi)} is outside the {width}x{height} frame")
+
+        self.crop = (x, y, w, h) if (x, y, w, h) != (0, 0, width, height) else None
+        self.offset: Tuple[int, int] = (x, y)
+        self.region_size: Tuple[int, int] = (w, h)
+
+        longest = max(w, h)
+        self.scale = max_size / longest if max_size and longest > max_size else 1.0
+        self.size: Tuple[int, int] = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+
+    @property
+    def is_identity(self) -> bool:
+        return self.crop is None and self.scale == 1.0
+
+    def region(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Get the region of interest of a frame at full resolution (a view, no copy).
+        """
+        if self.crop is None:
+            return frame
+        x, y, w, h = self.crop
+        return frame[y:y + h, x:x + w]
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        frame = self.region(frame)
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return frame
+
+
+class FFmpegCapture:
+    """
+    Decodes a video with an ffmpeg subprocess that writes raw frames to a pipe.
+
+    Cropping, scaling and pixel format conversion (e.g. to grayscale) happen
+    inside ffmpeg, so frames arrive at the size and format the analysis needs.
+    Frames are read with `readinto` into a ring of preallocated arrays instead
+    of allocating a new array per frame; a buffer is reused after `ring_size`
+    more frames, so the ring must be larger than the number of frames the
+    consumer holds at once.
+
+    Implements the subset of the `cv2.VideoCapture` interface the frame
+    pipeline uses: `isOpened`, `set(CAP_PROP_POS_FRAMES)`, `grab`, `read`
+    and `release`. Unlike OpenCV, a decoding error is not mistaken for the
+    end of the video: when ffmpeg exits with an error, reading raises a
+    RuntimeError with the end of its error output.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        fps: float,
+        size: Tuple[int, int],
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        gray: bool = False,
+        ring_size: int = 64,
+        threads: Optional[int] = None,
+    ):
+        """
+        Args:
+            video_path: Path to the video file
+            fps: Frames per second of the video, used to seek
+            size: Output (width, height) after cropping
+            crop: Region (x, y, width, height) to cut out before scaling
+            gray: Output single-channel grayscale instead of BGR
+            ring_size: Number of preallocated frame buffers
+            threads: Decoder threads (None for the ffmpeg default)
+        """
+        self.video_path = video_path
+        self.fps = fps
+        self.size = size
+        self.crop = crop
+        self.gray = gray
+        self.threads = threads
+
+        width, height = size
+        shape = (height, width) if gray else (height, width, 3)
+        self._ring = [np.empty(shape, dtype=np.uint8) for _ in range(max(2, int(ring_size)))]
+        self._scratch = np.empty(shape, dtype=np.uint8)
+        self._ring_index = 0
+
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr = None
+        self._position = 0
+        self._opened = os.path.exists(video_path)
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def set(self, prop: int, value: float) -> bool:
+        """
+        Seek to a frame (only `cv2.CAP_PROP_POS_FRAMES` is supported).
+
+        ffmpeg is restarted at the frame's timestamp; it decodes from the
+        preceding key frame and drops the frames before the target.
+        """
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+
+        self._stop_process()
+        self._position = max(0, int(value))
+        return True
+
+    def grab(self) -> bool:
+        """
+        Skip one frame.
+        """
+        return self._read_into(self._scratch)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Read the next frame into the next buffer of the ring.
+        """
+        frame = self._ring[self._ring_index]
+        if not self._read_into(frame):
+            return False, None
+
+        self._ring_index = (self._ring_index + 1) % len(self._ring)
+        return True, frame
+
+    def release(self) -> None:
+        self._stop_process()
+        self._opened = False
+
+    def _read_into(self, buffer: np.ndarray) -> bool:
+        if not self._opened:
+            return False
+        if self._process is None:
+            self._start_process()
+
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = self._process.stdout.readinto(view[filled:])
+            if not count:
+                self._check_exit()
+                return False
+            filled += count
+
+        self._position += 1
+        return True
+
+    def _start_process(self) -> None:
+        cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+        if self.threads:
+            cmd += ["-threads", str(self.threads)]
+        if self._position > 0:
+            # Half a frame early so rounding never skips the target frame
+            cmd += ["-ss", f"{max(0.0, (self._position - 0.5) / self.fps):.6f}"]
+        cmd += ["-i", self.video_path, "-an", "-sn", "-vsync", "0"]
+
+        filters = []
+        if self.crop is not None:
+            x, y, w, h = self.crop
+            filters.append(f"crop={w}:{h}:{x}:{y}")
+        width, height = self.size
+        filters.append(f"scale={width}:{height}:flags=area")
+        cmd += ["-vf", ",".join(filters)]
+
+        cmd += ["-pix_fmt", "gray" if self.gray else "bgr24", "-f", "rawvideo", "-"]
+
+        # A file rather than a pipe, so a chatty ffmpeg can never block on it
+        self._stderr = tempfile.TemporaryFile()
+        frame_bytes = self._scratch.nbytes
+        self._process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            bufsize=frame_bytes * 2,
+        )
+
+    def _check_exit(self) -> None:
+        """
+        Raise if ffmpeg stopped writing frames because it failed.
+        """
+        returncode = self._process.wait()
+        if returncode == 0:
+            return
+
+        self._stderr.seek(0, os.SEEK_END)
+        self._stderr.seek(max(0, self._stderr.tell() - _FFMPEG_STDERR_TAIL))
+        error = self._stderr.read().decode("utf-8", errors="replace").strip()
+        self._stop_process()
+        raise RuntimeError(f"ffmpeg failed to decode {self.video_path} (exit code {returncode}): {error}")
+
+    def _stop_process(self) -> None:
+        if self._process is None:
+            return
+
+        self._process.stdout.close()
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process = None
+        self._stderr.close()
+        self._stderr = None
@@ -0,0 +1,108 @@
+# scripts/benchmark_threads.py
+import os
+import sys
+import time
+import argparse
+import logging
+import multiprocessing
+from typing import Optional
+
+import numpy as np
+
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.threads import apply_thread_budget, available_cores, split_threads
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def run_inference(
+    model_name: str,
+    backend: Optional[str],
+    threads: Optional[int],
+    duration: float,
+    batch_size: int,
+    barrier,
+    results
+) -> None:
+    """
+    Run batched inference on synthetic frames for `duration` seconds, like one detection job.
+
+    Args:
+        model_name: Model to run
+        backend: Inference backend
+        threads: Thread budget of the process (None to leave the library defaults)
+        duration: Seconds to run after all processes are ready
+        batch_size: Frames per model call
+        barrier: Released once every process has loaded its model
+        results: Queue receiving the number of frames processed
+    """
+    if threads:
+        apply_thread_budget(threads)
+
+    from app.services.detection.registry import model_registry
+
+    detector = model_registry.get(model_name, backend=backend)
+    rng = np.random.default_rng(os.getpid())
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(batch_size)]
+    detector.detect_batch(frames, batch_size=batch_size)
+
+    barrier.wait()
+    processed = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        detector.detect_batch(frames, batch_size=batch_size)
+        processed += len(frames)
+
+    results.put(processed)
+
+def measure(jobs: int, threads: Optional[int], args) -> float:
+    """
+    Run `jobs` inference processes at once and return their aggregate frames per second.
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(jobs)
+    results = context.Queue()
+
+    processes = [
+        context.Process(
+            target=run_inference,
+            args=(args.model, args.backend, threads, args.duration, args.batch_size, barrier, results)
+        )
+        for _ in range(jobs)
+    ]
+    for process in processes:
+        process.start()
+
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+
+    return total / args.duration
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark aggregate inference throughput of concurrent jobs with and without a thread budget")
+    parser.add_argument("--model", default="yolov8n", help="Model name")
+    parser.add_argument("--backend", default=None, help="Inference backend (torch or onnx)")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4], help="Numbers of concurrent jobs")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds each configuration runs")
+    parser.add_argument("--batch-size", type=int, default=4, help="Frames per model call")
+    args = parser.parse_args()
+
+    cores = available_cores()
+    logger.info(f"{cores} cores available")
+    logger.info(f"{'jobs':>5} {'threads/job':>12} {'default fps':>12} {'budgeted fps':>13} {'gain':>6}")
+
+    for jobs in args.jobs:
+        threads = split_threads(cores, jobs)
+        default_fps = measure(jobs, None, args)
+        budgeted_fps = measure(jobs, threads, args)
+
+        logger.info(
+            f"{jobs:>5} {threads:>12} {default_fps:>12.1f} {budgeted_fps:>13.1f} "
+            f"{budgeted_fps / default_fps:>5.2f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# scripts/benchmark_tracker.py
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+from typing import Any, Dict, List
+
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.detection.tracking import ObjectTracker, calculate_iou
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+CLASSES = ["person", "car", "bicycle", "motorcycle"]
+
+def generate_crowded_scene(
+    frames: int,
+    objects: int,
+    width: int = 1920,
+    height: int = 1080,
+    seed: int = 42
+) -> List[List[Dict[str, Any]]]:
+    """
+    Generate synthetic per-frame detections for a busy scene.
+
+    Objects drift across the frame, are occasionally missed by the detector
+    and are replaced by new objects when they leave the frame.
+
+    Args:
+        frames: Number of frames
+        objects: Number of objects in view at any time
+        width: Frame width
+        height: Frame height
+        seed: Random seed
+
+    Returns:
+        List of detections per frame
+    """
+    rng = random.Random(seed)
+
+    def spawn():
+        return {
+            "class_name": rng.choice(CLASSES),
+            "x": rng.uniform(0, width - 80),
+            "y": rng.uniform(0, height - 160),
+            "w": rng.uniform(30, 80),
+            "h": rng.uniform(60, 160),
+            "vx": rng.uniform(-4, 4),
+            "vy": rng.uniform(-2, 2),
+        }
+
+    scene = [spawn() for _ in range(objects)]
+    all_detections = []
+
+    for _ in range(frames):
+        detections = []
+        for index, obj in enumerate(scene):
+            obj["x"] += obj["vx"]
+            obj["y"] += obj["vy"]
+            if not (0 <= obj["x"] <= width - obj["w"] and 0 <= obj["y"] <= height - obj["h"]):
+                scene[index] = obj = spawn()
+
+            # Detector misses ~10% of objects in any frame
+            if rng.random() < 0.1:
+                continue
+
+            detections.append({
+                "class_name": obj["class_name"],
+                "confidence": rng.uniform(0.3, 0.95),
+                "bbox": [obj["x"], obj["y"], obj["w"], obj["h"]],
+            })
+        all_detections.append(detections)
+
+    return all_detections
+
+def legacy_timeline_events(all_detections: List[List[Dict[str, Any]]], fps: float) -> List[Dict[str, Any]]:
+    """
+    Previous tracker: scalar IoU against every track ever created, greedy first match.
+    """
+    object_tracks = {}
+    next_track_id = 1
+
+    for frame_number, detections in enumerate(all_detections):
+        timestamp = frame_number / fps
+
+        for detection in detections:
+            matched = False
+
+            for track_id, track_data in object_tracks.items():
+                if track_data["class_name"] != detection["class_name"]:
+                    continue
+                if frame_number - track_data["last_frame"] > 10:
+                    continue
+                if calculate_iou(detection["bbox"], track_data["last_bbox"]) > 0.5:
+                    track_data["detections"].append({"frame": frame_number, "time": timestamp})
+                    track_data["last_frame"] = frame_number
+                    track_data["last_bbox"] = detection["bbox"]
+                    matched = True
+                    break
+
+            if not matched:
+                object_tracks[next_track_id] = {
+                    "class_name": detection["class_name"],
+                    "last_frame": frame_number,
+                    "last_bbox": detection["bbox"],
+                    "detections": [{"frame": frame_number, "time": timestamp}],
+                }
+                next_track_id += 1
+
+    return [
+        {"track_id": track_id, "class_name": track_data["class_name"]}
+        for track_id, track_data in object_tracks.items()
+        if len(track_data["detections"]) >= 3
+    ]
+
+def vectorized_timeline_events(all_detections: List[List[Dict[str, Any]]], fps: float) -> List[Dict[str, Any]]:
+    """
+    Current tracker: per-class active tracks and global assignment, with
+    scalar IoU for few objects and an IoU matrix for many.
+    """
+    tracker = ObjectTracker(fps, frame_count=len(all_detections))
+    events = []
+    for frame_number, detections in enumerate(all_detections):
+        events.extend(tracker.update(frame_number, detections))
+    events.extend(tracker.finish())
+    return events
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the object tracker on crowded synthetic data")
+    parser.add_argument("--frames", type=int, default=3000, help="Number of frames")
+    parser.add_argument("--objects", type=int, nargs="+", default=[5, 20, 50, 100], help="Objects in view per frame")
+    parser.add_argument("--fps", type=float, default=25.0, help="Frames per second")
+    args = parser.parse_args()
+
+    logger.info(f"{'objects':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8} {'legacy events':>14} {'vectorized events':>18}")
+
+    for objects in args.objects:
+        all_detections = generate_crowded_scene(args.frames, objects)
+
+        started = time.perf_counter()
+        legacy_events = legacy_timeline_events(all_detections, args.fps)
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        events = vectorized_timeline_events(all_detections, args.fps)
+        vectorized_time = time.perf_counter() - started
+
+        logger.info(
+            f"{objects:>8} {legacy_time:>12.3f} {vectorized_time:>15.3f} "
+            f"{legacy_time / vectorized_time:>7.1f}x {len(legacy_events):>14} {len(events):>18}"
+        )
+
+if __name__ == "__main__":
+    main()
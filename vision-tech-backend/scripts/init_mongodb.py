@@ -3,6 +3,7 @@ import os
 import sys
 import logging
 from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 # Add parent directory to path to import from app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,6 +11,63 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def drop_index_if_exists(collection, name):
+    """
+    Drop an index created by an earlier version of this script.
+    
+    The unique result indexes gained the "analyzer" field of composite jobs,
+    so the old ones would reject the per-analyzer documents.
+    """
+    if name in collection.index_information():
+        logger.info(f"Dropping outdated index {name} on {collection.name}")
+        collection.drop_index(name)
+
+def remove_duplicates(collection, fields):
+    """
+    Delete documents that share their key with a newer document.
+    
+    Jobs resumed by older versions could store a result twice, which the
+    unique indexes reject. The most recently inserted document of each key
+    is kept, as it holds the result of the last run over that frame.
+    
+    Returns:
+        Number of deleted documents
+    """
+    pipeline = [
+        {"$sort": {"_id": ASCENDING}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    
+    deleted = 0
+    for group in collection.aggregate(pipeline, allowDiskUse=True):
+        deleted += collection.delete_many({"_id": {"$in": group["ids"][:-1]}}).deleted_count
+    
+    if deleted:
+        logger.warning(f"Deleted {deleted} duplicate document(s) from {collection.name}")
+    return deleted
+
+def create_unique_index(collection, fields):
+    """
+    Create a unique index on `fields`, removing existing duplicates first.
+    
+    Raises:
+        RuntimeError: If duplicates remain, e.g. because a detection worker
+            is still writing results
+    """
+    remove_duplicates(collection, fields)
+    try:
+        collection.create_index([(field, ASCENDING) for field in fields], unique=True)
+    except (DuplicateKeyError, OperationFailure) as e:
+        raise RuntimeError(
+            f"Could not create the unique index on {collection.name} ({', '.join(fields)}): {e}. "
+            "Stop the detection workers and run this script again to remove the duplicates."
+        ) from e
+
 def init_mongodb():
     """
     Initialize MongoDB with required collections and indexes.
@@ -30,6 +88,8 @@ def init_mongodb():
     logger.info("Setting up detection_results collection")
     detection_results = db.detection_results
     detection_results.create_index([("job_id", ASCENDING)])
+    drop_index_if_exists(detection_results, "job_id_1_frame_number_1")
+    create_unique_index(detection_results, ["job_id", "analyzer", "frame_number"])
     detection_results.create_index([("video_id", ASCENDING)])
     detection_results.create_index([("frame_number", ASCENDING)])
     detection_results.create_index([("timestamp", ASCENDING)])
@@ -38,6 +98,8 @@ def init_mongodb():
     logger.info("Setting up object_thumbnails collection")
     object_thumbnails = db.object_thumbnails
     object_thumbnails.create_index([("job_id", ASCENDING)])
+    drop_index_if_exists(object_thumbnails, "job_id_1_frame_number_1_object_index_1")
+    create_unique_index(object_thumbnails, ["job_id", "analyzer", "frame_number", "object_index"])
     object_thumbnails.create_index([("video_id", ASCENDING)])
     object_thumbnails.create_index([("class_name", ASCENDING)])
     object_thumbnails.create_index([("confidence", DESCENDING)])
@@ -45,7 +107,8 @@ def init_mongodb():
     # Create collections and indexes for timelines
     logger.info("Setting up timelines collection")
     timelines = db.timelines
-    timelines.create_index([("job_id", ASCENDING)], unique=True)
+    drop_index_if_exists(timelines, "job_id_1")
+    create_unique_index(timelines, ["job_id", "analyzer"])
     timelines.create_index([("video_id", ASCENDING)])
     
     logger.info("MongoDB initialization completed successfully")
@@ -1,6 +1,7 @@
 # scripts/preload_models.py
 import os
 import sys
+import json
 import argparse
 import logging
 from pathlib import Path
@@ -59,6 +60,83 @@ def download_models(force_download=False):
         except Exception as e:
             logger.error(f"Failed to download {model_name}: {str(e)}")
 
+def prepare_quantized_models(model_names, mode="dynamic", calibration_frames=100, evaluation_frames=50):
+    """
+    Produce INT8 variants of YOLO models and report how they compare with the float models.
+    
+    Each model is exported to ONNX and quantized into `<model>-int8.onnx` in the
+    models directory, which the model registry serves as a separate model id.
+    Both variants then run on held-out frames, which calibration never saw, to
+    measure their speed and how well the INT8 detections agree with the float ones.
+    
+    Args:
+        model_names: Models to quantize, e.g. ["yolov8s"]
+        mode: "dynamic" or "static" quantization
+        calibration_frames: Number of calibration frames to take from uploaded videos
+        evaluation_frames: Number of held-out frames to compare the models on
+    """
+    from app.services.detection.onnx_backend import ONNXDetector, export_onnx_model
+    from app.services.detection.quantization import (
+        compare_models,
+        quantize_model,
+        sample_calibration_frames,
+        split_evaluation_frames,
+    )
+    from app.services.detection.registry import INT8_SUFFIX, model_registry
+    
+    models_dir = os.path.join(settings.LOCAL_STORAGE_PATH, "models")
+    report_path = os.path.join(models_dir, "quantization_report.json")
+    report = {}
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            report = json.load(f)
+    
+    frames, held_out = split_evaluation_frames(
+        sample_calibration_frames(count=calibration_frames + evaluation_frames),
+        evaluation_frames
+    )
+    logger.info(f"Sampled {len(frames)} calibration and {len(held_out)} evaluation frames from uploaded videos")
+    if not frames and mode == "static":
+        logger.error("Static quantization needs calibration frames, upload some videos first")
+        return
+    
+    for model_name in model_names:
+        quantized_name = f"{model_name}{INT8_SUFFIX}"
+        try:
+            # Quantize from the float ONNX export of the current weights
+            model_path = model_registry.resolve_path(model_name)
+            onnx_path = export_onnx_model(model_path, model_registry.weights_hash(model_name))
+            quantized_path = os.path.join(models_dir, f"{quantized_name}.onnx")
+            
+            logger.info(f"Quantizing {model_name} ({mode})...")
+            quantize_model(onnx_path, quantized_path, mode=mode, calibration_frames=frames)
+            
+            entry = {
+                "model": model_name,
+                "mode": mode,
+                "float_size_mb": round(os.path.getsize(onnx_path) / (1024 * 1024), 1),
+                "int8_size_mb": round(os.path.getsize(quantized_path) / (1024 * 1024), 1),
+            }
+            
+            # Compare against the float model on the same runtime, so only quantization differs
+            if held_out:
+                entry.update(compare_models(ONNXDetector(onnx_path), ONNXDetector(quantized_path), held_out))
+                logger.info(
+                    f"{quantized_name}: {entry['candidate_ms_per_frame']} ms/frame vs "
+                    f"{entry['reference_ms_per_frame']} ms/frame float ({entry['speedup']}x), "
+                    f"agreement f1 {entry['agreement']['f1']}"
+                )
+            else:
+                logger.warning(f"No evaluation frames, skipping comparison for {quantized_name}")
+            
+            report[quantized_name] = entry
+        except Exception as e:
+            logger.error(f"Failed to quantize {model_name}: {str(e)}")
+    
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote quantization report to {report_path}")
+
 def create_directories():
     """Create required directories for the application."""
     # Main storage directory
@@ -85,6 +163,10 @@ def create_directories():
 def main():
     parser = argparse.ArgumentParser(description="Setup Vision Tech Platform")
     parser.add_argument("--force", action="store_true", help="Force re-download of models even if they exist")
+    parser.add_argument("--quantize", nargs="+", metavar="MODEL", help="Models to produce INT8 variants of, e.g. yolov8s")
+    parser.add_argument("--quantize-mode", choices=["dynamic", "static"], default="dynamic", help="INT8 quantization mode")
+    parser.add_argument("--calibration-frames", type=int, default=100, help="Frames from uploaded videos used for calibration")
+    parser.add_argument("--evaluation-frames", type=int, default=50, help="Held-out frames the INT8 and float models are compared on")
     args = parser.parse_args()
     
     logger.info("Setting up Vision Tech Platform...")
@@ -95,6 +177,15 @@ def main():
     # Download YOLO models
     download_models(force_download=args.force)
     
+    # Prepare INT8 variants for CPU-only deployments
+    if args.quantize:
+        prepare_quantized_models(
+            args.quantize,
+            mode=args.quantize_mode,
+            calibration_frames=args.calibration_frames,
+            evaluation_frames=args.evaluation_frames
+        )
+    
     logger.info("Setup completed successfully!")
 
 if __name__ == "__main__":
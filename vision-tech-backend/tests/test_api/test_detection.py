@@ -0,0 +1,204 @@
+import asyncio
+import types
+
+import mongomock
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import detection as detection_api
+from app.api.detection import (
+    cancel_detection_job,
+    pause_detection_job,
+    read_frame_results,
+    resume_detection_job,
+    stream_detection_job_progress,
+)
+from app.core.config import settings
+from app.db.base import Base
+from app.models.detection import DetectionJob
+from app.models.project import Project
+from app.models.usage_log import UsageLog
+from app.models.video import Video
+from app.schemas.detection import FrameDetections
+
+
+def make_job(stats=None, model_name="motion_detection", parameters=None):
+    return types.SimpleNamespace(
+        id=1,
+        video_id=2,
+        model_name=model_name,
+        parameters=parameters or {},
+        stats=stats,
+    )
+
+
+def store_motion_frames(collection, frame_numbers, fps=10.0):
+    # Stored the way store_frame_motion does: motion frames only, without detections
+    collection.insert_many([
+        {
+            "job_id": 1,
+            "video_id": 2,
+            "frame_number": frame_number,
+            "timestamp": frame_number / fps,
+            "motion_areas": [[10.0, 20.0, 30.0, 40.0]],
+        }
+        for frame_number in frame_numbers
+    ])
+
+
+def test_read_frames_of_unfinished_motion_job():
+    collection = mongomock.MongoClient().db.detection_results
+    store_motion_frames(collection, [3, 4, 9])
+
+    # No "sampling" until the job completes
+    job = make_job(stats={"pipeline": {}})
+    frames = read_frame_results(collection, job)
+
+    assert [frame["frame_number"] for frame in frames] == [3, 4, 9]
+    for frame in frames:
+        parsed = FrameDetections(**frame)
+        assert parsed.detections[0].class_name == "motion"
+        assert parsed.detections[0].bbox == [10.0, 20.0, 30.0, 40.0]
+
+
+def test_read_frames_of_unfinished_motion_job_pages():
+    collection = mongomock.MongoClient().db.detection_results
+    store_motion_frames(collection, [3, 4, 9])
+
+    frames = read_frame_results(collection, make_job(), start_time=0.35, skip=1, limit=5)
+
+    assert [frame["frame_number"] for frame in frames] == [9]
+    assert frames[0]["detections"]
+
+
+def test_read_frames_of_completed_motion_job_rebuilds_empty_frames():
+    collection = mongomock.MongoClient().db.detection_results
+    store_motion_frames(collection, [3, 4, 9])
+
+    job = make_job(stats={"sampling": {"fps": 10.0, "frame_count": 12, "stride": 3}})
+    frames = read_frame_results(collection, job)
+
+    assert [frame["frame_number"] for frame in frames] == [0, 3, 6, 9]
+    assert [len(frame["detections"]) for frame in frames] == [0, 1, 0, 1]
+    assert frames[0]["motion_areas"] == []
+
+
+ADMIN = types.SimpleNamespace(id=1, role=types.SimpleNamespace(name="admin"))
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    # One connection, so that sessions opened in other threads see the same database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[
+        Project.__table__, Video.__table__, DetectionJob.__table__, UsageLog.__table__
+    ])
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(detection_api, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    session.add(Project(id=1, name="Case", case_number="C-1", created_by=1))
+    session.add(Video(id=1, project_id=1, filename="clip.mp4", original_filename="clip.mp4",
+                      file_path="videos/clip.mp4", file_size=1000, uploaded_by=1))
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_control_job(db, status, **values):
+    job = DetectionJob(video_id=1, model_name="yolov8n", created_by=1, status=status, **values)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_cancel_and_pause_a_running_job_through_its_worker(db):
+    job_id = add_control_job(db, "in_progress")
+
+    job = pause_detection_job(db=db, job_id=job_id, current_user=ADMIN)
+    assert (job.status, job.requested_action) == ("in_progress", "pause")
+
+    job = cancel_detection_job(db=db, job_id=job_id, current_user=ADMIN)
+    assert (job.status, job.requested_action) == ("in_progress", "cancel")
+
+
+def test_cancel_a_paused_job_drops_its_checkpoint(db):
+    job_id = add_control_job(db, "paused", checkpoint_frame=50, checkpoint_state={})
+
+    job = cancel_detection_job(db=db, job_id=job_id, current_user=ADMIN)
+
+    assert job.status == "cancelled"
+    assert job.checkpoint_frame is None
+
+
+def test_resume_a_paused_job_queues_it_from_its_checkpoint(db):
+    job_id = add_control_job(db, "paused", attempts=2, checkpoint_frame=50, checkpoint_state={})
+
+    job = resume_detection_job(db=db, job_id=job_id, current_user=ADMIN)
+
+    assert (job.status, job.attempts, job.checkpoint_frame) == ("pending", 0, 50)
+
+
+def test_resume_withdraws_a_pending_pause(db):
+    job_id = add_control_job(db, "in_progress", requested_action="pause")
+
+    job = resume_detection_job(db=db, job_id=job_id, current_user=ADMIN)
+
+    assert (job.status, job.requested_action) == ("in_progress", None)
+
+
+def test_finished_jobs_cannot_be_controlled(db):
+    job_id = add_control_job(db, "completed")
+
+    for control in (cancel_detection_job, pause_detection_job, resume_detection_job):
+        with pytest.raises(HTTPException) as raised:
+            control(db=db, job_id=job_id, current_user=ADMIN)
+        assert raised.value.status_code == 400
+
+
+def read_stream(response, on_event=None):
+    async def collect():
+        events = []
+        async for chunk in response.body_iterator:
+            events.append(chunk)
+            if on_event is not None:
+                on_event(chunk)
+        return events
+
+    return asyncio.run(collect())
+
+
+def test_progress_stream_ends_when_the_job_stops(db, monkeypatch):
+    monkeypatch.setattr(settings, "DETECTION_PROGRESS_INTERVAL", 0.01)
+    job_id = add_control_job(db, "completed", frames_processed=10, total_frames=10)
+
+    response = stream_detection_job_progress(db=db, job_id=job_id, current_user=ADMIN)
+    events = read_stream(response)
+
+    assert len(events) == 1
+    assert events[0].startswith("event: progress\n")
+    assert '"progress": 100.0' in events[0]
+
+
+def test_progress_stream_ends_when_the_job_is_deleted(db, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "DETECTION_PROGRESS_INTERVAL", 0.01)
+    job_id = add_control_job(db, "in_progress", frames_processed=5, total_frames=10)
+
+    def delete_job(event):
+        other = session_factory()
+        other.query(DetectionJob).filter(DetectionJob.id == job_id).delete()
+        other.commit()
+        other.close()
+
+    response = stream_detection_job_progress(db=db, job_id=job_id, current_user=ADMIN)
+    events = read_stream(response, on_event=delete_job)
+
+    assert len(events) == 1
+    assert '"status": "in_progress"' in events[0]
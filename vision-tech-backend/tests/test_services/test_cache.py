@@ -0,0 +1,100 @@
+import hashlib
+import types
+
+import pytest
+
+from app.core.config import settings
+from app.services.detection import cache
+from app.services.detection.cache import compute_file_hash, get_video_hash, job_fingerprint, normalize_parameters
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def weights(monkeypatch):
+    hashes = {"yolov8n": "n-weights", "yolov8x": "x-weights"}
+    monkeypatch.setattr(cache.model_registry, "weights_hash", lambda model_name: hashes[model_name])
+    return hashes
+
+
+def make_job(model_name="yolov8n", **parameters):
+    return types.SimpleNamespace(id=1, model_name=model_name, parameters=parameters)
+
+
+def make_video(content_hash="video-hash"):
+    return types.SimpleNamespace(id=1, file_path="videos/clip.mp4", content_hash=content_hash)
+
+
+def fingerprint(job, video=None):
+    return job_fingerprint(FakeSession(), job, video or make_video())
+
+
+def test_normalize_parameters_drops_execution_and_unset_parameters():
+    params = {"conf_threshold": 0.4, "batch_size": 8, "inference_workers": 2, "roi": None, "classes": [2, 0]}
+
+    assert normalize_parameters(params) == {"conf_threshold": 0.4, "classes": [0, 2]}
+    assert normalize_parameters(None) == {}
+
+
+def test_equivalent_jobs_share_a_fingerprint(weights):
+    first = make_job(conf_threshold=0.4, classes=[2, 0], batch_size=1)
+    second = make_job(conf_threshold=0.4, classes=[0, 2], batch_size=16, parallel_segments=4, roi=None)
+
+    assert fingerprint(first) == fingerprint(second)
+
+
+@pytest.mark.parametrize("changed", [
+    make_job(conf_threshold=0.5),
+    make_job("yolov8x", conf_threshold=0.4),
+    make_job(conf_threshold=0.4, backend="onnx"),
+    make_job(conf_threshold=0.4, cascade_model="yolov8x"),
+    make_job(conf_threshold=0.4, frame_step=2),
+])
+def test_result_affecting_changes_change_the_fingerprint(weights, changed, monkeypatch):
+    monkeypatch.setattr(settings, "DETECTION_BACKEND", "torch")
+
+    assert fingerprint(make_job(conf_threshold=0.4)) != fingerprint(changed)
+
+
+def test_fingerprint_follows_weights_and_video(weights):
+    job = make_job(conf_threshold=0.4)
+    original = fingerprint(job)
+
+    assert fingerprint(job, make_video("other-video")) != original
+
+    weights["yolov8n"] = "retrained-weights"
+    assert fingerprint(job) != original
+
+
+def test_composite_fingerprint_covers_every_analyzer(weights):
+    job = make_job("composite", analyzers=["yolov8n", "motion_detection"])
+    original = fingerprint(job)
+
+    weights["yolov8n"] = "retrained-weights"
+    assert fingerprint(job) != original
+    assert fingerprint(make_job("composite", analyzers=["yolov8x", "motion_detection"])) != original
+
+
+def test_motion_fingerprint_does_not_need_weights():
+    assert fingerprint(make_job("motion_detection")) == fingerprint(make_job("motion_detection", batch_size=4))
+
+
+def test_video_hash_is_computed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_PATH", str(tmp_path))
+    (tmp_path / "videos").mkdir()
+    (tmp_path / "videos" / "clip.mp4").write_bytes(b"frames" * 1000)
+    db = FakeSession()
+    video = make_video(content_hash=None)
+
+    expected = hashlib.sha256(b"frames" * 1000).hexdigest()
+    assert compute_file_hash(str(tmp_path / "videos" / "clip.mp4")) == expected
+    assert get_video_hash(db, video) == expected
+    assert get_video_hash(db, video) == expected
+    assert video.content_hash == expected
+    assert db.commits == 1
@@ -0,0 +1,37 @@
+from app.services.detection.sparse_results import complete_frame, sampled_frame_numbers
+
+
+def test_complete_frame_rebuilds_motion_detections():
+    frame_data = {"frame_number": 4, "motion_areas": [[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]]}
+
+    complete_frame(frame_data)
+
+    assert frame_data["detections"] == [
+        {"class_id": 0, "class_name": "motion", "confidence": 1.0, "bbox": [1.0, 2.0, 3.0, 4.0]},
+        {"class_id": 0, "class_name": "motion", "confidence": 1.0, "bbox": [5.0, 6.0, 7.0, 8.0]},
+    ]
+
+
+def test_complete_frame_keeps_stored_detections():
+    detections = [{"class_id": 2, "class_name": "car", "confidence": 0.8, "bbox": [0, 0, 10, 10]}]
+    frame_data = {"frame_number": 4, "detections": detections}
+
+    assert complete_frame(frame_data)["detections"] is detections
+
+
+def test_complete_frame_without_motion_areas():
+    assert complete_frame({"frame_number": 4})["detections"] == []
+
+
+def test_sampled_frame_numbers_with_stride():
+    sampling = {"fps": 10.0, "frame_count": 20, "stride": 4}
+
+    assert list(sampled_frame_numbers(sampling)) == [0, 4, 8, 12, 16]
+    assert list(sampled_frame_numbers(sampling, start_time=0.5, end_time=1.2)) == [8, 12]
+
+
+def test_sampled_frame_numbers_with_keyframes():
+    sampling = {"fps": 10.0, "frame_count": 20, "keyframes": [0, 7, 15]}
+
+    assert list(sampled_frame_numbers(sampling, start_time=0.1)) == [7, 15]
+    assert list(sampled_frame_numbers(sampling, start_time=1.6)) == []
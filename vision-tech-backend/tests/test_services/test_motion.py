@@ -0,0 +1,44 @@
+import numpy as np
+
+from app.services.detection.motion import MotionDetector
+
+
+def moving_square_frames(width, height, size, count=4):
+    frames = []
+    for index in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        x = size * (2 + 2 * index)
+        frame[size:2 * size, x:x + size] = 255
+        frames.append(frame)
+    return frames
+
+
+def detect_all(detector, frames):
+    return [detector.detect(frame) for frame in frames]
+
+
+def test_detects_moving_area_at_full_resolution():
+    detector = MotionDetector(analysis_size=None, min_area=500)
+
+    results = detect_all(detector, moving_square_frames(1280, 720, 40))
+
+    assert results[0] == (False, [])
+    assert all(detected for detected, _ in results[1:])
+
+
+def test_frames_shrunk_before_detection_match_full_resolution():
+    full = detect_all(MotionDetector(analysis_size=None, min_area=500), moving_square_frames(1280, 720, 40))
+
+    # The same scene shrunk to a quarter, as the ffmpeg decoder delivers it
+    frames = moving_square_frames(320, 180, 10)
+    unscaled = detect_all(MotionDetector(analysis_size=None, min_area=500), frames)
+    scaled = detect_all(MotionDetector(analysis_size=None, min_area=500, frame_scale=0.25), frames)
+
+    assert [detected for detected, _ in scaled] == [detected for detected, _ in full]
+    assert [detected for detected, _ in unscaled] != [detected for detected, _ in full]
+
+    # Motion areas stay in the coordinates of the frames passed in
+    for (_, full_areas), (_, scaled_areas) in zip(full, scaled):
+        assert len(scaled_areas) == len(full_areas)
+        for full_area, scaled_area in zip(sorted(full_areas), sorted(scaled_areas)):
+            assert all(abs(a / 4 - b) <= 4 for a, b in zip(full_area, scaled_area))
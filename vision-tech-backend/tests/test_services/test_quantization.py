@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from onnxruntime.quantization import CalibrationDataReader
+
+from app.services.detection.quantization import FrameCalibrationReader, split_evaluation_frames
+
+
+def make_frames(count):
+    return [np.full((48, 64, 3), index, dtype=np.uint8) for index in range(count)]
+
+
+def test_evaluation_frames_are_held_out_of_calibration():
+    calibration, evaluation = split_evaluation_frames(make_frames(15), 5)
+
+    calibration_ids = {int(frame[0, 0, 0]) for frame in calibration}
+    evaluation_ids = {int(frame[0, 0, 0]) for frame in evaluation}
+
+    assert len(calibration) == 10 and len(evaluation) == 5
+    assert not calibration_ids & evaluation_ids
+    assert min(evaluation_ids) == 0 and max(evaluation_ids) == 14
+
+
+def test_no_evaluation_frames():
+    calibration, evaluation = split_evaluation_frames(make_frames(4), 0)
+
+    assert len(calibration) == 4 and evaluation == []
+
+
+def test_calibration_reader_feeds_letterboxed_frames():
+    reader = FrameCalibrationReader("images", make_frames(2), 64)
+
+    assert isinstance(reader, CalibrationDataReader)
+    first = reader.get_next()
+    assert first["images"].shape == (1, 3, 64, 64)
+    assert first["images"].dtype == np.float32
+    assert reader.get_next() is not None
+    assert reader.get_next() is None
@@ -0,0 +1,153 @@
+from app.services.detection.tracking import ObjectTracker, SCALAR_MAX_PAIRS, stitch_tracks
+
+
+def detection(bbox, class_name="person", confidence=0.9):
+    return {"class_name": class_name, "confidence": confidence, "bbox": bbox}
+
+
+def run_tracker(tracker, frames):
+    events = []
+    for frame_number, detections in enumerate(frames):
+        events.extend(tracker.update(frame_number, detections))
+    events.extend(tracker.finish())
+    return events
+
+
+def test_tracks_objects_across_frames():
+    frames = [
+        [detection([10 + 2 * i, 10, 50, 100]), detection([300 - 2 * i, 10, 50, 100])]
+        for i in range(5)
+    ]
+
+    events = run_tracker(ObjectTracker(10.0, frame_count=5), frames)
+
+    assert len(events) == 2
+    assert all(event["first_frame"] == 0 and event["last_frame"] == 4 for event in events)
+
+
+def test_swapped_objects_follow_the_best_overlap():
+    tracker = ObjectTracker(10.0, min_detections=1)
+    tracker.update(0, [detection([0, 0, 100, 100]), detection([60, 0, 100, 100])])
+
+    # The first box moved onto the second track's position and vice versa
+    tracker.update(1, [detection([58, 0, 100, 100]), detection([2, 0, 100, 100])])
+
+    tracks = tracker.active_tracks["person"]
+    assert len(tracks) == 2
+    assert tracks[1]["last_bbox"] == [2, 0, 100, 100]
+    assert tracks[2]["last_bbox"] == [58, 0, 100, 100]
+
+
+def test_assignment_maximizes_total_overlap():
+    tracker = ObjectTracker(10.0, iou_threshold=0.3, min_detections=1)
+    tracker.update(0, [detection([0, 0, 100, 100]), detection([60, 0, 100, 100])])
+
+    # A overlaps track 1 best (0.67) but also track 2 (0.43); B only overlaps
+    # track 1 (0.5). Matching A to track 1 first would leave B unmatched.
+    tracker.update(1, [detection([20, 0, 100, 100]), detection([-33, 0, 100, 100])])
+
+    tracks = tracker.active_tracks["person"]
+    assert len(tracks) == 2
+    assert tracks[1]["last_bbox"] == [-33, 0, 100, 100]
+    assert tracks[2]["last_bbox"] == [20, 0, 100, 100]
+
+
+def test_few_and_many_objects_are_matched_alike():
+    # The same competing pair, once alone and once among enough objects for the IoU matrix
+    count = int(SCALAR_MAX_PAIRS ** 0.5) + 2
+    crowd = [detection([300 * j, 500, 80, 80]) for j in range(1, count)]
+
+    for others in ([], crowd):
+        tracker = ObjectTracker(10.0, iou_threshold=0.3, min_detections=1)
+        tracker.update(0, [detection([0, 0, 100, 100]), detection([60, 0, 100, 100])] + others)
+        tracker.update(1, [detection([20, 0, 100, 100]), detection([-33, 0, 100, 100])] + others)
+
+        tracks = tracker.active_tracks["person"]
+        assert len(tracks) == 2 + len(others)
+        assert tracks[1]["last_bbox"] == [-33, 0, 100, 100]
+        assert tracks[2]["last_bbox"] == [20, 0, 100, 100]
+
+
+def test_scalar_and_matrix_matching_agree():
+    # Enough objects of one class to go past the scalar IoU matching
+    count = int(SCALAR_MAX_PAIRS ** 0.5) + 2
+    frames = [
+        [detection([200 * j + i, 100 * (j % 3), 80, 80]) for j in range(count)]
+        for i in range(6)
+    ]
+
+    events = run_tracker(ObjectTracker(10.0, frame_count=6), frames)
+
+    assert len(events) == count
+    assert all(event["first_frame"] == 0 and event["last_frame"] == 5 for event in events)
+
+
+def test_classes_are_tracked_separately():
+    frames = [[detection([10, 10, 50, 50], "person"), detection([10, 10, 50, 50], "car")] for _ in range(3)]
+
+    events = run_tracker(ObjectTracker(10.0, frame_count=3), frames)
+
+    assert sorted(event["class_name"] for event in events) == ["car", "person"]
+
+
+def track_in_segments(frames, boundaries):
+    """
+    Track each segment independently, then join them like a segmented job does.
+    """
+    ranges = list(zip(boundaries, boundaries[1:] + [None]))
+    events = []
+    segments = []
+    for start, end in ranges:
+        tracker = ObjectTracker(10.0, frame_count=len(frames), segment=(start, end))
+        for frame_number in range(start, end if end is not None else len(frames)):
+            events.extend(tracker.update(frame_number, frames[frame_number]))
+        events.extend(tracker.finish())
+        segments.append((start, tracker.boundary_tracks))
+
+    tracker = ObjectTracker(10.0, frame_count=len(frames))
+    for track in stitch_tracks(segments, tracker.max_gap_frames, tracker.iou_threshold):
+        event = tracker.to_event(track["track_id"], track)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def test_stitching_joins_tracks_cut_at_segment_boundaries():
+    frames = [[detection([10 + i, 10, 50, 100]), detection([400, 10 + i, 50, 100], "car")] for i in range(60)]
+
+    events = track_in_segments(frames, [0, 20, 40])
+
+    assert sorted((e["class_name"], e["first_frame"], e["last_frame"]) for e in events) == [
+        ("car", 0, 59),
+        ("person", 0, 59),
+    ]
+
+
+def test_stitching_matches_unsegmented_tracking():
+    frames = []
+    for i in range(50):
+        detections = [detection([10 + 3 * i, 10, 50, 100])]
+        if 15 <= i < 35:
+            # An object that crosses the first boundary and leaves mid-video
+            detections.append(detection([600, 300, 60, 60], "car"))
+        if i >= 22:
+            # An object that appears right after a boundary
+            detections.append(detection([900, 500, 40, 40], "bicycle"))
+        frames.append(detections)
+
+    segmented = track_in_segments(frames, [0, 20, 40])
+    whole = run_tracker(ObjectTracker(10.0, frame_count=50), frames)
+
+    def spans(events):
+        return sorted((e["class_name"], e["first_frame"], e["last_frame"]) for e in events)
+
+    assert spans(segmented) == spans(whole)
+
+
+def test_stitching_keeps_separate_objects_apart():
+    # The person leaves before the boundary; a different person far away appears after it
+    frames = [[detection([10, 10, 50, 100])] if i < 18 else [detection([800, 400, 50, 100])] for i in range(40)]
+
+    events = track_in_segments(frames, [0, 20])
+
+    assert sorted((e["first_frame"], e["last_frame"]) for e in events) == [(0, 17), (18, 39)]
@@ -0,0 +1,47 @@
+import threading
+import time
+
+import numpy as np
+
+from app.services.detection import yolo
+from app.services.detection.yolo import YOLODetector
+
+
+class FakeYOLO:
+    """
+    Records how many calls run at the same time, like a predictor that
+    keeps per-call state on itself.
+    """
+
+    names = {0: "person"}
+
+    def __init__(self, model_path):
+        self.running = 0
+        self.max_running = 0
+        self.guard = threading.Lock()
+
+    def __call__(self, source, **kwargs):
+        with self.guard:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self.guard:
+            self.running -= 1
+        return []
+
+
+def test_shared_detector_runs_one_model_call_at_a_time(monkeypatch):
+    monkeypatch.setattr(yolo, "YOLO", FakeYOLO)
+    detector = YOLODetector()
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    threads = [
+        threading.Thread(target=detector.detect_batch, args=([frame] * 4,), kwargs={"batch_size": 2})
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert detector.model.max_running == 1
@@ -0,0 +1,76 @@
+import cv2
+import mongomock
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.detection import DetectionJob
+from app.models.video import Video
+from app.services.detection.result_writer import ResultWriter
+from app.tasks import composite
+from app.tasks.composite import process_composite_detection
+
+
+@pytest.fixture
+def db():
+    # The pipeline's writer thread uses the session too
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[DetectionJob.__table__, Video.__table__])
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    db_mongo = mongomock.MongoClient().db
+    monkeypatch.setattr(composite, "create_result_writer", lambda params: ResultWriter(db_mongo))
+    return db_mongo
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    monkeypatch.setattr(composite.settings, "LOCAL_STORAGE_PATH", str(tmp_path))
+    writer = cv2.VideoWriter(str(tmp_path / "clip.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (160, 120))
+    for i in range(60):
+        frame = np.full((120, 160, 3), 90, dtype=np.uint8)
+        cv2.rectangle(frame, (10, 10), (150, 30), (200, 200, 200), -1)
+        if i >= 20:
+            # A box crossing the scene
+            x = 2 * (i - 20)
+            cv2.rectangle(frame, (x, 60), (x + 30, 100), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return Video(id=1, project_id=1, filename="clip.avi", original_filename="clip.avi",
+                 file_path="clip.avi", file_size=1, uploaded_by=1)
+
+
+def run_job(db, video, checkpoint_frame=None):
+    job = DetectionJob(
+        video_id=1, model_name="composite", created_by=1, status="in_progress",
+        parameters={"analyzers": ["motion_detection"], "segment_warmup_frames": 30},
+        checkpoint_frame=checkpoint_frame,
+        checkpoint_state={"analyzers": {"motion_detection": {}}} if checkpoint_frame else None,
+    )
+    db.add(job)
+    db.commit()
+    process_composite_detection(db, job, video)
+    return job.id
+
+
+def motion_frames(db_mongo, job_id):
+    return {
+        doc["frame_number"]: doc["motion_areas"]
+        for doc in db_mongo.detection_results.find({"job_id": job_id})
+    }
+
+
+def test_resumed_motion_analyzer_matches_an_uninterrupted_run(db, mongo, video):
+    whole = motion_frames(mongo, run_job(db, video))
+    resumed = motion_frames(mongo, run_job(db, video, checkpoint_frame=40))
+
+    assert resumed
+    assert resumed == {n: areas for n, areas in whole.items() if n >= 40}
@@ -0,0 +1,127 @@
+import pickle
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.exceptions import JobInterrupted
+from app.db.base import Base
+from app.models.detection import DetectionJob
+from app.models.video import Video
+from app.tasks import detection
+from app.tasks.detection import JobControl, start_detection_job
+
+
+@pytest.fixture
+def session_factory():
+    # One connection, so that every session sees the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[DetectionJob.__table__, Video.__table__])
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    session.info["factory"] = session_factory
+    yield session
+    session.close()
+
+
+def add_job(db, **values):
+    db.add(Video(id=1, project_id=1, filename="clip.mp4", original_filename="clip.mp4",
+                 file_path="videos/clip.mp4", file_size=1000, uploaded_by=1))
+    job = DetectionJob(video_id=1, model_name="yolov8n", created_by=1, **values)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def set_requested_action(db, job, action):
+    # Written from another session, as the API does
+    other = db.info["factory"]()
+    other.query(DetectionJob).filter(DetectionJob.id == job.id).update({"requested_action": action})
+    other.commit()
+    other.close()
+
+
+def test_job_control_returns_the_requested_action(db):
+    job = add_job(db, status="in_progress")
+    control = JobControl(db, job, interval=0)
+
+    assert control.should_stop() is None
+
+    set_requested_action(db, job, "cancel")
+    assert control.should_stop() == "cancel"
+
+
+def test_job_control_sees_a_withdrawn_pause(db):
+    job = add_job(db, status="in_progress")
+    control = JobControl(db, job, interval=0)
+
+    set_requested_action(db, job, "pause")
+    assert control.should_stop() == "pause"
+
+    set_requested_action(db, job, None)
+    assert control.should_stop() is None
+
+
+def test_job_control_reads_the_database_at_most_every_interval(db):
+    job = add_job(db, status="in_progress")
+    control = JobControl(db, job, interval=60)
+
+    set_requested_action(db, job, "pause")
+    assert control.should_stop() is None
+
+
+def test_job_interrupted_keeps_its_action_across_processes():
+    error = pickle.loads(pickle.dumps(JobInterrupted("pause", "Job 1 stopped at frame 10")))
+
+    assert error.action == "pause"
+    assert str(error) == "Job 1 stopped at frame 10"
+
+
+def interrupt(monkeypatch, action, requested_action=None):
+    def process(db, job, video):
+        # The request may be gone from the row by the time the job stops
+        set_requested_action(db, job, requested_action)
+        raise JobInterrupted(action, f"Job {job.id} stopped at frame 50")
+
+    monkeypatch.setattr(detection, "process_yolo_detection", process)
+
+
+def test_paused_job_keeps_its_checkpoint(db, monkeypatch):
+    job = add_job(db, status="pending", requested_action="pause", checkpoint_frame=50, checkpoint_state={})
+    interrupt(monkeypatch, "pause", requested_action="pause")
+
+    start_detection_job(db, job.id)
+
+    db.refresh(job)
+    assert job.status == "paused"
+    assert job.checkpoint_frame == 50
+    assert job.requested_action is None
+
+
+def test_pause_withdrawn_after_the_job_stopped_is_not_a_cancel(db, monkeypatch):
+    job = add_job(db, status="pending", checkpoint_frame=50, checkpoint_state={})
+    interrupt(monkeypatch, "pause", requested_action=None)
+
+    start_detection_job(db, job.id)
+
+    db.refresh(job)
+    assert job.status == "paused"
+    assert job.checkpoint_frame == 50
+    assert job.completed_at is None
+
+
+def test_cancelled_job_drops_its_checkpoint(db, monkeypatch):
+    job = add_job(db, status="pending", checkpoint_frame=50, checkpoint_state={})
+    interrupt(monkeypatch, "cancel", requested_action="cancel")
+
+    start_detection_job(db, job.id)
+
+    db.refresh(job)
+    assert job.status == "cancelled"
+    assert job.checkpoint_frame is None and job.checkpoint_state is None
+    assert job.completed_at is not None
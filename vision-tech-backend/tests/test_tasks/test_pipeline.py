@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.tasks.pipeline import FramePipeline
+from app.utils.video import FrameSampler
+
+
+class FakeCapture:
+    """
+    Minimal cv2.VideoCapture stand-in: frame i is filled with the value i.
+    """
+
+    def __init__(self, frame_count, fail_at=None):
+        self.frame_count = frame_count
+        self.fail_at = fail_at
+        self.position = 0
+
+    def set(self, prop, value):
+        self.position = int(value)
+        return True
+
+    def grab(self):
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        if self.position == self.fail_at:
+            raise IOError("decoder failed")
+        if self.position >= self.frame_count:
+            return False, None
+        frame = np.full((4, 4, 3), self.position, dtype=np.uint8)
+        self.position += 1
+        return True, frame
+
+
+def frame_value(item):
+    return int(item["frame"][0, 0, 0])
+
+
+def run(pipeline, infer=None, write=None):
+    written = []
+    infer = infer or (lambda batch: [frame_value(item) for item in batch])
+    write = write or (lambda item, result: written.append((item["frame_number"], result)))
+    stats = pipeline.run(infer, write)
+    return written, stats
+
+
+def test_writes_every_frame_in_order():
+    written, stats = run(FramePipeline(FakeCapture(10), batch_size=3))
+
+    assert written == [(n, n) for n in range(10)]
+    assert stats["stages"]["write"]["items"] == 10
+
+
+def test_sampled_range():
+    pipeline = FramePipeline(FakeCapture(20), sampler=FrameSampler(stride=4), start_frame=5, end_frame=17)
+
+    written, _ = run(pipeline)
+
+    assert [n for n, _ in written] == [8, 12, 16]
+    assert all(n == value for n, value in written)
+
+
+def test_preprocess_runs_on_every_frame():
+    pipeline = FramePipeline(FakeCapture(3), preprocess=lambda frame: frame[0, 0, 0] * 2)
+
+    written, _ = run(pipeline, infer=lambda batch: [int(item["input"]) for item in batch])
+
+    assert written == [(0, 0), (1, 2), (2, 4)]
+
+
+def test_inference_error_propagates():
+    def infer(batch):
+        if batch[0]["frame_number"] >= 4:
+            raise ValueError("model failed")
+        return [None] * len(batch)
+
+    with pytest.raises(ValueError, match="model failed"):
+        run(FramePipeline(FakeCapture(100), batch_size=2, decode_queue_size=2), infer=infer)
+
+    # The decoder and writer threads are stopped, not left blocked on their queues
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def test_write_error_propagates():
+    def write(item, result):
+        if item["frame_number"] == 3:
+            raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError, match="database down"):
+        run(FramePipeline(FakeCapture(100), write_queue_size=2), write=write)
+
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def test_decode_error_propagates():
+    with pytest.raises(IOError, match="decoder failed"):
+        run(FramePipeline(FakeCapture(100, fail_at=5)))
+
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def test_frames_after_a_write_error_are_not_written():
+    written = []
+
+    def write(item, result):
+        if item["frame_number"] == 2:
+            raise RuntimeError("database down")
+        written.append(item["frame_number"])
+
+    with pytest.raises(RuntimeError):
+        run(FramePipeline(FakeCapture(50)), write=write)
+
+    assert written == [0, 1]
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from app.core.exceptions import JobInterrupted
+from app.tasks.detection import SegmentChannel, run_segments_in_parallel
+
+
+# Segment tasks run in spawned processes, so they must be module-level functions
+def segment_task(kind, value, progress=None, should_stop=None):
+    if kind == "fail":
+        time.sleep(value)
+        raise ValueError("segment failed")
+
+    if kind == "wait":
+        # Runs until told to stop, or for `value` seconds
+        deadline = time.monotonic() + value
+        while time.monotonic() < deadline:
+            action = should_stop()
+            if action:
+                raise JobInterrupted(action, "segment stopped")
+            time.sleep(0.05)
+        return {"stopped": False}
+
+    for _ in range(value):
+        progress(1)
+    return {"frames": value}
+
+
+def test_failed_segment_stops_the_others():
+    started = time.monotonic()
+
+    with pytest.raises(ValueError, match="segment failed"):
+        run_segments_in_parallel(segment_task, [("fail", 0.5), ("wait", 60)], should_stop=lambda: None)
+
+    assert time.monotonic() - started < 30
+
+
+def test_segments_report_progress_and_results_in_order():
+    reported = []
+
+    results = run_segments_in_parallel(segment_task, [("count", 30), ("count", 5)], progress=reported.append)
+
+    assert results == [{"frames": 30}, {"frames": 5}]
+    assert sum(reported) == 35
+
+
+def test_segments_stop_with_the_requested_action():
+    with pytest.raises(JobInterrupted) as raised:
+        run_segments_in_parallel(segment_task, [("wait", 60), ("wait", 60)], should_stop=lambda: "pause")
+
+    assert raised.value.action == "pause"
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class FakeValue:
+    def __init__(self):
+        self.checks = 0
+        self.action = None
+
+    @property
+    def value(self):
+        self.checks += 1
+        return self.action
+
+
+def test_segment_channel_sends_frame_counts_in_batches():
+    progress_queue = FakeQueue()
+    channel = SegmentChannel(progress_queue, FakeValue(), max_frames=10, interval=60)
+
+    for _ in range(25):
+        channel.progress(1)
+    channel.flush()
+
+    assert progress_queue.items == [10, 10, 5]
+
+
+def test_segment_channel_reads_stop_request_at_most_every_interval():
+    stop_action = FakeValue()
+    channel = SegmentChannel(None, stop_action, interval=60)
+
+    assert channel.should_stop() is None
+    stop_action.action = "pause"
+    assert not any(channel.should_stop() for _ in range(100))
+    assert stop_action.checks == 1
+
+    channel._last_checked = 0.0
+    assert channel.should_stop() == "pause"
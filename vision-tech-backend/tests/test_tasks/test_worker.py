@@ -0,0 +1,132 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.detection import DetectionJob
+from app.tasks import worker
+from app.tasks.worker import claim_next_job, release_job
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[DetectionJob.__table__])
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(worker, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def add_job(db, minutes_ago, **values):
+    job = DetectionJob(
+        video_id=1,
+        model_name="yolov8n",
+        created_by=1,
+        created_at=datetime.datetime.now() - datetime.timedelta(minutes=minutes_ago),
+        **values
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def get_job(db, job_id):
+    db.expire_all()
+    return db.query(DetectionJob).filter(DetectionJob.id == job_id).one()
+
+
+def ago(seconds):
+    return datetime.datetime.now() - datetime.timedelta(seconds=seconds)
+
+
+def test_claims_pending_jobs_oldest_first(db):
+    newer = add_job(db, 1)
+    older = add_job(db, 5)
+
+    assert claim_next_job(db) == older
+    assert claim_next_job(db) == newer
+    assert claim_next_job(db) is None
+
+    job = get_job(db, older)
+    assert job.status == "in_progress"
+    assert job.attempts == 1
+    assert job.started_at is not None and job.heartbeat_at is not None
+
+
+def test_does_not_claim_jobs_with_a_recent_heartbeat(db):
+    add_job(db, 5, status="in_progress", attempts=1, started_at=ago(600), heartbeat_at=ago(5))
+    add_job(db, 5, status="completed", attempts=1)
+
+    assert claim_next_job(db) is None
+
+
+def test_reclaims_stale_jobs_from_their_checkpoint(db):
+    started_at = ago(3600)
+    stale = add_job(
+        db, 60,
+        status="in_progress",
+        attempts=1,
+        started_at=started_at,
+        heartbeat_at=ago(settings.DETECTION_JOB_STALE_AFTER + 60),
+        checkpoint_frame=120,
+    )
+
+    assert claim_next_job(db) == stale
+
+    job = get_job(db, stale)
+    assert job.status == "in_progress"
+    assert job.attempts == 2
+    assert job.checkpoint_frame == 120
+    assert job.started_at == started_at
+    assert job.heartbeat_at > ago(60)
+
+
+def test_reclaims_jobs_that_never_sent_a_heartbeat(db):
+    stale = add_job(db, 60, status="in_progress", attempts=1, started_at=ago(settings.DETECTION_JOB_STALE_AFTER + 60))
+
+    assert claim_next_job(db) == stale
+
+
+def test_fails_jobs_that_used_up_their_attempts(db):
+    exhausted = add_job(
+        db, 60,
+        status="in_progress",
+        attempts=settings.DETECTION_JOB_MAX_ATTEMPTS,
+        started_at=ago(3600),
+        heartbeat_at=ago(settings.DETECTION_JOB_STALE_AFTER + 60),
+    )
+    pending = add_job(db, 1)
+
+    assert claim_next_job(db) == pending
+
+    job = get_job(db, exhausted)
+    assert job.status == "failed"
+    assert "interrupted" in job.error_message
+
+
+def test_released_jobs_are_queued_again_until_attempts_run_out(db):
+    job_id = add_job(db, 5)
+    claim_next_job(db)
+
+    release_job(job_id, "Worker process exited with code -9")
+
+    job = get_job(db, job_id)
+    assert job.status == "pending"
+    assert job.error_message == "Worker process exited with code -9"
+
+    job.attempts = settings.DETECTION_JOB_MAX_ATTEMPTS
+    job.status = "in_progress"
+    db.commit()
+    release_job(job_id, "Worker process exited with code -9")
+
+    assert get_job(db, job_id).status == "failed"
@@ -0,0 +1,91 @@
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from app.utils.video import FFmpegCapture, FrameSampler
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def sampled(sampler, frame_count, start_frame=0):
+    frames = []
+    frame_number = sampler.next_frame(start_frame)
+    while frame_number is not None and frame_number < frame_count:
+        frames.append(frame_number)
+        frame_number = sampler.next_frame(frame_number + 1)
+    return frames
+
+
+def test_sampler_takes_every_frame_by_default():
+    sampler = FrameSampler()
+
+    assert sampler.next_frame(7) == 7
+    assert sampler.count_frames(10) == 10
+    assert sampler.frame_step == 1
+
+
+def test_sampler_with_stride():
+    sampler = FrameSampler(stride=3)
+
+    assert sampler.next_frame(0) == 0
+    assert sampler.next_frame(1) == 3
+    assert sampler.next_frame(3) == 3
+    assert sampled(sampler, 10) == [0, 3, 6, 9]
+    assert sampled(sampler, 10, start_frame=4) == [6, 9]
+
+
+@pytest.mark.parametrize("frame_count, start_frame", [(0, 0), (1, 0), (9, 0), (10, 0), (11, 0), (10, 4), (10, 9), (10, 10), (10, 12)])
+def test_sampler_count_matches_sampled_frames_with_stride(frame_count, start_frame):
+    sampler = FrameSampler(stride=3)
+
+    assert sampler.count_frames(frame_count, start_frame) == len(sampled(sampler, frame_count, start_frame))
+
+
+def test_sampler_with_keyframes():
+    sampler = FrameSampler(keyframes=[0, 12, 24, 30])
+
+    assert sampler.seek
+    assert sampler.next_frame(1) == 12
+    assert sampler.next_frame(31) is None
+    assert sampler.count_frames(25) == 3
+    assert sampler.count_frames(31, start_frame=13) == 2
+    assert sampled(sampler, 31, start_frame=13) == [24, 30]
+    assert sampler.frame_step == 12
+
+
+def write_video(path, frames=12, size=(64, 48), fps=10.0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for index in range(frames):
+        writer.write(np.full((size[1], size[0], 3), index * 10, dtype=np.uint8))
+    writer.release()
+
+
+@requires_ffmpeg
+def test_ffmpeg_capture_reads_until_end(tmp_path):
+    path = tmp_path / "clip.avi"
+    write_video(path)
+
+    cap = FFmpegCapture(str(path), 10.0, (32, 24), ring_size=4)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.copy())
+    cap.release()
+
+    assert len(frames) == 12
+    assert frames[0].shape == (24, 32, 3)
+
+
+@requires_ffmpeg
+def test_ffmpeg_capture_raises_on_decoding_error(tmp_path):
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(b"not a video" * 100)
+
+    cap = FFmpegCapture(str(path), 10.0, (32, 24))
+    with pytest.raises(RuntimeError, match="exit code"):
+        cap.read()
+    cap.release()
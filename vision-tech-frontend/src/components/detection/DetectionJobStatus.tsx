@@ -41,7 +41,7 @@ const DetectionJobStatus: React.FC<DetectionJobStatusProps> = ({
     dispatch(fetchDetectionJob(jobId));
     
     // Start polling if job is pending or processing
-    if (currentJob?.status === 'pending' || currentJob?.status === 'processing') {
+    if (currentJob?.status === 'pending' || currentJob?.status === 'processing' || currentJob?.status === 'in_progress') {
       const interval = setInterval(() => {
         dispatch(fetchDetectionJob(jobId));
       }, 5000); // Poll every 5 seconds
@@ -59,7 +59,7 @@ const DetectionJobStatus: React.FC<DetectionJobStatusProps> = ({
   // Update polling when job status changes
   useEffect(() => {
     if (currentJob) {
-      if (currentJob.status === 'pending' || currentJob.status === 'processing') {
+      if (currentJob.status === 'pending' || currentJob.status === 'processing' || currentJob.status === 'in_progress') {
         if (!pollingInterval) {
           const interval = setInterval(() => {
             dispatch(fetchDetectionJob(jobId));
@@ -110,6 +110,11 @@ const DetectionJobStatus: React.FC<DetectionJobStatusProps> = ({
     if (currentJob.status === 'pending') return 0;
     if (currentJob.status === 'error') return 100;
     
+    // Progress reported by the worker
+    if (currentJob.progress !== undefined && currentJob.progress !== null) {
+      return currentJob.progress;
+    }
+    
     // For processing, calculate progress based on time (just an estimate)
     if (currentJob.started_at) {
       const startTime = new Date(currentJob.started_at).getTime();
@@ -170,12 +175,19 @@ const DetectionJobStatus: React.FC<DetectionJobStatusProps> = ({
         />
       </Box>
       
-      {currentJob.status === 'processing' && (
+      {(currentJob.status === 'processing' || currentJob.status === 'in_progress') && (
         <Box sx={{ mb: 2 }}>
           <Typography variant="body2" color="text.secondary" gutterBottom>
             Processing video...
           </Typography>
           <LinearProgress variant="determinate" value={getJobProgress()} sx={{ height: 8, borderRadius: 1 }} />
+          {currentJob.total_frames ? (
+            <Typography variant="body2" color="text.secondary" sx={{ mt: 1 }}>
+              {currentJob.frames_processed ?? 0} / {currentJob.total_frames} frames
+              {currentJob.processing_fps ? ` at ${currentJob.processing_fps.toFixed(1)} fps` : ''}
+              {currentJob.estimated_completion_at ? `, done around ${formatDate(currentJob.estimated_completion_at)}` : ''}
+            </Typography>
+          ) : null}
         </Box>
       )}
       
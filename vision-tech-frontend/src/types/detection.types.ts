@@ -43,6 +43,11 @@ export interface Detection {
     started_at?: string;
     completed_at?: string;
     error_message?: string;
+    frames_processed?: number;
+    total_frames?: number;
+    processing_fps?: number;
+    estimated_completion_at?: string;
+    progress?: number;
   }
 
   export interface DetectionJobCreate {